@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Precompiles GUI layout files into the layout cache used at startup
+
+Usage: compile_layout.py [options] <GUI file> [<GUI file> ...]
+"""
+import os
+import sys
+import time
+from optparse import OptionParser
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "..")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+
+import gui
+from gui.utils import layout_cache
+
+
+if __name__ == "__main__":
+    parser = OptionParser(usage="usage: %prog [options] <GUI file> [<GUI file> ...]")
+    parser.add_option(
+        "",
+        "--userFileDir",
+        action="store",
+        type="string",
+        help="User file directory of MXCuBE (default ~/.mxcube), "
+        + "layouts are cached in its %s subdirectory"
+        % layout_cache.CACHE_DIRECTORY_NAME,
+        dest="userFileDir",
+        default=os.path.join(os.environ.get("HOME", ""), ".mxcube"),
+    )
+    parser.add_option(
+        "",
+        "--bricksDirs",
+        action="store",
+        type="string",
+        help="Additional directories for bricks search path",
+        dest="bricksDirs",
+        metavar="dir1" + os.path.pathsep + "dir2...dirN",
+        default="",
+    )
+    (opts, args) = parser.parse_args()
+
+    if not args:
+        parser.print_help()
+        sys.exit(1)
+
+    bricks_dirs = opts.bricksDirs.split(os.path.pathsep)
+    bricks_dirs += os.environ.get("CUSTOM_BRICKS_PATH", "").split(os.path.pathsep)
+    gui.add_custom_bricks_dirs([bricks_dir for bricks_dir in bricks_dirs if bricks_dir])
+
+    cache_dir = os.path.join(opts.userFileDir, layout_cache.CACHE_DIRECTORY_NAME)
+    exit_code = 0
+    for filename in args:
+        start = time.time()
+        try:
+            compiled_layout = layout_cache.compile_layout(filename)
+            cache_filename = layout_cache.save_cached_layout(
+                compiled_layout, filename, cache_dir
+            )
+        except BaseException as ex:
+            sys.stderr.write("Could not compile %s: %s\n" % (filename, str(ex)))
+            exit_code = 1
+        else:
+            print(
+                "%s -> %s (%d bricks, %d hardware objects, %.3f s)"
+                % (
+                    filename,
+                    cache_filename,
+                    len(compiled_layout.brick_mnemonics),
+                    len(set(compiled_layout.mnemonics)),
+                    time.time() - start,
+                )
+            )
+    sys.exit(exit_code)
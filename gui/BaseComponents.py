@@ -21,11 +21,16 @@ import pprint
 import os
 import sys
 import time
-import operator
 import weakref
+import functools
+import itertools
+from collections import OrderedDict
+from contextlib import contextmanager
 
 import gui
-from gui.utils import PropertyBag, Connectable, Colors, QtImport
+from gui.utils import PropertyBag, Connectable, Colors, QtImport, startup_profiler
+from gui.utils.brick_change_queue import BrickChangeQueue
+from gui.utils.event_cache import EventCache
 
 from HardwareRepository import HardwareRepository as HWR
 from HardwareRepository.BaseHardwareObjects import HardwareObject
@@ -134,7 +139,9 @@ class SignalSlotFilter:
                 and BaseWidget._instance_mirror == BaseWidget.INSTANCE_MIRROR_PREVENT
            ):
             if self.should_cache:
-                BaseWidget._events_cache[self.slot] = (time.time(), self.slot, args)
+                s = self.slot()
+                if s is not None:
+                    BaseWidget.add_event_to_cache(time.time(), s, *args)
                 return
 
         s = self.slot()
@@ -142,6 +149,21 @@ class SignalSlotFilter:
             s(*args)
 
 
+@contextmanager
+def suspended_updates(bricks, brick_name):
+    """Disables updates (repaint) of the brick brick_name of bricks (dict)"""
+    brick = bricks.get(brick_name)
+    if brick is None:
+        yield
+        return
+    updates_enabled = brick.updatesEnabled()
+    brick.setUpdatesEnabled(False)
+    try:
+        yield
+    finally:
+        brick.setUpdatesEnabled(updates_enabled)
+
+
 class BaseWidget(Connectable.Connectable, QtImport.QFrame):
     """Base class for MXCuBE bricks"""
 
@@ -179,7 +201,14 @@ class BaseWidget(Connectable.Connectable, QtImport.QFrame):
     _instance_user_id = INSTANCE_USERID_UNKNOWN
     _instance_mirror = INSTANCE_MIRROR_UNKNOWN
     _filter_installed = False
-    _events_cache = {}
+    # last call of the slots received while mirroring is prevented
+    _events_cache = EventCache()
+    # window emitting brickChangedSignal and tabChangedSignal
+    _top_level_widget = None
+    # brick key: weak reference of every brick
+    _bricks = OrderedDict()
+    _brick_keys = itertools.count()
+    _brick_change_queue = None
     _menu_background_color = None
     _menubar = None
     _toolbar = None
@@ -196,28 +225,27 @@ class BaseWidget(Connectable.Connectable, QtImport.QFrame):
     def set_run_mode(mode):
         if mode:
             BaseWidget._run_mode = True
-            for widget in QtImport.QApplication.allWidgets():
-                if isinstance(widget, BaseWidget):
+            for widget in BaseWidget.get_bricks():
+                with startup_profiler.brick_step(widget.objectName(), "run"):
                     widget.__run()
-                    try:
-                        widget.set_expert_mode(False)
-                    except BaseException:
-                        logging.getLogger().exception(
-                            "Could not set %s to user mode", widget.name()
-                        )
+                try:
+                    widget.set_expert_mode(False)
+                except BaseException:
+                    logging.getLogger().exception(
+                        "Could not set %s to user mode", widget.name()
+                    )
 
         else:
             BaseWidget._run_mode = False
-            for widget in QtImport.QApplication.allWidgets():
-                if isinstance(widget, BaseWidget):
-                    widget.__stop()
-                    try:
-                        widget.set_expert_mode(True)
-                    except Exception as ex:
-                        logging.getLogger().exception(
-                            "Could not set %s to expert mode: %s"
-                            % (str(widget), str(ex))
-                        )
+            for widget in BaseWidget.get_bricks():
+                widget.__stop()
+                try:
+                    widget.set_expert_mode(True)
+                except Exception as ex:
+                    logging.getLogger().exception(
+                        "Could not set %s to expert mode: %s"
+                        % (str(widget), str(ex))
+                    )
 
     @staticmethod
     def is_running():
@@ -259,13 +287,12 @@ class BaseWidget(Connectable.Connectable, QtImport.QFrame):
     @staticmethod
     def set_instance_mode(mode):
         BaseWidget._instance_mode = mode
-        for widget in QtImport.QApplication.allWidgets():
-            if isinstance(widget, BaseWidget):
-                widget._instance_mode_changed(mode)
-                if widget["instanceAllowAlways"]:
-                    widget.setEnabled(True)
-                else:
-                    widget.setEnabled(mode == BaseWidget.INSTANCE_MODE_MASTER)
+        for widget in BaseWidget.get_bricks():
+            widget._instance_mode_changed(mode)
+            if widget["instanceAllowAlways"]:
+                widget.setEnabled(True)
+            else:
+                widget.setEnabled(mode == BaseWidget.INSTANCE_MODE_MASTER)
         if BaseWidget._instance_mode == BaseWidget.INSTANCE_MODE_MASTER:
             if BaseWidget._filter_installed:
                 QtImport.QApplication.instance().removeEventFilter(
@@ -467,24 +494,22 @@ class BaseWidget(Connectable.Connectable, QtImport.QFrame):
         if role == BaseWidget._instance_role:
             return
         BaseWidget._instance_role = role
-        for widget in QtImport.QApplication.allWidgets():
-            if isinstance(widget, BaseWidget):
-                # try:
-                widget.instance_role_changed(role)
-                # except:
-                #    pass
+        for widget in BaseWidget.get_bricks():
+            # try:
+            widget.instance_role_changed(role)
+            # except:
+            #    pass
 
     @staticmethod
     def set_instance_location(location):
         if location == BaseWidget._instance_location:
             return
         BaseWidget._instance_location = location
-        for widget in QtImport.QApplication.allWidgets():
-            if isinstance(widget, BaseWidget):
-                # try:
-                widget.instance_location_changed(location)
-                # except:
-                #    pass
+        for widget in BaseWidget.get_bricks():
+            # try:
+            widget.instance_location_changed(location)
+            # except:
+            #    pass
 
     @staticmethod
     def set_instance_user_id(user_id):
@@ -492,12 +517,11 @@ class BaseWidget(Connectable.Connectable, QtImport.QFrame):
             return
         BaseWidget._instance_user_id = user_id
 
-        for widget in QtImport.QApplication.allWidgets():
-            if isinstance(widget, BaseWidget):
-                # try:
-                widget.instance_user_id_changed(user_id)
-                # except:
-                #    pass
+        for widget in BaseWidget.get_bricks():
+            # try:
+            widget.instance_user_id_changed(user_id)
+            # except:
+            #    pass
         BaseWidget.update_menu_bar_color()
 
     @staticmethod
@@ -509,9 +533,8 @@ class BaseWidget(Connectable.Connectable, QtImport.QFrame):
         if mirror == BaseWidget.INSTANCE_MIRROR_ALLOW:
             BaseWidget.synchronize_with_cache()
 
-        for widget in QtImport.QApplication.allWidgets():
-            if isinstance(widget, BaseWidget):
-                widget.instance_mirror_changed(mirror)
+        for widget in BaseWidget.get_bricks():
+            widget.instance_mirror_changed(mirror)
 
     def instance_mirror_changed(self, mirror):
         pass
@@ -539,40 +562,80 @@ class BaseWidget(Connectable.Connectable, QtImport.QFrame):
 
     @staticmethod
     def update_whats_this():
-        for widget in QtImport.QApplication.allWidgets():
-            if isinstance(widget, BaseWidget):
-                msg = "%s (%s)\n%s" % (
-                    widget.objectName(),
-                    widget.__class__.__name__,
-                    widget.get_hardware_objects_info(),
-                )
-                widget.setWhatsThis(msg)
+        for widget in BaseWidget.get_bricks():
+            msg = "%s (%s)\n%s" % (
+                widget.objectName(),
+                widget.__class__.__name__,
+                widget.get_hardware_objects_info(),
+            )
+            widget.setWhatsThis(msg)
         QtImport.QWhatsThis.enterWhatsThisMode()
 
     @staticmethod
-    def update_widget(brick_name, widget_name, method_name, method_args, master_sync):
-        for widget in QtImport.QApplication.allWidgets():
-            try:
+    def set_top_level_widget(widget):
+        """Sets the window emitting brickChangedSignal and tabChangedSignal"""
+        BaseWidget._top_level_widget = widget
+
+    @staticmethod
+    def get_top_level_widget():
+        if BaseWidget._top_level_widget is None:
+            for widget in QtImport.QApplication.allWidgets():
                 if hasattr(widget, "configuration"):
-                    top_level_widget = widget
+                    BaseWidget._top_level_widget = widget
                     break
-            except NameError:
-                continue
+        return BaseWidget._top_level_widget
+
+    @staticmethod
+    def get_bricks():
+        """Returns all existing bricks"""
+        bricks = []
+        for brick_ref in list(BaseWidget._bricks.values()):
+            brick = brick_ref()
+            if brick is not None:
+                bricks.append(brick)
+        return bricks
+
+    @staticmethod
+    def _unregister_brick(brick_key, *args):
+        BaseWidget._bricks.pop(brick_key, None)
 
+    @staticmethod
+    def get_brick_change_queue():
+        """Changes of synchronised widgets, coalesced before being sent"""
+        if BaseWidget._brick_change_queue is None:
+            BaseWidget._brick_change_queue = BrickChangeQueue(
+                BaseWidget._send_brick_change
+            )
+        return BaseWidget._brick_change_queue
+
+    @staticmethod
+    def _send_brick_change(
+        brick_name, widget_name, method_name, method_args, master_sync
+    ):
+        top_level_widget = BaseWidget.get_top_level_widget()
+        if top_level_widget is not None:
+            top_level_widget.brickChangedSignal.emit(
+                brick_name, widget_name, method_name, method_args, master_sync
+            )
+
+    @staticmethod
+    def update_widget(brick_name, widget_name, method_name, method_args, master_sync):
         if (
             not master_sync
             or BaseWidget._instance_mode == BaseWidget.INSTANCE_MODE_MASTER
         ):
-            top_level_widget.brickChangedSignal.emit(
+            BaseWidget.get_brick_change_queue().add_change(
                 brick_name, widget_name, method_name, method_args, master_sync
             )
 
     @staticmethod
     def update_tab_widget(tab_name, tab_index):
         if BaseWidget._instance_mode == BaseWidget.INSTANCE_MODE_MASTER:
-            for widget in QtImport.QApplication.allWidgets():
-                if hasattr(widget, "configuration"):
-                    widget.tabChangedSignal.emit(tab_name, tab_index)
+            # brick changes made before the tab change are sent first
+            BaseWidget.get_brick_change_queue().flush()
+            top_level_widget = BaseWidget.get_top_level_widget()
+            if top_level_widget is not None:
+                top_level_widget.tabChangedSignal.emit(tab_name, tab_index)
 
     @staticmethod
     def widget_groupbox_toggled(brick_name, widget_name, master_sync, state):
@@ -631,38 +694,68 @@ class BaseWidget(Connectable.Connectable, QtImport.QFrame):
     def should_run_event():
         return BaseWidget._instance_mirror == BaseWidget.INSTANCE_MIRROR_ALLOW
 
+    @staticmethod
+    def get_brick_of(obj):
+        """Returns the brick containing obj (widget or brick) or None"""
+        while obj is not None and not isinstance(obj, BaseWidget):
+            try:
+                obj = obj.parent()
+            except (AttributeError, TypeError):
+                return None
+        return obj
+
     @staticmethod
     def add_event_to_cache(timestamp, method, *args):
-        try:
-            method_to_add = WeakMethod(method)
-        except TypeError:
-            method_to_add = method
-        BaseWidget._events_cache[method_to_add] = (timestamp, method_to_add, args)
+        brick = BaseWidget.get_brick_of(getattr(method, "__self__", None))
+        BaseWidget._events_cache.add(
+            method,
+            args,
+            brick.objectName() if brick is not None else None,
+            timestamp,
+        )
 
     @staticmethod
     def synchronize_with_cache():
-        events = list(BaseWidget._events_cache.values())
-        ordered_events = sorted(events, key=operator.itemgetter(0))
-        for event_timestamp, event_method, event_args in ordered_events:
-            try:
-                method = event_method()
-                if method is not None:
-                    method(*event_args)
-            except BaseException:
-                pass
-        BaseWidget._events_cache = {}
+        """
+        Replays the cached events brick after brick, with the updates of
+        the brick disabled. Returns number of events, failed events,
+        bricks and duration (dict)
+        """
+        bricks = dict(
+            (brick.objectName(), brick) for brick in BaseWidget.get_bricks()
+        )
+        evicted = BaseWidget._events_cache.evicted
+        report = BaseWidget._events_cache.replay(
+            functools.partial(suspended_updates, bricks)
+        )
+        if report["events"]:
+            logging.getLogger().debug(
+                "Replayed %d cached events of %d bricks in %.1f ms "
+                "(%d failed, %d dropped from the full cache)",
+                report["events"],
+                report["groups"],
+                report["duration"] * 1000,
+                report["failed"],
+                evicted,
+            )
+        BaseWidget._events_cache.evicted = 0
+        return report
 
     @staticmethod
     def set_gui_enabled(enabled):
-        for widget in QtImport.QApplication.allWidgets():
-            if isinstance(widget, BaseWidget):
-                widget.setEnabled(enabled)
+        for widget in BaseWidget.get_bricks():
+            widget.setEnabled(enabled)
 
     def __init__(self, parent=None, widget_name=""):
 
         Connectable.Connectable.__init__(self)
         QtImport.QFrame.__init__(self, parent)
         self.setObjectName(widget_name)
+
+        brick_key = next(BaseWidget._brick_keys)
+        unregister = functools.partial(BaseWidget._unregister_brick, brick_key)
+        BaseWidget._bricks[brick_key] = weakref.ref(self, unregister)
+        self.destroyed.connect(unregister)
         self.property_bag = PropertyBag.PropertyBag()
 
         self.__enabled_state = True
@@ -713,6 +806,10 @@ class BaseWidget(Connectable.Connectable, QtImport.QFrame):
         self.disconnect = self.disconnect_hwobj
         # self.run_mode = QPushButton("Run mode", self)
 
+    def run_brick(self):
+        """Sets a brick created after the GUI was started to the run mode"""
+        self.__run()
+
     def __run(self):
         self.setAcceptDrops(False)
         self.blockSignals(False)
@@ -1074,9 +1171,7 @@ class BaseWidget(Connectable.Connectable, QtImport.QFrame):
             self.setEnabled(True)
 
     def get_window_display_widget(self):
-        for widget in QtImport.QApplication.allWidgets():
-            if hasattr(widget, "configuration"):
-                return widget
+        return BaseWidget.get_top_level_widget()
 
     def set_background_color(self, color):
         Colors.set_widget_color(self, color, QtImport.QPalette.Background)
@@ -1106,3 +1201,32 @@ class NullBrick(BaseWidget):
             painter.setPen(QtImport.QPen(QtImport.Qt.black, 1))
             painter.drawLine(0, 0, self.width(), self.height())
             painter.drawLine(0, self.height(), self.width(), 0)
+
+
+class LazyBrick(NullBrick):
+    """
+    Placeholder of a brick located in a hidden tab page. Real brick is
+    created the first time the placeholder is shown (see materialize).
+    """
+
+    # Set by GUISupervisor, called with the placeholder as argument
+    materialize_callback = None
+
+    def __init__(self, parent, name, brick_type):
+        NullBrick.__init__(self, parent, name)
+
+        self.brick_type = brick_type
+
+    def materialize(self):
+        """Replaces the placeholder by the real brick"""
+        if LazyBrick.materialize_callback is not None:
+            LazyBrick.materialize_callback(self)
+
+    def run(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def paintEvent(self, event):
+        pass
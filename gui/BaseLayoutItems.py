@@ -19,7 +19,7 @@
 
 """Module contains classes defining graphical objects in MXCuBE"""
 
-from gui.utils import PropertyBag, QtImport
+from gui.utils import PropertyBag, QtImport, startup_profiler
 
 DEFAULT_MARGIN = 2
 DEFAULT_SPACING = 2
@@ -334,7 +334,8 @@ class BrickCfg(_CfgItem):
             self.set_properties(brick.property_bag)
 
     def set_properties(self, properties):
-        self.brick.set_persistent_property_bag(properties)
+        with startup_profiler.brick_step(self.name, "properties"):
+            self.brick.set_persistent_property_bag(properties)
         self.properties = self.brick.property_bag
 
     def rename(self, new_name):
@@ -20,6 +20,7 @@
 """Configuration
 """
 
+import os
 import imp
 import logging
 import pprint
@@ -34,19 +35,35 @@ except ImportError:
 
 
 from gui import BaseLayoutItems
-from gui.utils import PropertyBag
-from gui.BaseComponents import NullBrick
+from gui.utils import PropertyBag, startup_profiler
+from gui.BaseComponents import NullBrick, LazyBrick
 
 
 __credits__ = ["MXCuBE collaboration"]
 __license__ = "LGPLv3+"
 
 
+# dict brick type: module file name, known from the compiled layout
+_brick_module_paths = {}
+
+
+def set_brick_module_paths(brick_module_paths):
+    """Sets file names of brick modules, so bricks directories do not
+       have to be searched
+    """
+    global _brick_module_paths
+    _brick_module_paths = dict(brick_module_paths)
+
+
 def load_module(brick_name):
     """Loads module"""
     fp = None
+    search_path = None
+    module_path = _brick_module_paths.get(brick_name)
+    if module_path is not None and os.path.exists(module_path):
+        search_path = [os.path.dirname(module_path)]
     try:
-        fp, path_name, description = imp.find_module(brick_name)
+        fp, path_name, description = imp.find_module(brick_name, search_path)
         mod = imp.load_module(brick_name, fp, path_name, description)
     except BaseException:
         if fp:
@@ -59,7 +76,8 @@ def load_module(brick_name):
 
 def load_brick(brick_type, brick_name):
     """Loads brick"""
-    module = load_module(brick_type)
+    with startup_profiler.brick_step(brick_name, "import"):
+        module = load_module(brick_type)
 
     if module is not None:
         try:
@@ -73,7 +91,8 @@ def load_brick(brick_type, brick_name):
             return NullBrick(None, brick_name)
         else:
             try:
-                new_instance = class_obj(None, brick_name)
+                with startup_profiler.brick_step(brick_name, "__init__"):
+                    new_instance = class_obj(None, brick_name)
             except BaseException:
                 logging.getLogger().exception(
                     "Cannot load brick %s : initialization failed", brick_name
@@ -106,9 +125,17 @@ class Configuration:
         "vsplitter": BaseLayoutItems.SplitterCfg,
     }
 
-    def __init__(self, config=None):
-        """__init__ method"""
+    def __init__(self, config=None, hwobj_preloader=None, lazy_bricks=False):
+        """__init__ method
+
+        :param config: list of windows (content of a gui file)
+        :param hwobj_preloader: HardwareObjectPreloader loading hardware
+                                objects used by the bricks of config
+        :param lazy_bricks: bricks in tab pages not shown at startup are
+                            created as LazyBrick placeholders
+        """
         self.has_changed = False
+        self.lazy_bricks = {}
 
         if config is None:
             self.windows_list = []
@@ -116,7 +143,7 @@ class Configuration:
             self.bricks = {}
             self.items = {}
         else:
-            self.load(config)
+            self.load(config, hwobj_preloader, lazy_bricks)
 
     def find_container(self, container_name):
         """Returns container
@@ -540,29 +567,45 @@ class Configuration:
 
                 return True
 
-    def load(self, config):
+    def load(self, config, hwobj_preloader=None, lazy_bricks=False):
         """Loads config"""
         self.windows_list = []
         self.windows = {}
         self.bricks = {}
         self.items = {}
+        self.lazy_bricks = {}
         self.has_changed = False
         self.windows_list = config
 
-        def load_children(children):
-            """Loads children"""
+        def load_children(children, lazy=False, parent_type=None):
+            """Loads children, bricks of lazy items are not created"""
             index = 0
             for child in children:
                 new_item = None
+                # only the first page of a tab is visible at startup
+                child_lazy = lazy or (
+                    lazy_bricks and parent_type == "tab" and index > 0
+                )
 
                 if "brick" in child:
-                    brick = load_brick(child["type"], child["name"])
+                    if child_lazy:
+                        brick = LazyBrick(None, child["name"], child["type"])
+                        if hwobj_preloader is not None:
+                            hwobj_preloader.skip_brick(child["name"])
+                    else:
+                        brick = load_brick(child["type"], child["name"])
+
+                        # properties of the brick refer to hardware objects
+                        if hwobj_preloader is not None:
+                            hwobj_preloader.wait_for_brick(child["name"])
                     child["brick"] = brick
 
                     new_item = BaseLayoutItems.BrickCfg(child["name"], child["type"])
 
                     new_item["brick"] = brick
                     self.bricks[child["name"]] = new_item
+                    if child_lazy:
+                        self.lazy_bricks[child["name"]] = new_item
                 else:
                     if child["type"] == "window":
                         new_item = BaseLayoutItems.WindowCfg(child["name"])
@@ -601,7 +644,7 @@ class Configuration:
                     #    new_item.signals = new_item_signals
                     #    children[index] = new_item
                     children[index] = new_item
-                    load_children(child["children"])
+                    load_children(child["children"], child_lazy, child["type"])
                 index += 1
 
         load_children(self.windows_list)
@@ -630,6 +673,20 @@ class Configuration:
         """
         return isinstance(item, BaseLayoutItems.BrickCfg)
 
+    def materialize_brick(self, brick_name):
+        """Creates brick in place of its LazyBrick placeholder
+
+        :returns: new brick
+        """
+        brick_cfg = self.lazy_bricks.pop(brick_name)
+        placeholder = brick_cfg["brick"]
+
+        brick = load_brick(brick_cfg["type"], brick_name)
+        brick_cfg["brick"] = brick
+        brick_cfg.set_properties(placeholder.property_bag)
+
+        return brick
+
     def reload_brick(self, brick_cfg):
         """Reloads brick
         """
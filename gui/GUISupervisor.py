@@ -21,20 +21,21 @@
 
 import os
 import stat
-import json
-import pickle
 import logging
 import collections
 
-try:
-    import ruamel.yaml as yaml
-except ImportError:
-    import yaml
-
 from gui import set_splash_screen
 from gui import Configuration, GUIBuilder
-from gui.utils import GUIDisplay, Icons, Colors, QtImport
-from gui.BaseComponents import BaseWidget, NullBrick
+from gui.utils import (
+    GUIDisplay,
+    Icons,
+    Colors,
+    QtImport,
+    layout_cache,
+    startup_profiler,
+)
+from gui.utils.hwobj_preloader import HardwareObjectPreloader, DEFAULT_WIDTH
+from gui.BaseComponents import BaseWidget, NullBrick, LazyBrick
 
 from HardwareRepository import HardwareRepository as HWR
 
@@ -46,6 +47,16 @@ __license__ = "LGPLv3+"
 __category__ = "General"
 
 
+class LastSignalValue(object):
+    """Keeps the arguments of the last emission of a signal"""
+
+    def __init__(self):
+        self.args = None
+
+    def __call__(self, *args):
+        self.args = args
+
+
 class SplashScreen(QtImport.QSplashScreen):
     """Splash screen when mxcube is loading"""
 
@@ -130,10 +141,12 @@ class GUISupervisor(QtImport.QWidget):
     brickChangedSignal = QtImport.pyqtSignal(str, str, str, tuple, bool)
     tabChangedSignal = QtImport.pyqtSignal(str, int)
 
-    def __init__(self, design_mode=False, show_maximized=False, no_border=False):
+    def __init__(self, design_mode=False, show_maximized=False, no_border=False,
+                 hwobj_preload_width=DEFAULT_WIDTH, lazy_bricks=False):
         """Main mxcube gui widget"""
 
         QtImport.QWidget.__init__(self)
+        BaseWidget.set_top_level_widget(self)
 
         self.framework = None
         self.gui_config_file = None
@@ -145,7 +158,11 @@ class GUISupervisor(QtImport.QWidget):
         self.hardware_repository = HWR.getHardwareRepository()
         self.show_maximized = show_maximized
         self.no_border = no_border
+        self.hwobj_preload_width = hwobj_preload_width
+        self.lazy_bricks = lazy_bricks
         self.windows = []
+        self.widgets_dict = {}
+        self.lazy_connections = []
 
         self.splash_screen = SplashScreen(Icons.load_pixmap("splash"))
 
@@ -163,9 +180,6 @@ class GUISupervisor(QtImport.QWidget):
         """Loads gui"""
         self.configuration = Configuration.Configuration()
         self.gui_config_file = gui_config_file
-        load_from_dict = gui_config_file.endswith(".json") or gui_config_file.endswith(
-            ".yml"
-        )
 
         if self.gui_config_file:
             if hasattr(self, "splash_screen"):
@@ -180,9 +194,20 @@ class GUISupervisor(QtImport.QWidget):
                 if filestat[stat.ST_SIZE] == 0:
                     return self.new_gui()
 
+                failed_msg = (
+                    "Cannot read configuration from file %s. " % gui_config_file
+                )
+                failed_msg += "Starting in designer mode with clean GUI."
+
+                self.splash_screen.set_message("Gathering H/O info...")
+                self.splash_screen.set_progress_value(10)
                 try:
-                    gui_file = open(gui_config_file)
-                except BaseException:
+                    # parsed layout is cached in the user file directory
+                    with startup_profiler.measure("read_layout"):
+                        compiled_layout = layout_cache.load_layout(
+                            gui_config_file, self.get_layout_cache_dir()
+                        )
+                except (IOError, OSError):
                     logging.getLogger().exception(
                         "Cannot open file %s", gui_config_file
                     )
@@ -192,77 +217,33 @@ class GUISupervisor(QtImport.QWidget):
                         "Could not open file %s !" % gui_config_file,
                         QtImport.QMessageBox.Ok,
                     )
+                except BaseException:
+                    logging.getLogger().exception(failed_msg)
+                    return self.new_gui()
                 else:
-                    # find mnemonics to speed up loading
-                    # (using the 'require' feature from Hardware Repository)
-
-                    def __get_mnemonics(items_list):
-                        """Gets mnemonics"""
-
-                        mne_list = []
-
-                        for item in items_list:
-                            if "brick" in item:
-                                try:
-                                    if load_from_dict:
-                                        props = item["properties"]
-                                    else:
-                                        props = pickle.loads(item["properties"])
-                                except BaseException:
-                                    logging.getLogger().exception(
-                                        "Could not load properties for %s"
-                                        % item["name"]
-                                    )
-                                else:
-                                    item["properties"] = props
-                                    try:
-                                        for prop in props:
-                                            if load_from_dict:
-                                                prop_value = prop["value"]
-                                            else:
-                                                prop_value = prop.get_value()
-                                            if isinstance(
-                                                    prop_value, type("")
-                                            ) and prop_value.startswith("/"):
-                                                mne_list.append(prop_value)
-                                    except BaseException:
-                                        logging.exception(
-                                            "Could not "
-                                            + "build list of required "
-                                            + "hardware objects"
-                                        )
-
-                                continue
-
-                            mne_list += __get_mnemonics(item["children"])
-
-                        return mne_list
-
-                    failed_msg = (
-                        "Cannot read configuration from file %s. " % gui_config_file
+                    raw_config = compiled_layout.layout
+                    Configuration.set_brick_module_paths(
+                        compiled_layout.brick_modules
                     )
-                    failed_msg += "Starting in designer mode with clean GUI."
-
-                    try:
-                        if gui_config_file.endswith(".json"):
-                            raw_config = json.load(gui_file)
-                        elif gui_config_file.endswith(".yml"):
-                            raw_config = yaml.safe_load(gui_file)
-                        else:
-                            raw_config = eval(gui_file.read())
-                    except BaseException:
-                        logging.getLogger().exception(failed_msg)
 
-                    self.splash_screen.set_message("Gathering H/O info...")
-                    self.splash_screen.set_progress_value(10)
-                    mnemonics = __get_mnemonics(raw_config)
-                    self.hardware_repository.require(mnemonics)
-                    gui_file.close()
+                    # hardware objects referenced by the bricks (all mnemonics
+                    # of the layout) are loaded while bricks are built
+                    hwobj_preloader = HardwareObjectPreloader(
+                        self.hardware_repository,
+                        self.hwobj_preload_width,
+                        self.update_load_progress,
+                    )
+                    hwobj_preloader.start(compiled_layout.brick_mnemonics)
 
                     try:
                         self.splash_screen.set_message("Building GUI configuration...")
                         self.splash_screen.set_progress_value(20)
-                        config = Configuration.Configuration(raw_config)
+                        with startup_profiler.measure("configuration_load"):
+                            config = Configuration.Configuration(
+                                raw_config,
+                                hwobj_preloader,
+                                self.lazy_bricks and not self.launch_in_design_mode,
+                            )
                     except BaseException:
                         logging.getLogger("GUI").exception(failed_msg)
                         QtImport.QMessageBox.warning(
@@ -308,10 +289,25 @@ class GUISupervisor(QtImport.QWidget):
                         return self.framework
                     else:
                         main_window = self.execute(self.configuration)
+                        if startup_profiler.is_enabled():
+                            self.report_startup_profile()
                         return main_window
 
         return self.new_gui()
 
+    def get_layout_cache_dir(self):
+        """Returns directory of compiled layouts"""
+        if self.user_file_dir:
+            return os.path.join(
+                self.user_file_dir, layout_cache.CACHE_DIRECTORY_NAME
+            )
+
+    def update_load_progress(self, done, total, message):
+        """Shows progress of brick and hardware object loading"""
+        self.splash_screen.set_message(message)
+        if total > 0:
+            self.splash_screen.set_progress_value(20 + 70 * done // total)
+
     def new_gui(self):
         """Starts new gui"""
 
@@ -358,7 +354,8 @@ class GUISupervisor(QtImport.QWidget):
         """Start in execution mode"""
         self.splash_screen.set_message("Executing configuration...")
         self.splash_screen.set_progress_value(90)
-        self.display()
+        with startup_profiler.measure("display"):
+            self.display()
 
         main_window = None
 
@@ -373,7 +370,7 @@ class GUISupervisor(QtImport.QWidget):
                 main_window.resize(QtImport.QSize(width, height))
 
             # make connections
-            widgets_dict = dict(
+            self.widgets_dict = dict(
                 [
                     (
                         isinstance(w.objectName, collections.Callable)
@@ -384,53 +381,19 @@ class GUISupervisor(QtImport.QWidget):
                     for w in QtImport.QApplication.allWidgets()
                 ]
             )
-
-            def make_connections(items_list):
-                """Creates connections"""
-
-                for item in items_list:
-                    try:
-                        sender = widgets_dict[item["name"]]
-                    except KeyError:
-                        logging.getLogger().error(
-                            "Could not find receiver widget %s" % item["name"]
-                        )
-                    else:
-                        for connection in item["connections"]:
-                            _receiver = (
-                                connection["receiver"] or connection["receiverWindow"]
-                            )
-                            try:
-                                receiver = widgets_dict[_receiver]
-                            except KeyError:
-                                logging.getLogger().error(
-                                    "Could not find " + "receiver widget %s", _receiver
-                                )
-                            else:
-                                try:
-                                    slot = getattr(receiver, connection["slot"])
-                                    # etattr(sender, connection["signal"]).connect(slot)
-                                except AttributeError:
-                                    logging.getLogger().error(
-                                        "No slot '%s' " % connection["slot"]
-                                        + "in receiver %s" % _receiver
-                                    )
-                                else:
-                                    if not isinstance(sender, NullBrick):
-                                        getattr(sender, connection["signal"]).connect(slot)
-                                    # sender.connect(sender,
-                                    #    QtCore.SIGNAL(connection["signal"]),
-                                    #    slot)
-                    make_connections(item["children"])
+            self.lazy_connections = []
+            LazyBrick.materialize_callback = self.materialize_brick
 
             self.splash_screen.set_progress_value(95)
             self.splash_screen.set_message("Connecting bricks...")
-            make_connections(config.windows_list)
+            with startup_profiler.measure("make_connections"):
+                self.make_connections(config.windows_list)
 
             # set run mode for every brick
             self.splash_screen.set_progress_value(100)
             self.splash_screen.set_message("Setting run mode...")
-            BaseWidget.set_run_mode(True)
+            with startup_profiler.measure("set_run_mode"):
+                BaseWidget.set_run_mode(True)
 
             if self.show_maximized:
                 main_window.showMaximized()
@@ -446,6 +409,149 @@ class GUISupervisor(QtImport.QWidget):
 
         return main_window
 
+    def report_startup_profile(self, num_offenders=10):
+        """Writes startup profile and logs the slowest bricks and hwobjs"""
+        profiler = startup_profiler.get_profiler()
+        total_time = profiler.get_total_time()
+        offenders = profiler.get_top_offenders(num_offenders)
+
+        logging.getLogger("HWR").info("Startup took %.2f s" % total_time)
+        for description, offender_time in offenders:
+            logging.getLogger("HWR").info(
+                "    - %s: %.2f s" % (description, offender_time)
+            )
+        if offenders:
+            self.splash_screen.set_message(
+                "Started in %.1f s (slowest: %s %.1f s)"
+                % (total_time, offenders[0][0], offenders[0][1])
+            )
+
+        try:
+            filenames = profiler.write_report()
+        except BaseException:
+            logging.getLogger("HWR").exception("Could not write startup profile")
+        else:
+            for filename in filenames:
+                logging.getLogger("HWR").info("Startup profile saved in %s" % filename)
+
+    def make_connections(self, items_list):
+        """Creates connections. Connections of lazy bricks are created
+           when the brick is materialized
+        """
+        for item in items_list:
+            try:
+                sender = self.widgets_dict[item["name"]]
+            except KeyError:
+                logging.getLogger().error(
+                    "Could not find receiver widget %s" % item["name"]
+                )
+            else:
+                for connection in item["connections"]:
+                    self.make_connection(sender, connection)
+            self.make_connections(item["children"])
+
+    def make_connection(self, sender, connection):
+        """Connects signal of the sender to the slot defined in connection"""
+        _receiver = connection["receiver"] or connection["receiverWindow"]
+        try:
+            receiver = self.widgets_dict[_receiver]
+        except KeyError:
+            logging.getLogger().error(
+                "Could not find " + "receiver widget %s", _receiver
+            )
+            return
+
+        if isinstance(sender, LazyBrick) or isinstance(receiver, LazyBrick):
+            # last value sent to a lazy receiver is replayed when it is
+            # materialized
+            last_value = None
+            if not isinstance(sender, NullBrick):
+                last_value = LastSignalValue()
+                getattr(sender, connection["signal"]).connect(last_value)
+            self.lazy_connections.append(
+                (sender.objectName(), connection, last_value)
+            )
+            return
+
+        try:
+            slot = getattr(receiver, connection["slot"])
+            # etattr(sender, connection["signal"]).connect(slot)
+        except AttributeError:
+            logging.getLogger().error(
+                "No slot '%s' " % connection["slot"] + "in receiver %s" % _receiver
+            )
+        else:
+            if not isinstance(sender, NullBrick):
+                getattr(sender, connection["signal"]).connect(slot)
+            # sender.connect(sender,
+            #    QtCore.SIGNAL(connection["signal"]),
+            #    slot)
+
+    def replay_signal(self, connection, args):
+        """Calls the slot of connection with the last emitted arguments"""
+        receiver_name = connection["receiver"] or connection["receiverWindow"]
+        try:
+            getattr(self.widgets_dict[receiver_name], connection["slot"])(*args)
+        except BaseException:
+            logging.getLogger().exception(
+                "Could not replay signal %s to %s.%s",
+                connection["signal"],
+                receiver_name,
+                connection["slot"],
+            )
+
+    def materialize_brick(self, lazy_brick):
+        """Replaces LazyBrick placeholder by the real brick, replays
+           connections of the brick (and the last value of their signals)
+           and sets it to the run mode
+        """
+        brick_name = str(lazy_brick.objectName())
+        with startup_profiler.measure("materialize %s" % brick_name):
+            brick = self.configuration.materialize_brick(brick_name)
+
+            GUIDisplay.replace_widget(lazy_brick, brick)
+            for window in self.windows:
+                if lazy_brick in window.preview_items:
+                    window.preview_items[
+                        window.preview_items.index(lazy_brick)
+                    ] = brick
+            self.widgets_dict[brick_name] = brick
+
+            lazy_connections = self.lazy_connections
+            self.lazy_connections = []
+            for sender_name, connection, last_value in lazy_connections:
+                sender = self.widgets_dict[sender_name]
+                receiver_name = connection["receiver"] or connection["receiverWindow"]
+                if isinstance(self.widgets_dict.get(receiver_name), LazyBrick):
+                    if last_value is None and not isinstance(sender, NullBrick):
+                        # sender materialized: record its signal until the
+                        # receiver is materialized
+                        last_value = LastSignalValue()
+                        getattr(sender, connection["signal"]).connect(last_value)
+                    self.lazy_connections.append(
+                        (sender_name, connection, last_value)
+                    )
+                    continue
+                if last_value is not None:
+                    getattr(sender, connection["signal"]).disconnect(last_value)
+                self.make_connection(sender, connection)
+                if last_value is not None and last_value.args is not None:
+                    self.replay_signal(connection, last_value.args)
+
+            if BaseWidget.is_running():
+                with startup_profiler.brick_step(brick_name, "run"):
+                    brick.run_brick()
+                expert_mode = BaseWidget._menubar is not None and (
+                    BaseWidget._menubar.expert_mode_action.isChecked()
+                )
+                try:
+                    brick.set_expert_mode(expert_mode)
+                except BaseException:
+                    logging.getLogger().exception(
+                        "Could not set expert mode of %s", brick_name
+                    )
+        lazy_brick.deleteLater()
+
     def finalize(self):
         """Finalize gui load"""
 
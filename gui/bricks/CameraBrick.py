@@ -18,7 +18,7 @@
 #  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
-from gui.utils import Icons, QtImport
+from gui.utils import Icons, QtImport, frame_consumers
 from gui.BaseComponents import BaseWidget
 from HardwareRepository import HardwareRepository as HWR
 
@@ -53,6 +53,7 @@ class CameraBrick(BaseWidget):
         self.add_property("displayOmegaAxis", "boolean", True)
         self.add_property("beamDefiner", "boolean", False)
         self.add_property("cameraControls", "boolean", False)
+        self.add_property("suspendHiddenVideo", "boolean", False)
 
         # Graphic elements-----------------------------------------------------
         self.info_widget = QtImport.QWidget(self)
@@ -244,6 +245,7 @@ class CameraBrick(BaseWidget):
                     self.camera_control_dialog.set_camera_hwobj(
                         self.graphics_manager_hwobj.camera
                     )
+                self.register_video_consumer()
         elif property_name == "fixedSize":
             try:
                 fixed_size = list(map(int, new_value.split()))
@@ -270,9 +272,26 @@ class CameraBrick(BaseWidget):
             self.define_beam_action.setEnabled(new_value)
         elif property_name == "cameraControls":
             self.camera_control_action.setEnabled(new_value)
+        elif property_name == "suspendHiddenVideo":
+            self.register_video_consumer()
         else:
             BaseWidget.property_changed(self, property_name, old_value, new_value)
 
+    def register_video_consumer(self):
+        """
+        With suspendHiddenVideo the camera video is switched off while the
+        sample view is hidden. Off by default, because the camera frames
+        are also used by the centring procedures
+        """
+        camera = getattr(self.graphics_manager_hwobj, "camera", None)
+        if camera is None or self.graphics_view is None:
+            return
+        if self["suspendHiddenVideo"]:
+            frame_consumers.register_consumer(camera, self.graphics_view)
+            frame_consumers.set_video_live(camera, True)
+        else:
+            frame_consumers.unregister_consumer(camera, self.graphics_view)
+
     def display_beam_size_toggled(self):
         self.graphics_manager_hwobj.display_beam_size(
             self.display_beam_size_action.isChecked()
@@ -20,7 +20,8 @@
 import api
 
 from gui.BaseComponents import BaseWidget
-from gui.utils import Colors, Icons, QtImport
+from gui.utils import Colors, Icons, QtImport, frame_consumers
+from gui.utils.frame_transport import FrameTransport, FrameGraphicsItem
 from gui.utils.sample_changer_helper import SC_STATE_COLOR, SampleChanger
 
 __credits__ = ["MXCuBE collaboration"]
@@ -40,10 +41,13 @@ class SCViewBrick(BaseWidget):
         # Internal values -----------------------------------------------------
         self.axis_camera = None
         self.sc_camera = None
+        self.axis_frame_transport = FrameTransport(self, "axis_camera")
+        self.sc_frame_transport = FrameTransport(self, "sc_camera")
 
         # Properties ----------------------------------------------------------
         self.add_property("hwobj_axis_camera", "string", "")
         self.add_property("hwobj_sc_camera", "string", "")
+        self.add_property("maxFps", "integer", 25)
 
         # Signals -------------------------------------------------------------
 
@@ -65,13 +69,13 @@ class SCViewBrick(BaseWidget):
         self.axis_view = QtImport.QGraphicsView(camera_widget)
         axis_scene = QtImport.QGraphicsScene(self.axis_view)
         self.axis_view.setScene(axis_scene)
-        self.axis_camera_pixmap_item = QtImport.QGraphicsPixmapItem()
+        self.axis_camera_pixmap_item = FrameGraphicsItem()
         axis_scene.addItem(self.axis_camera_pixmap_item)
 
         self.sc_view = QtImport.QGraphicsView(camera_widget)
         sc_scene = QtImport.QGraphicsScene(self.sc_view)
         self.sc_view.setScene(sc_scene)
-        self.sc_camera_pixmap_item = QtImport.QGraphicsPixmapItem()
+        self.sc_camera_pixmap_item = FrameGraphicsItem()
         sc_scene.addItem(self.sc_camera_pixmap_item)
 
         # Layout --------------------------------------------------------------
@@ -95,6 +99,12 @@ class SCViewBrick(BaseWidget):
 
         # Qt signal/slot connections ------------------------------------------
         self.camera_live_cbx.stateChanged.connect(self.camera_live_state_changed)
+        self.axis_frame_transport.frameReceived.connect(
+            self.axis_camera_pixmap_item.set_frame
+        )
+        self.sc_frame_transport.frameReceived.connect(
+            self.sc_camera_pixmap_item.set_frame
+        )
 
         if api.sample_changer is not None:  
             self.connect(
@@ -108,29 +118,76 @@ class SCViewBrick(BaseWidget):
 
     def property_changed(self, property_name, old_value, new_value):
         if property_name == "hwobj_axis_camera":
+            if self.axis_camera is not None:
+                frame_consumers.unregister_consumer(self.axis_camera, self.axis_view)
             self.axis_camera = self.get_hardware_object(new_value)
             image_dimensions = self.axis_camera.get_image_dimensions()
             self.axis_view.setFixedSize(image_dimensions[0], image_dimensions[1])
-            self.connect(self.axis_camera, "imageReceived", self.axis_camera_frame_received)
+            frame_consumers.register_consumer(
+                self.axis_camera,
+                self.axis_view,
+                self.axis_camera_frame_received,
+                self["maxFps"],
+            )
         elif property_name == "hwobj_sc_camera":
+            if self.sc_camera is not None:
+                frame_consumers.unregister_consumer(self.sc_camera, self.sc_view)
             self.sc_camera = self.get_hardware_object(new_value)
             image_dimensions = self.sc_camera.get_image_dimensions()
             self.sc_view.setFixedSize(image_dimensions[0], image_dimensions[1])
-            self.connect(self.sc_camera, "imageReceived", self.sc_camera_frame_received)
-            
+            frame_consumers.register_consumer(
+                self.sc_camera,
+                self.sc_view,
+                self.sc_camera_frame_received,
+                self["maxFps"],
+            )
+        elif property_name == "maxFps":
+            if self.axis_camera is not None:
+                frame_consumers.register_consumer(
+                    self.axis_camera,
+                    self.axis_view,
+                    self.axis_camera_frame_received,
+                    new_value,
+                )
+            if self.sc_camera is not None:
+                frame_consumers.register_consumer(
+                    self.sc_camera,
+                    self.sc_view,
+                    self.sc_camera_frame_received,
+                    new_value,
+                )
         else:
             BaseWidget.property_changed(self, property_name, old_value, new_value)
 
     def camera_live_state_changed(self, state):
-        print state
-        self.axis_camera.set_video_live(state)
-        self.sc_camera.set_video_live(state)
-
-    def axis_camera_frame_received(self, camera_frame):
-        self.axis_camera_pixmap_item.setPixmap(camera_frame)
-
-    def sc_camera_frame_received(self, camera_frame):
-        self.sc_camera_pixmap_item.setPixmap(camera_frame)
+        self.set_video_live(state)
+
+    def set_video_live(self, state):
+        """Video is displayed while the brick is visible"""
+        for camera in (self.axis_camera, self.sc_camera):
+            if camera is not None:
+                frame_consumers.set_video_live(camera, state)
+
+    def axis_camera_frame_received(self, camera_frame, timestamp=None):
+        """Frame is a numpy array, QImage or QPixmap"""
+        self.axis_frame_transport.push_frame(camera_frame, timestamp)
+
+    def sc_camera_frame_received(self, camera_frame, timestamp=None):
+        self.sc_frame_transport.push_frame(camera_frame, timestamp)
+
+    def get_frame_statistics(self):
+        """
+        Returns frames received from the cameras and passed to the views,
+        and frames displayed, dropped, fps and latency of the views
+        """
+        return [
+            frame_consumers.get_statistics(camera)
+            for camera in (self.axis_camera, self.sc_camera)
+            if camera is not None
+        ] + [
+            self.axis_frame_transport.get_statistics(),
+            self.sc_frame_transport.get_statistics(),
+        ]
 
     def sample_changer_status_changed(self, status):
         self.status_ledit.setText(status)
@@ -139,16 +196,14 @@ class SCViewBrick(BaseWidget):
             Colors.set_widget_color(
                  self.status_ledit, Colors.LIGHT_GREEN, QtImport.QPalette.Base
             )
-            self.axis_camera.set_video_live(True)
-            self.sc_camera.set_video_live(True)
+            self.set_video_live(True)
         else:
             self.camera_live_cbx.setEnabled(True)
             Colors.set_widget_color(
                  self.status_ledit, Colors.WHITE, QtImport.QPalette.Base
             )
             if not self.camera_live_cbx.isChecked():
-                self.axis_camera.set_video_live(False)
-                self.sc_camera.set_video_live(False)
+                self.set_video_live(False)
 
     def stop_progress(self, *args):
         self.progress_bar.reset()
@@ -36,6 +36,23 @@ __license__ = "LGPLv3+"
 __category__ = "EMBL"
 
 
+# Colors of grid and compartment table cells
+(
+    CELL_NOT_COLLECTED,
+    CELL_NO_HIT,
+    CELL_HIT,
+    CELL_COLLECTING,
+    CELL_PROCESSING,
+) = range(5)
+CELL_COLORS = (
+    Colors.LIGHT_GRAY,
+    Colors.WHITE,
+    Colors.LIGHT_BLUE,
+    Colors.LIGHT_ORANGE,
+    Colors.DARK_GREEN,
+)
+
+
 class StillCollectionPreviewBrick(BaseWidget):
     def __init__(self, *args):
 
@@ -59,6 +76,10 @@ class StillCollectionPreviewBrick(BaseWidget):
         self.score_type_list = ("score", "spots_resolution", "spots_num")
         self.grid_table_item_fixed = False
         self.comp_table_item_fixed = False
+        self.hit_summary = None
+        # color index of each table cell, -1 if not painted yet
+        self.grid_table_colors = None
+        self.comp_table_colors = None
 
         # Properties ----------------------------------------------------------
         self.add_property("cell_size", "integer", 22)
@@ -210,6 +231,13 @@ class StillCollectionPreviewBrick(BaseWidget):
             for row in range(self.current_chip_config["num_comp_v"]):
                 temp_item = QtImport.QTableWidgetItem()
                 self.grid_table.setItem(row, col, temp_item)
+        self.grid_table_colors = np.full(
+            (
+                self.current_chip_config["num_comp_v"],
+                self.current_chip_config["num_comp_h"],
+            ),
+            -1,
+        )
 
         table_width = (
             self["cell_size"] * (self.current_chip_config["num_comp_h"] + 1) + 4
@@ -237,6 +265,13 @@ class StillCollectionPreviewBrick(BaseWidget):
             for row in range(self.current_chip_config["num_crystal_v"]):
                 temp_item = QtImport.QTableWidgetItem()
                 self.comp_table.setItem(row, col, temp_item)
+        self.comp_table_colors = np.full(
+            (
+                self.current_chip_config["num_crystal_v"],
+                self.current_chip_config["num_crystal_h"],
+            ),
+            -1,
+        )
 
         table_width = (
             self["cell_size"] * (self.current_chip_config["num_crystal_h"] + 1) + 7
@@ -440,6 +475,14 @@ class StillCollectionPreviewBrick(BaseWidget):
         :return: None
         """
         self.score_type = self.score_type_list[index]
+        if self.results is not None:
+            self.hit_summary = CompartmentHitSummary(
+                self.results[self.score_type],
+                self.params_dict["num_images_per_trigger"],
+            )
+            self.hit_summary.update(self.processing_frame_num)
+            self.update_grid_table()
+            self.update_comp_table()
 
     def hit_map_mouse_moved(self, pos_x, pos_y):
         """
@@ -479,6 +522,10 @@ class StillCollectionPreviewBrick(BaseWidget):
 
         self.results = raw_results
         self.params_dict = params_dict
+        self.processing_frame_num = 0
+        self.hit_summary = CompartmentHitSummary(
+            raw_results[self.score_type], params_dict["num_images_per_trigger"]
+        )
         self.hit_map_plot.set_x_axis_limits(
             (0, self.params_dict["num_images_per_trigger"])
         )
@@ -510,6 +557,9 @@ class StillCollectionPreviewBrick(BaseWidget):
         :return: None
         """
         self.processing_frame_num = frame_num
+        if self.hit_summary is not None:
+            self.hit_summary.update(frame_num)
+        self.grid_graphics_overlay.update_processed_frames(frame_num)
         self.update_gui()
         self.grid_graphics_view.scene().update()
 
@@ -532,21 +582,21 @@ class StillCollectionPreviewBrick(BaseWidget):
             return
 
         self.info_dict["collect_comp_num"] = (
-            self.collect_frame_num / self.params_dict["num_images_per_trigger"]
+            self.collect_frame_num // self.params_dict["num_images_per_trigger"]
         )
         self.info_dict["processing_comp_num"] = (
-            self.processing_frame_num / self.params_dict["num_images_per_trigger"]
+            self.processing_frame_num // self.params_dict["num_images_per_trigger"]
         )
 
         collect_grid_cell = (
             self.info_dict["collect_comp_num"]
-            / self.current_chip_config["num_crystal_v"]
-            / self.current_chip_config["num_crystal_h"]
+            // self.current_chip_config["num_crystal_v"]
+            // self.current_chip_config["num_crystal_h"]
         )
         processing_grid_cell = (
             self.info_dict["processing_comp_num"]
-            / self.current_chip_config["num_crystal_v"]
-            / self.current_chip_config["num_crystal_h"]
+            // self.current_chip_config["num_crystal_v"]
+            // self.current_chip_config["num_crystal_h"]
         )
 
         if self.info_dict["collect_grid_cell"] != collect_grid_cell:
@@ -566,7 +616,7 @@ class StillCollectionPreviewBrick(BaseWidget):
             * self.current_chip_config["num_crystal_v"]
             * self.current_chip_config["num_crystal_h"]
             * self.params_dict["num_images_per_trigger"]
-        ) / self.params_dict["num_images_per_trigger"]        
+        ) // self.params_dict["num_images_per_trigger"]
 
         processing_comp_cell = (
             self.processing_frame_num
@@ -574,7 +624,7 @@ class StillCollectionPreviewBrick(BaseWidget):
             * self.current_chip_config["num_crystal_v"]
             * self.current_chip_config["num_crystal_h"]
             * self.params_dict["num_images_per_trigger"]
-        ) / self.params_dict["num_images_per_trigger"]
+        ) // self.params_dict["num_images_per_trigger"]
 
         self.info_dict["collect_comp_cell"] = collect_comp_cell
 
@@ -586,99 +636,92 @@ class StillCollectionPreviewBrick(BaseWidget):
 
     def update_grid_table(self):
         """
-        Updates grid table
+        Updates grid table. Only cells with changed color are repainted
         :return: None
         """
-        if self.params_dict is None or not self.image_tracking_cbox.isChecked():
+        if (
+            self.params_dict is None
+            or self.hit_summary is None
+            or not self.image_tracking_cbox.isChecked()
+        ):
             return
 
-        for row in range(self.current_chip_config["num_comp_v"]):
-            for col in range(self.current_chip_config["num_comp_h"]):
-                grid_table_item = self.grid_table.item(row, col)
-                grid_cell = row * self.current_chip_config["num_comp_v"] + col
-
-                start_index = (
-                    grid_cell
-                    * self.current_chip_config["num_crystal_v"]
-                    * self.current_chip_config["num_crystal_h"]
-                    * self.params_dict["num_images_per_trigger"]
-                )
-                end_index = min(
-                    start_index
-                    + self.current_chip_config["num_crystal_v"]
-                    * self.current_chip_config["num_crystal_h"]
-                    * self.params_dict["num_images_per_trigger"],
-                    self.results[self.score_type].size - 1,
-                )
+        num_comp_v = self.current_chip_config["num_comp_v"]
+        num_comp_h = self.current_chip_config["num_comp_h"]
+        comps_per_cell = (
+            self.current_chip_config["num_crystal_v"]
+            * self.current_chip_config["num_crystal_h"]
+        )
 
-                color = Colors.LIGHT_GRAY
-                if grid_cell == self.info_dict["processing_grid_cell"]:
-                    color = Colors.DARK_GREEN
-                elif grid_cell == self.info_dict["collect_grid_cell"]:
-                    color = Colors.LIGHT_ORANGE
-                elif start_index < self.results[self.score_type].size:
-                    if self.results[self.score_type][start_index:end_index].max() > 0:
-                        color = Colors.LIGHT_BLUE
-                    else:
-                        color = Colors.WHITE
-                grid_table_item.setBackground(color)
+        rows, cols = np.indices((num_comp_v, num_comp_h))
+        grid_cells = rows * num_comp_h + cols
+        colors = np.where(
+            self.hit_summary.get_grid_hits(grid_cells, comps_per_cell),
+            CELL_HIT,
+            CELL_NO_HIT,
+        )
+        colors[
+            ~self.hit_summary.is_collected(grid_cells * comps_per_cell)
+        ] = CELL_NOT_COLLECTED
+        colors[grid_cells == self.info_dict["collect_grid_cell"]] = CELL_COLLECTING
+        colors[grid_cells == self.info_dict["processing_grid_cell"]] = CELL_PROCESSING
+
+        self.grid_table_colors = self.repaint_table_cells(
+            self.grid_table, self.grid_table_colors, colors
+        )
 
     def update_comp_table(self):
         """
-        Updates comp. table
+        Updates comp. table. Only cells with changed color are repainted
         :return: None
         """
-        if self.params_dict is None or not self.image_tracking_cbox.isChecked():
+        if (
+            self.params_dict is None
+            or self.hit_summary is None
+            or not self.image_tracking_cbox.isChecked()
+        ):
             return
 
-        for row in range(self.current_chip_config["num_crystal_h"]):
-            for col in range(self.current_chip_config["num_crystal_v"]):
+        num_crystal_v = self.current_chip_config["num_crystal_v"]
+        num_crystal_h = self.current_chip_config["num_crystal_h"]
 
-                if self.inverted_rows_cbox.isChecked() and row % 2:
-                    table_col = self.current_chip_config["num_crystal_v"] - col - 1
-                else:
-                    table_col = col
+        rows, cols = np.indices((num_crystal_v, num_crystal_h))
+        comp_cells = rows * num_crystal_h + cols
+        comp_indexes = (
+            self.info_dict["processing_grid_cell"] * num_crystal_v * num_crystal_h
+            + comp_cells
+        )
+        colors = np.where(
+            self.hit_summary.get_comp_hits(comp_indexes), CELL_HIT, CELL_NO_HIT
+        )
+        colors[~self.hit_summary.is_collected(comp_indexes)] = CELL_NOT_COLLECTED
+        colors[comp_cells == self.info_dict["processing_comp_cell"]] = CELL_PROCESSING
+        colors[comp_cells == self.info_dict["collect_comp_cell"]] = CELL_COLLECTING
 
-                comp_table_item = self.comp_table.item(row, table_col)
-                start_index = (
-                    self.info_dict["processing_grid_cell"]
-                    * self.current_chip_config["num_crystal_v"]
-                    * self.current_chip_config["num_crystal_h"]
-                    * self.params_dict["num_images_per_trigger"]
-                    + (row * self.current_chip_config["num_crystal_h"] + col)
-                    * self.params_dict["num_images_per_trigger"]
-                )
+        if self.inverted_rows_cbox.isChecked():
+            colors[1::2] = colors[1::2, ::-1]
 
-                end_index = min(
-                    start_index + self.params_dict["num_images_per_trigger"],
-                    self.results[self.score_type].size - 1,
-                )
-                color = Colors.LIGHT_GRAY
-                if (
-                    self.info_dict["collect_comp_cell"]
-                    == row * self.current_chip_config["num_crystal_h"] + col
-                ):
-                    color = Colors.LIGHT_ORANGE
-                elif (
-                    self.info_dict["processing_comp_cell"]
-                    == row * self.current_chip_config["num_crystal_h"] + col
-                ):
-                    color = Colors.DARK_GREEN
-                elif start_index < self.results[self.score_type].size:
-                    if start_index != end_index:
-                        if (
-                            self.results[self.score_type][start_index:end_index].max()
-                            > 0
-                        ):
-                            color = Colors.LIGHT_BLUE
-                        else:
-                            color = Colors.WHITE
-                    else:
-                        if self.results[self.score_type][start_index] > 0:
-                            color = Colors.LIGHT_BLUE
-                        else:
-                            color = Colors.WHITE
-                comp_table_item.setBackground(color)
+        self.comp_table_colors = self.repaint_table_cells(
+            self.comp_table, self.comp_table_colors, colors
+        )
+
+    def repaint_table_cells(self, table, table_colors, colors):
+        """
+        Sets background of table cells whose color index changed
+        :param table: QTableWidget
+        :param table_colors: array with color indexes of painted cells
+        :param colors: array with new color indexes (rows, cols)
+        :return: array with color indexes of painted cells
+        """
+        num_rows = min(table_colors.shape[0], colors.shape[0])
+        num_cols = min(table_colors.shape[1], colors.shape[1])
+        colors = colors[:num_rows, :num_cols]
+        for row, col in zip(
+            *np.nonzero(table_colors[:num_rows, :num_cols] != colors)
+        ):
+            table.item(row, col).setBackground(CELL_COLORS[colors[row, col]])
+        table_colors[:num_rows, :num_cols] = colors
+        return table_colors
 
     def update_stats(self):
         return
@@ -686,6 +729,69 @@ class StillCollectionPreviewBrick(BaseWidget):
         #    print(key, self.results[key].min(), self.results[key].max())
 
 
+class CompartmentHitSummary(object):
+    """
+    Hit flags of compartments (images of one trigger), updated
+    incrementally for newly processed frames
+    """
+
+    def __init__(self, scores, images_per_comp):
+        """
+        :param scores: one dimensional array with scores of all images
+        :param images_per_comp: number of images of one compartment
+        """
+        self.scores = scores
+        self.images_per_comp = max(int(images_per_comp), 1)
+        self.num_comps = -(-scores.size // self.images_per_comp)
+        self.comp_hits = np.zeros(self.num_comps, dtype=bool)
+        self.num_processed_frames = 0
+
+    def update(self, frame_num):
+        """
+        Updates hit flags of compartments with frames processed since
+        the last update
+        :param frame_num: number of processed frames
+        :return: None
+        """
+        frame_num = min(int(frame_num), self.scores.size)
+        if frame_num <= self.num_processed_frames:
+            return
+        # first compartment is recomputed as it may be partially processed
+        first_comp = self.num_processed_frames // self.images_per_comp
+        start_index = first_comp * self.images_per_comp
+        comp_starts = np.arange(start_index, frame_num, self.images_per_comp)
+        comp_maxima = np.maximum.reduceat(
+            self.scores[start_index:frame_num], comp_starts - start_index
+        )
+        self.comp_hits[first_comp : first_comp + comp_starts.size] = comp_maxima > 0
+        self.num_processed_frames = frame_num
+
+    def is_collected(self, comp_indexes):
+        """Returns bool array, True if the compartment has images"""
+        return np.asarray(comp_indexes) < self.num_comps
+
+    def get_comp_hits(self, comp_indexes):
+        """Returns bool array, True if the compartment contains a hit"""
+        comp_indexes = np.asarray(comp_indexes)
+        valid = comp_indexes < self.num_comps
+        hits = np.zeros(comp_indexes.shape, dtype=bool)
+        hits[valid] = self.comp_hits[comp_indexes[valid]]
+        return hits
+
+    def get_grid_hits(self, grid_cells, comps_per_cell):
+        """Returns bool array, True if a compartment of grid cell has a hit"""
+        num_cells = -(-self.num_comps // comps_per_cell)
+        padded_hits = np.zeros(num_cells * comps_per_cell, dtype=bool)
+        padded_hits[: self.num_comps] = self.comp_hits
+        cell_hits = padded_hits.reshape(num_cells, comps_per_cell).any(axis=1)
+
+        grid_cells = np.asarray(grid_cells)
+        valid = grid_cells < num_cells
+        hits = np.zeros(grid_cells.shape, dtype=bool)
+        hits[valid] = cell_hits[grid_cells[valid]]
+        return hits
+
+
 class GridViewGraphicsItem(QtImport.QGraphicsItem):
     """
     Class to represent full grid
@@ -724,6 +830,8 @@ class GridViewGraphicsItem(QtImport.QGraphicsItem):
         self.size_chip_x = None
         self.size_chip_y = None
         self.images_per_crystal = 1
+        # item is painted into this image and the image is blitted
+        self.cached_image = None
 
     def boundingRect(self):
         """Returns adjusted rect
@@ -733,27 +841,57 @@ class GridViewGraphicsItem(QtImport.QGraphicsItem):
         return self.rect.adjusted(0, 0, 40, 40)
 
     def paint(self, painter, option, widget):
-        """Main beam painter method
-           Draws ellipse or rectangle with a cross in the middle
-        """
-        if self.size_hole:
-            self.custom_brush.setColor(QtImport.Qt.lightGray)
-            painter.setBrush(self.custom_brush)
-            for comp_y in range(self.num_comp_y):
-                for comp_x in range(self.num_comp_x):
-                    for hole_y in range(1, self.num_holes_y + 1):
-                        for hole_x in range(1, self.num_holes_x + 1):
-                            # comp_y = self.num_comp_y - comp_y + 1
-                            hole_y = self.num_holes_y - hole_y + 1
-                            corner_x = (
-                                comp_x * (self.size_comp_x + self.offset_comp)
-                            ) + (hole_x * (self.size_hole + self.offset_hole))
-                            corner_y = (
-                                comp_y * (self.size_comp_y + self.offset_comp)
-                            ) + (hole_y * (self.size_hole + self.offset_hole))
-                            painter.drawRect(
-                                corner_x, corner_y, self.size_hole, self.size_hole
-                            )
+        """
+        Blits the cached image of the item. Image is rendered when
+        the item is initialized
+        """
+        if self.cached_image is None and self.size_hole:
+            self.cached_image = self.create_cached_image()
+            self.render_cached_image()
+        if self.cached_image is not None:
+            painter.drawImage(0, 0, self.cached_image)
+
+    def create_cached_image(self):
+        """Returns transparent image of the size of the item"""
+        image = QtImport.QImage(
+            int(self.boundingRect().width()) + 1,
+            int(self.boundingRect().height()) + 1,
+            QtImport.QImage.Format_ARGB32_Premultiplied,
+        )
+        image.fill(QtImport.Qt.transparent)
+        return image
+
+    def draw_holes(self, corners_x, corners_y, color):
+        """Draws holes at corner coordinates in the cached image"""
+        if not len(corners_x):
+            return
+        self.custom_brush.setColor(color)
+        painter = QtImport.QPainter(self.cached_image)
+        painter.setBrush(self.custom_brush)
+        painter.drawRects(
+            [
+                QtImport.QRectF(corner_x, corner_y, self.size_hole, self.size_hole)
+                for corner_x, corner_y in zip(corners_x, corners_y)
+            ]
+        )
+        painter.end()
+
+    def render_cached_image(self):
+        """Draws all holes of the chip"""
+        comp_y, comp_x, hole_y, hole_x = np.meshgrid(
+            np.arange(self.num_comp_y),
+            np.arange(self.num_comp_x),
+            np.arange(1, self.num_holes_y + 1),
+            np.arange(1, self.num_holes_x + 1),
+            indexing="ij",
+        )
+        corners_x = comp_x * (self.size_comp_x + self.offset_comp) + hole_x * (
+            self.size_hole + self.offset_hole
+        )
+        corners_y = comp_y * (self.size_comp_y + self.offset_comp) + hole_y * (
+            self.size_hole + self.offset_hole
+        )
+        self.draw_holes(corners_x.ravel(), corners_y.ravel(), QtImport.Qt.lightGray)
 
     def init_item(self, params_dict, results=None):
         """
@@ -780,6 +918,9 @@ class GridViewGraphicsItem(QtImport.QGraphicsItem):
         self.size_chip_y = (self.size_comp_y + self.offset_comp) * (
             self.num_comp_y + 0.5
         )
+        self.prepareGeometryChange()
+        self.rect = QtImport.QRectF(0, 0, self.size_chip_x, self.size_chip_y)
+        self.cached_image = None
 
         self.scene().setSceneRect(0, 0, self.size_chip_x + 10, self.size_chip_y + 10)
 
@@ -796,16 +937,23 @@ class GridViewGraphicsItem(QtImport.QGraphicsItem):
 
 class GridViewOverlayItem(GridViewGraphicsItem):
     """
-    Overlay to draw fits over the grid view
+    Overlay to draw hits over the grid view. Hits of newly processed
+    frames are drawn into the cached image (see update_processed_frames)
     """
 
+    def __init__(self):
+        GridViewGraphicsItem.__init__(self)
+        # number of frames drawn in the cached image
+        self.num_drawn_frames = 0
+
     def calc_hole_coordinates(self, image_index):
         """
         Calculates hole coordinates
-        :param img_index:
-        :return:
+        :param image_index: int or numpy array of image indexes
+        :return: tuple of ints (or arrays) comp_x, comp_y, hole_x, hole_y,
+                 timepoint_x, timepoint_y
         """
-        image_index = int(image_index)
+        image_index = np.asarray(image_index, dtype=int)
         image_number = image_index // self.images_per_crystal
 
         comp_serial = image_number // (self.num_holes_x * self.num_holes_y)
@@ -819,60 +967,66 @@ class GridViewOverlayItem(GridViewGraphicsItem):
         timepoint_x = timepoint_serial % 2 + 1
         timepoint_y = timepoint_serial // 2 + 1
 
-        if not hole_y & 1:
-            hole_x = self.num_holes_x - hole_x + 1
+        # even rows are scanned backwards
+        hole_x = np.where(hole_y & 1, hole_x, self.num_holes_x - hole_x + 1)
 
         return (comp_x, comp_y, hole_x, hole_y, timepoint_x, timepoint_y)
 
-    def paint(self, painter, option, widget):
+    def calc_hit_corners(self, image_indexes):
         """
-        Main pain method
-        :param painter:
-        :param option:
-        :param widget:
-        :return:
+        Returns x and y arrays of corners of holes of images
+        (only the first row of time points is drawn)
         """
-        self.custom_brush.setColor(QtImport.Qt.blue)
-        painter.setBrush(self.custom_brush)
+        comp_x, comp_y, hole_x, hole_y, timepoint_x, timepoint_y = self.calc_hole_coordinates(
+            image_indexes
+        )
+        first_row = timepoint_y <= 1
+        corners_x = (
+            comp_x * (self.size_comp_x + self.offset_comp)
+            + (hole_x * (self.size_hole + self.offset_hole))
+            + ((timepoint_x - 1) * self.size_hole)
+        )
+        corners_y = (
+            comp_y * (self.size_comp_y + self.offset_comp)
+            + (hole_y * (self.size_hole + self.offset_hole))
+            + ((timepoint_y - 1) * self.size_hole)
+        )
+        return corners_x[first_row], corners_y[first_row]
 
-        def draw_hole_timeseries(
-            comp_x, comp_y, hole_x, hole_y, subpixel_x, subpixel_y
-        ):
-            """
-            Draws holes
-            :param comp_x:
-            :param comp_y:
-            :param hole_x:
-            :param hole_y:
-            :param subpixel_x:
-            :param subpixel_y:
-            :return:
-            """
-            # comp_y = self.num_comp_y - comp_y +1
-            # hole_y        = self.num_holes_y - hole_y +1
-            # subpixel_y    = self.no_subpixels_y - subpixel_y +1
-
-            corner_x = (
-                comp_x * (self.size_comp_x + self.offset_comp)
-                + (hole_x * (self.size_hole + self.offset_hole))
-                + ((subpixel_x - 1) * self.size_hole)
-            )
+    def render_cached_image(self):
+        """Draws hits of all frames processed so far"""
+        num_drawn_frames = self.num_drawn_frames
+        self.num_drawn_frames = 0
+        self.update_processed_frames(num_drawn_frames)
 
-            corner_y = (
-                comp_y * (self.size_comp_y + self.offset_comp)
-                + (hole_y * (self.size_hole + self.offset_hole))
-                + ((subpixel_y - 1) * self.size_hole)
-            )
+    def update_processed_frames(self, frame_num):
+        """
+        Draws hits of frames processed since the last call
+        :param frame_num: number of processed frames
+        :return: None
+        """
+        if self.results is None or not self.size_hole:
+            return
+        if self.cached_image is None:
+            # all processed frames are drawn at the next paint
+            self.num_drawn_frames = max(self.num_drawn_frames, frame_num)
+            return
+
+        scores = self.results["score"]
+        frame_num = min(int(frame_num), scores.size)
+        if frame_num <= self.num_drawn_frames:
+            return
 
-            painter.drawRect(corner_x, corner_y, self.size_hole, self.size_hole)
+        hits = np.flatnonzero(scores[self.num_drawn_frames : frame_num] > 0)
+        self.draw_holes(
+            *self.calc_hit_corners(hits + self.num_drawn_frames),
+            color=QtImport.Qt.blue
+        )
+        self.num_drawn_frames = frame_num
+        self.update()
 
-        if self.results is not None:
-            hitlist = np.where(self.results["score"] > 0)[0]
-            for hit in hitlist:
-                comp_x, comp_y, hole_x, hole_y, timepoint_x, timepoint_y = self.calc_hole_coordinates(
-                    hit
-                )
-                if timepoint_y <= 1:
-                    draw_hole_timeseries(
-                        comp_x, comp_y, hole_x, hole_y, timepoint_x, timepoint_y
-                    )
+    def set_results(self, params_dict, results):
+        GridViewGraphicsItem.set_results(self, params_dict, results)
+        self.num_drawn_frames = 0
+        self.cached_image = None
+        self.update()
@@ -20,8 +20,11 @@
 from HardwareRepository.HardwareObjects import InstanceServer
 from gui.BaseComponents import BaseWidget
 from gui.utils import Colors, Icons, QtImport
+from gui.utils.brick_change_queue import DEFAULT_INTERVAL
+from gui.utils.instance_mirror import MirrorBatcher, apply_message, get_update_method
 import os
 import sys
+import time
 import smtplib
 import gevent
 import logging
@@ -125,6 +128,12 @@ class InstanceListBrick(BaseWidget):
         self.add_property("giveControlTimeout", "integer", 30)
         self.add_property("initializeServer", "boolean", False)
         self.add_property("controlEmails", "string", "")
+        self.add_property(
+            "mirrorTick",
+            "integer",
+            DEFAULT_INTERVAL,
+            comment="Interval in ms during which mirrored changes are coalesced",
+        )
 
         # Properties to link hwobj --------------------------------------------
         self.add_property("hwobj_instance_connection", "string", "/instanceconnection")
@@ -147,6 +156,8 @@ class InstanceListBrick(BaseWidget):
         self.my_proposal = None
         self.in_control = None
         self.connections = {}
+        self.mirror_batcher = MirrorBatcher(self.send_mirror_message, parent=self)
+        self._mirror_bricks = None
         self.server_icon = Icons.load_icon("Home2")
         self.client_icon = Icons.load_icon("User2")
 
@@ -329,6 +340,9 @@ class InstanceListBrick(BaseWidget):
                     self.instance_server_hwobj, "clientClosed", self.client_closed
                 )
                 self.connect(self.instance_server_hwobj, "widgetCall", self.widget_call)
+        elif property_name == "mirrorTick":
+            # single coalescing layer: the batcher sends what the queue delivers
+            BaseWidget.get_brick_change_queue().interval = new_value
         elif property_name == "hwobj_xmlrpc_server":
             self.xmlrpc_server = self.get_hardware_object(new_value)
         elif property_name == "hwobj_hutch_trigger":
@@ -446,14 +460,7 @@ class InstanceListBrick(BaseWidget):
             local = BaseWidget.INSTANCE_LOCATION_EXTERNAL
         BaseWidget.set_instance_location(local)
 
-        for widget in QtImport.QApplication.allWidgets():
-            try:
-                if hasattr(widget, "configuration"):
-                    active_window = widget
-                    break
-            except NameError:
-                logging.getLogger().warning("Widget {} has no attribute {}"
-                                            .format(widget, "configuration"))
+        active_window = BaseWidget.get_top_level_widget()
         active_window.brickChangedSignal.connect(self.application_brick_changed)
         active_window.tabChangedSignal.connect(self.application_tab_changed)
 
@@ -539,6 +546,10 @@ class InstanceListBrick(BaseWidget):
         )
 
     def widget_update(self, timestamp, method, method_args, master_sync=True):
+        if method == self.apply_mirror_message:
+            method(*method_args)
+            return
+
         if self.instance_server_hwobj.isServer():
             BaseWidget.add_event_to_cache(timestamp, method, *method_args)
             if not master_sync or BaseWidget.should_run_event():
@@ -584,6 +595,61 @@ class InstanceListBrick(BaseWidget):
             else:
                 BaseWidget.add_event_to_cache(timestamp, method, *method_args)
 
+    def send_mirror_message(self, message):
+        """
+        Sends widget updates and tab changes batched by the mirror batcher
+        as one call of apply_mirror_message in the other instances
+        """
+        if self.instance_server_hwobj is None:
+            return
+        self.instance_server_hwobj.sendBrickUpdateMessage(
+            self.objectName(), "", "apply_mirror_message", (message,), False
+        )
+        statistics = self.mirror_batcher.get_statistics()
+        self.users_listwidget.setToolTip(
+            "Mirroring: %.1f messages/s, %.0f bytes/s"
+            % (statistics["messages_per_second"], statistics["bytes_per_second"])
+        )
+
+    def get_mirror_statistics(self):
+        """Returns updates, messages and bytes (per second) sent"""
+        return self.mirror_batcher.get_statistics()
+
+    def apply_mirror_message(self, message):
+        """Applies widget updates and tab changes sent by another instance"""
+        if message.get("snapshot") and BaseWidget.is_instance_mode_master():
+            # state of the instance in control is the reference
+            return
+        # snapshots are broadcast: only values not yet applied are kept
+        message = self.mirror_batcher.record_message(message)
+        self._mirror_bricks = dict(
+            (brick.objectName(), brick) for brick in BaseWidget.get_bricks()
+        )
+        try:
+            apply_message(message, self.apply_mirror_update, self.apply_mirror_tab)
+        finally:
+            self._mirror_bricks = None
+
+    def apply_mirror_update(
+        self, brick_name, widget_name, method_name, method_args, master_sync
+    ):
+        method = get_update_method(
+            self._mirror_bricks, brick_name, widget_name, method_name
+        )
+        if method is None:
+            logging.getLogger().debug(
+                "Could not mirror %s.%s.%s", brick_name, widget_name, method_name
+            )
+            return
+        self.widget_update(time.time(), method, method_args, master_sync)
+
+    def apply_mirror_tab(self, tab_name, tab_index):
+        for window in QtImport.QApplication.topLevelWidgets():
+            tab_widget = window.findChild(QtImport.QTabWidget, tab_name)
+            if tab_widget is not None:
+                tab_widget.setCurrentIndex(tab_index)
+                return
+
     def widget_call(self, timestamp, method, method_args):
         try:
             method(*method_args)
@@ -679,6 +745,9 @@ class InstanceListBrick(BaseWidget):
         )
         item.setFlags(QtImport.Qt.ItemIsEnabled)
         self.connections[client_id[0]] = (item, client_id[1])
+        # new client gets the GUI state at once. The snapshot is sent to
+        # every client, those already up to date do not apply it again
+        self.mirror_batcher.send_snapshot()
 
     def client_closed(self, client_id):
         try:
@@ -968,7 +1037,7 @@ class InstanceListBrick(BaseWidget):
                     self.instance_server_hwobj.initializeInstance()
 
             elif event.type() == APP_BRICK_EVENT:
-                self.instance_server_hwobj.sendBrickUpdateMessage(
+                self.mirror_batcher.add_update(
                     event.brick_name,
                     event.widget_name,
                     event.method_name,
@@ -977,9 +1046,7 @@ class InstanceListBrick(BaseWidget):
                 )
 
             elif event.type() == APP_TAB_EVENT:
-                self.instance_server_hwobj.sendTabUpdateMessage(
-                    event.tab_name, event.tab_index
-                )
+                self.mirror_batcher.add_tab(event.tab_name, event.tab_index)
 
             elif event.type() == MSG_DIALOG_EVENT:
                 msg_dialog = QtImport.QMessageBox(
@@ -78,8 +78,13 @@ class LogBarBrick(BaseWidget):
             BaseWidget.property_changed(self, property_name, old_value, new_value)
 
     def customEvent(self, event):
-        """Event to add a new log record"""
-        self.append_log_record(event.record)
+        """Event to add a batch of new log records"""
+        self.append_log_records(event.records)
+
+    def append_log_records(self, records):
+        """Appends log records delivered by the GUI log handler"""
+        for record in records:
+            self.append_log_record(record)
 
     def append_log_record(self, record):
         """Appends a new log line to the text edit
@@ -34,7 +34,7 @@ The LogView brick displays log messages from the application.
 |  enableFeedback | boolean | adds a new tab for mail feedback feature
 |  emailAddresses | string  | list separated by spaces of email addresses for the feedback feature
 |  icons          | string  | <icon for tab 1> <icon for tab 2> ... <icon for tab n> <feedback icon>
-|  maxLogLines    | integer | max. log lines, negative value : infinite log
+|  maxLogLines    | integer | max. log lines, negative value : 100000 lines
 |  autoSwitchTabs | boolean | automatically switch to appropriate tab when a new message is logged
 ----------------------------------------------------------------
 
@@ -72,6 +72,7 @@ import smtplib
 
 from gui.utils import Icons, Colors, GUILogHandler, QtImport
 from gui.BaseComponents import BaseWidget
+from gui.widgets.log_view_widget import LogTableView
 
 
 __credits__ = ["MXCuBE collaboration"]
@@ -79,73 +80,6 @@ __license__ = "LGPLv3+"
 __category__ = "Log"
 
 
-class CustomTreeWidget(QtImport.QTreeWidget):
-    def __init__(self, parent, tab_label):
-        QtImport.QTreeWidget.__init__(self, parent)
-
-        self.setSizePolicy(QtImport.QSizePolicy.Minimum, QtImport.QSizePolicy.Expanding)
-        self.tab_label = tab_label
-        self.unread_messages = 0
-        self.max_log_lines = None
-
-        self.setColumnCount(4)
-        self.setRootIsDecorated(False)
-        self.setHeaderLabels(["Level", "Date", "Time", "Message"])
-
-        self.contextMenuEvent = self.show_context_menu
-        self.clipboard = QtImport.QApplication.clipboard()
-
-    def add_log_line(self, record):
-        msg = record.getMessage().replace("\n", " ").strip()
-        info_str_list = []
-
-        info_str_list.append(record.getLevelName())
-        info_str_list.append(record.getDate())
-        info_str_list.append(record.getTime())
-        info_str_list.append(msg)
-        new_item = QtImport.QTreeWidgetItem(info_str_list)
-        self.addTopLevelItem(new_item)
-        if self.topLevelItemCount() % 10 == 0:
-            for col in range(4):
-                new_item.setBackground(col, QtImport.QBrush(Colors.LIGHT_2_GRAY))
-
-        if self.max_log_lines and self.max_log_lines > 0:
-            if self.topLevelItemCount() > self.max_log_lines:
-                self.takeTopLevelItem(0)
-        self.scrollToBottom()
-
-    def set_max_log_lines(self, max_log_lines):
-        self.max_log_lines = max_log_lines
-
-    def show_context_menu(self, context_menu_event):
-        menu = QtImport.QMenu(self)
-        menu.addAction("Clear", self.clear)
-        menu.addAction("Copy", self.copy_log)
-        menu.addAction("Save log", self.save_log)
-        menu.popup(QtImport.QCursor.pos())
-
-    def copy_log(self):
-        self.clipboard.clear(mode=self.clipboard.Clipboard)
-        text = ""
-        for item_index in range(self.topLevelItemCount()):
-            for col in range(4):
-                text += "%s%s" % (self.topLevelItem(item_index).text(col), chr(9))
-            text += "\n"
-        self.clipboard.setText(text, mode=self.clipboard.Clipboard)
-
-    def save_log(self):
-        self.copy_log()
-        filename = str(
-            QtImport.QFileDialog.getSaveFileName(
-                self, "Choose a filename to save under", "/tmp"
-            )
-        )
-        if len(filename) > 0:
-            log_file = open(filename, "w")
-            log_file.write(self.clipboard.text())
-            log_file.close()
-
-
 class Submitfeedback(QtImport.QWidget):
     """Widget to submit a feedback email
     """
@@ -305,9 +239,15 @@ class LogViewBrick(BaseWidget):
         # Graphic elements ----------------------------------------------------
         self.tab_widget = QtImport.QTabWidget(self)
 
-        self.details_log = CustomTreeWidget(self.tab_widget, "Errors and warnings")
-        self.info_log = CustomTreeWidget(self.tab_widget, "Information")
-        self.debug_log = CustomTreeWidget(self.tab_widget, "Debug")
+        self.details_log = LogTableView(
+            self.tab_widget, "Errors and warnings", highlight_color=Colors.LIGHT_2_GRAY
+        )
+        self.info_log = LogTableView(
+            self.tab_widget, "Information", highlight_color=Colors.LIGHT_2_GRAY
+        )
+        self.debug_log = LogTableView(
+            self.tab_widget, "Debug", highlight_color=Colors.LIGHT_2_GRAY
+        )
         self.feedback_log = Submitfeedback(
             self.tab_widget, self["emailAddresses"], "Submit feedback"
         )
@@ -351,13 +291,9 @@ class LogViewBrick(BaseWidget):
         self.tab_widget.currentChanged.connect(self.resetUnreadMessages)
 
     def clearLog(self):
-        self.details_log.clear()
-        self.info_log.clear()
-        self.debug_log.clear()
-
-        self.details_log.unread_messages = 0
-        self.info_log.unread_messages = 0
-        self.debug_log.unread_messages = 0
+        for tab in (self.details_log, self.info_log, self.debug_log):
+            tab.clear()
+            tab.unread_messages = 0
 
     def tabSelected(self, tab_name):
         if self["appearance"] == "list":
@@ -365,28 +301,7 @@ class LogViewBrick(BaseWidget):
                 self.resetUnreadMessagesSignal.emit(True)
 
     def append_log_record(self, record):
-        rec_level = record.getLevel()
-
-        if rec_level == logging.DEBUG and not self["showDebug"]:
-            return
-        else:
-            if rec_level < self.filter_level:
-                return
-
-        tab = self.tab_levels[rec_level]
-        level = None
-        tab.add_log_line(record)
-
-        if self["appearance"] == "tabs":
-            if self.tab_widget.currentWidget() != tab:
-                if self["autoSwitchTabs"]:
-                    self.tab_widget.setCurrentWidget(tab)
-                else:
-                    tab.unread_messages += 1
-                    tab_label = "%s (%d)" % (tab.tab_label, tab.unread_messages)
-                    self.tab_widget.setTabText(self.tab_widget.indexOf(tab), tab_label)
-        elif self["appearance"] == "list":
-            self.incUnreadMessagesSignal.emit(1, True)
+        self.append_log_records([record])
 
     def resetUnreadMessages(self, tab_index):
         selected_tab = self.tab_widget.widget(tab_index)
@@ -395,7 +310,40 @@ class LogViewBrick(BaseWidget):
 
     def customEvent(self, event):
         if self.is_running():
-            self.append_log_record(event.record)
+            self.append_log_records(event.records)
+
+    def append_log_records(self, records):
+        accepted_records = []
+        tab_records = {}
+        for record in records:
+            rec_level = record.getLevel()
+            if rec_level == logging.DEBUG and not self["showDebug"]:
+                continue
+            elif rec_level < self.filter_level:
+                continue
+            accepted_records.append(record)
+            tab_records.setdefault(self.tab_levels[rec_level], []).append(record)
+
+        if not accepted_records:
+            return
+
+        # Records of a tab are inserted at once and views are scrolled once
+        for tab, tab_record_list in tab_records.items():
+            num_messages = len(tab_record_list)
+            tab.append_records(tab_record_list)
+            tab.scrollToBottom()
+            if self["appearance"] == "tabs":
+                if self.tab_widget.currentWidget() != tab:
+                    if self["autoSwitchTabs"]:
+                        self.tab_widget.setCurrentWidget(tab)
+                    else:
+                        tab.unread_messages += num_messages
+                        tab_label = "%s (%d)" % (tab.tab_label, tab.unread_messages)
+                        self.tab_widget.setTabText(
+                            self.tab_widget.indexOf(tab), tab_label
+                        )
+        if self["appearance"] == "list":
+            self.incUnreadMessagesSignal.emit(len(accepted_records), True)
 
     def blockSignals(self, block):
         pass
@@ -453,8 +401,7 @@ class LogViewBrick(BaseWidget):
                 }
 
         elif property_name == "maxLogLines":
-            self.details_log.set_max_log_lines(new_value)
-            self.info_log.set_max_log_lines(new_value)
-            self.debug_log.set_max_log_lines(new_value)
+            for tab in (self.details_log, self.info_log, self.debug_log):
+                tab.set_max_log_lines(new_value)
         else:
             BaseWidget.property_changed(self, property_name, old_value, new_value)
@@ -17,12 +17,16 @@
 #  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
 
 # import os
+import os
 import logging
+import functools
 # from collections import namedtuple
 
 from gui.BaseComponents import BaseWidget
-from gui.utils import queue_item, Colors, QtImport
+from gui.utils import queue_item, Colors, QtImport, lims_sample_sync
 from gui.utils.sample_changer_helper import SC_STATE_COLOR, SampleChanger
+from gui.utils.sample_reconciliation import reconcile_samples
+from gui.utils.tree_index import TREE_FILTER_OPTIONS, TEXT_FILTER_OPTIONS
 from gui.widgets.dc_tree_widget import DataCollectTree
 
 from HardwareRepository.HardwareObjects.queue_model_enumerables import CENTRING_METHOD
@@ -83,6 +87,8 @@ class TreeBrick(BaseWidget):
         self.is_logged_in = False
         self.lims_samples = None
         self.filtered_lims_samples = None
+        self.lims_sample_sync = None
+        self.sample_reconciliation_report = None
         self.compression_state = True
         self.queue_autosave_action = None
         self.queue_undo_action = None
@@ -102,6 +108,7 @@ class TreeBrick(BaseWidget):
         self.add_property("useHistoryView", "boolean", True)
         self.add_property("useCentringMethods", "boolean", True)
         self.add_property("enableQueueAutoSave", "boolean", True)
+        self.add_property("cacheLimsSamples", "boolean", True)
 
         # Properties to initialize hardware objects --------------------------
         self.add_property("hwobj_state_machine", "string", "")
@@ -161,6 +168,9 @@ class TreeBrick(BaseWidget):
         # self.sample_changer_widget.synch_button.setText("Synch ISPyB")
 
         self.dc_tree_widget = DataCollectTree(self)
+        self.filter_text_timer = QtImport.QTimer(self)
+        self.filter_text_timer.setSingleShot(True)
+        self.filter_text_timer.setInterval(250)
         self.dc_tree_widget.selection_changed_cb = self.selection_changed_cb
         self.dc_tree_widget.run_cb = self.run
         # self.dc_tree_widget.clear_centred_positions_cb = \
@@ -199,6 +209,7 @@ class TreeBrick(BaseWidget):
         self.sample_changer_widget.sample_combo.activated.connect(
             self.sample_combo_changed
         )
+        self.filter_text_timer.timeout.connect(self.apply_text_filter)
 
         # Other ---------------------------------------------------------------
         self.enable_collect(True)
@@ -439,6 +450,8 @@ class TreeBrick(BaseWidget):
         """
 
         self.is_logged_in = logged_in
+        # samples of the previous session must not be applied
+        self.cancel_lims_sample_sync()
         # self.enable_collect(logged_in)
 
         # if not logged_in:
@@ -628,19 +641,113 @@ class TreeBrick(BaseWidget):
     def refresh_sample_list(self):
         """
         Retrives sample information from ISPyB and populates the sample list
-        accordingly.
+        accordingly. Samples cached for the session are displayed at once,
+        ISPyB is queried in the background and only the differences are
+        applied when it answers.
         """
-        log = logging.getLogger("user_level_log")
+        proposal_id = HWR.beamline.session.proposal_id
+        session_id = HWR.beamline.session.session_id
+
+        if self.lims_sample_sync is None:
+            cache_dir = None
+            user_file_directory = getattr(self, "user_file_directory", None)
+            if self["cacheLimsSamples"] and user_file_directory:
+                cache_dir = os.path.join(
+                    user_file_directory, lims_sample_sync.CACHE_DIRECTORY_NAME
+                )
+            self.lims_sample_sync = lims_sample_sync.LimsSampleSync(
+                HWR.beamline.lims, cache_dir
+            )
 
-        self.lims_samples = HWR.beamline.lims.get_samples(
-            HWR.beamline.session.proposal_id, HWR.beamline.session.session_id
+        cached_samples = self.lims_sample_sync.load_cached_samples(
+            proposal_id, session_id
         )
+        if cached_samples is not None:
+            self.set_lims_samples(cached_samples)
+        else:
+            self.lims_samples = None
 
-        basket_list = []
-        sample_list = []
-        self.filtered_lims_samples = []
-        sample_changer = None
+        self.lims_sample_sync.fetch_samples(
+            proposal_id,
+            session_id,
+            functools.partial(self.lims_samples_received, self.get_lims_sync_key()),
+        )
+
+    def get_lims_sync_key(self):
+        """Session and mount mode the LIMS samples are retrieved for"""
+        return (
+            HWR.beamline.session.proposal_id,
+            HWR.beamline.session.session_id,
+            self.dc_tree_widget.sample_mount_method,
+        )
+
+    def cancel_lims_sample_sync(self):
+        if self.lims_sample_sync is not None:
+            self.lims_sample_sync.cancel()
+
+    def lims_samples_received(self, sync_key, lims_samples):
+        """Applies the differences between the displayed and ISPyB samples"""
+        if sync_key != self.get_lims_sync_key():
+            logging.getLogger("GUI").debug(
+                "Samples retrieved from ISPyB for another session or mount mode"
+            )
+            return
+        logging.getLogger("GUI").debug(
+            "Samples retrieved from ISPyB in %.2f s", self.lims_sample_sync.fetch_time
+        )
+
+        if self.lims_samples is None:
+            if self.confirm_sample_list_update(sync_key):
+                self.set_lims_samples(lims_samples)
+            return
+
+        diff = lims_sample_sync.diff_samples(self.lims_samples, lims_samples)
+        if diff.is_empty():
+            return
+        logging.getLogger("GUI").debug(
+            "Sample list changed in ISPyB: %s", diff.as_dict()
+        )
+        if (
+            diff.added
+            or diff.removed
+            or not self.dc_tree_widget.update_samples_from_lims(diff.changed)
+        ):
+            if self.confirm_sample_list_update(sync_key):
+                self.set_lims_samples(lims_samples)
+        else:
+            self.lims_samples = lims_samples
+            self.update_sample_combo()
+
+    def confirm_sample_list_update(self, sync_key):
+        """
+        Repopulating the sample list clears the queue. If the queue has
+        tasks the user is asked first. Returns True if the sample list can
+        be repopulated
+        """
+        if not self.dc_tree_widget.has_tasks():
+            return True
 
+        result = QtImport.QMessageBox.question(
+            self,
+            "Sample list changed in ISPyB",
+            "Samples were added or removed in ISPyB. Updating the sample "
+            + "list removes all tasks from the queue.\n"
+            + "Update the sample list now?",
+            QtImport.QMessageBox.Yes | QtImport.QMessageBox.No,
+            QtImport.QMessageBox.No,
+        )
+        if result != QtImport.QMessageBox.Yes:
+            logging.getLogger("GUI").warning(
+                "Sample list not updated from ISPyB, "
+                + "synchronise with ISPyB again to update it"
+            )
+            return False
+        # session or mount mode may have changed while the user was asked
+        return sync_key == self.get_lims_sync_key()
+
+    def update_sample_combo(self):
+        """Lists the LIMS samples with a sample changer location"""
+        self.filtered_lims_samples = []
         self.sample_changer_widget.sample_combo.clear()
         for sample in self.lims_samples:
             try:
@@ -655,6 +762,20 @@ class TreeBrick(BaseWidget):
         self.sample_changer_widget.sample_combo.setEnabled(True)
         self.sample_changer_widget.sample_combo.setCurrentIndex(-1)
 
+    def set_lims_samples(self, lims_samples):
+        """
+        Matches LIMS samples with the sample changer content and populates
+        the sample list
+        """
+        log = logging.getLogger("user_level_log")
+
+        self.lims_samples = lims_samples
+        self.update_sample_combo()
+
+        basket_list = []
+        sample_list = []
+        sample_changer = None
+
         if self.dc_tree_widget.sample_mount_method == 1:
             sample_changer = HWR.beamline.sample_changer
         elif self.dc_tree_widget.sample_mount_method == 2:
@@ -677,58 +798,11 @@ class TreeBrick(BaseWidget):
             basket_list = sc_basket_list
 
             # self.queue_sync_action.setEnabled(True)
-            for sc_sample in sc_sample_list:
-                # Get the sample in lims with the barcode
-                # sc_sample.code
-                lims_sample = barcode_samples.get(sc_sample.code)
-                # There was a sample with that barcode
-                if lims_sample:
-                    if lims_sample.lims_location == sc_sample.location:
-                        log.debug(
-                            "Found sample in ISPyB for location %s"
-                            % str(sc_sample.location)
-                        )
-                        sample_list.append(lims_sample)
-                    else:
-                        log.warning(
-                            "The sample with the barcode (%s) exists" % sc_sample.code
-                            + " in LIMS but the location does not mat"
-                            + "ch. Sample changer location: %s, LIMS "
-                            % sc_sample.location
-                            + "location %s" % lims_sample.lims_location
-                        )
-                        sample_list.append(sc_sample)
-                else:  # No sample with that barcode, continue with location
-                    lims_sample = location_samples.get(sc_sample.location)
-                    if lims_sample:
-                        if lims_sample.lims_code:
-                            log.warning(
-                                "The sample has a barcode in LIMS, but "
-                                + "the SC has no barcode information for "
-                                + "this sample. For location: %s"
-                                % str(sc_sample.location)
-                            )
-                            sample_list.append(lims_sample)
-                        else:
-                            log.debug(
-                                "Found sample in ISPyB for location %s"
-                                % str(sc_sample.location)
-                            )
-                            sample_list.append(lims_sample)
-                    else:
-                        if lims_sample:
-                            if lims_sample.lims_location is not None:
-                                log.warning(
-                                    "No barcode was provided in ISPyB "
-                                    + "which makes it impossible to verify if"
-                                    + "the locations are correct, assuming "
-                                    + "that the positions are correct."
-                                )
-                                sample_list.append(lims_sample)
-                        else:
-                            # log.warning("No sample in ISPyB for location %s" % \
-                            #            str(sc_sample.location))
-                            sample_list.append(sc_sample)
+            self.sample_reconciliation_report = reconcile_samples(
+                sc_sample_list, barcode_samples, location_samples
+            )
+            self.sample_reconciliation_report.log(log)
+            sample_list = self.sample_reconciliation_report.get_sample_list()
             self.dc_tree_widget.populate_tree_widget(
                 basket_list, sample_list, self.dc_tree_widget.sample_mount_method
             )
@@ -743,7 +817,7 @@ class TreeBrick(BaseWidget):
         sample_model = root_model.get_children()[0]
 
         sample_model.init_from_lims_object(self.filtered_lims_samples[index])
-        self.dc_tree_widget.sample_tree_widget.clear()
+        self.dc_tree_widget.clear_sample_tree()
         self.dc_tree_widget.populate_free_pin(sample_model)
 
     def get_sc_content(self):
@@ -916,6 +990,7 @@ class TreeBrick(BaseWidget):
         self.populate_xray_imaging_widget.emit(item)
 
     def mount_mode_combo_changed(self, index):
+        self.cancel_lims_sample_sync()
         self.dc_tree_widget.filter_sample_list(index)
         self.sample_changer_widget.details_button.setEnabled(index > 0)
         self.sample_changer_widget.synch_ispyb_button.setEnabled(
@@ -1026,99 +1101,28 @@ class TreeBrick(BaseWidget):
            9 : Characterisation
            10: Energy Scan
            11: XRF spectrum
+           Filter indexes are defined in TREE_FILTER_OPTIONS.
         """
-        self.sample_changer_widget.filter_ledit.setEnabled(filter_index in (2, 3, 4))
-        self.clear_filter()
-        if filter_index > 0:
-            item_iterator = QtImport.QTreeWidgetItemIterator(
-                self.dc_tree_widget.sample_tree_widget
-            )
-            item = item_iterator.value()
-            while item:
-                hide = False
-                item_model = item.get_model()
-                if filter_index == 1:
-                    hide = not item.has_star()
-                elif filter_index == 5:
-                    if isinstance(item, queue_item.DataCollectionQueueItem):
-                        hide = not item_model.is_executed()
-                elif filter_index == 6:
-                    if isinstance(item, queue_item.DataCollectionQueueItem):
-                        hide = item_model.is_executed()
-                elif filter_index == 7:
-                    if isinstance(item, queue_item.DataCollectionQueueItem):
-                        hide = item_model.is_helical()
-                    else:
-                        hide = True
-                elif filter_index == 8:
-                    if isinstance(item, queue_item.DataCollectionQueueItem):
-                        hide = not item_model.is_helical()
-                    else:
-                        hide = True
-                elif filter_index == 9:
-                    hide = not isinstance(item, queue_item.CharacterisationQueueItem)
-                elif filter_index == 10:
-                    hide = not isinstance(item, queue_item.EnergyScanQueueItem)
-                elif filter_index == 11:
-                    hide = not isinstance(item, queue_item.XRFSpectrumQueueItem)
-                # elif filter_index == 11:
-                #    hide = not isinstance(item, queue_item.AdvancedQueueItem)
-                if type(item) not in (
-                    queue_item.TaskQueueItem,
-                    queue_item.SampleQueueItem,
-                    queue_item.BasketQueueItem,
-                    queue_item.DataCollectionGroupQueueItem,
-                ):
-                    item.set_hidden(hide)
-                item_iterator += 1
-                item = item_iterator.value()
-
-        self.dc_tree_widget.hide_empty_baskets()
-
-    def filter_text_changed(self, new_text):
-        item_iterator = QtImport.QTreeWidgetItemIterator(
-            self.dc_tree_widget.sample_tree_widget
+        self.sample_changer_widget.filter_ledit.setEnabled(
+            filter_index in TEXT_FILTER_OPTIONS
         )
-        item = item_iterator.value()
-        filter_index = self.sample_changer_widget.filter_combo.currentIndex()
+        self.filter_text_timer.stop()
+        self.dc_tree_widget.filter_items(filter_index)
 
-        while item:
-            hide = False
-            new_text = str(new_text)
-            if filter_index == 2:
-                if isinstance(item, queue_item.SampleQueueItem):
-                    hide = not new_text in item.text(0)
-            elif filter_index == 3:
-                if isinstance(item, queue_item.SampleQueueItem):
-                    hide = not new_text in item.get_model().crystals[0].protein_acronym
-            elif filter_index == 4:
-                if isinstance(item, queue_item.BasketQueueItem):
-                    if new_text.isdigit():
-                        # Display one basket
-                        hide = int(new_text) != item.get_model().location[0]
-                    else:
-                        # Display several baskets. Separated with ","
-                        enable_baskat_list = new_text.split(",")
-                        if len(enable_baskat_list) > 1:
-                            hide = (
-                                item.get_model().location[0] not in enable_baskat_list
-                            )
-            item.set_hidden(hide)
-            item_iterator += 1
-            item = item_iterator.value()
+    def filter_text_changed(self, new_text):
+        """Text filter is applied when typing has paused"""
+        self.filter_text_timer.start()
 
-        if filter_index != 3:
-            self.dc_tree_widget.hide_empty_baskets()
+    def apply_text_filter(self):
+        filter_index = self.sample_changer_widget.filter_combo.currentIndex()
+        if filter_index not in TEXT_FILTER_OPTIONS:
+            filter_index = TREE_FILTER_OPTIONS.NONE
+        self.dc_tree_widget.filter_items(
+            filter_index, self.sample_changer_widget.filter_ledit.text()
+        )
 
     def clear_filter(self):
-        item_iterator = QtImport.QTreeWidgetItemIterator(
-            self.dc_tree_widget.sample_tree_widget
-        )
-        item = item_iterator.value()
-        while item:
-            item.set_hidden(False)
-            item_iterator += 1
-            item = item_iterator.value()
+        self.dc_tree_widget.clear_filter()
 
     def diffractometer_phase_changed(self, phase):
         if self.enable_collect_conditions.get("diffractometer") != (
@@ -1228,7 +1232,7 @@ class TreeBrick(BaseWidget):
             loaded_model = self.redis_client_hwobj.load_queue()
 
             if loaded_model is not None:
-                self.dc_tree_widget.sample_tree_widget.clear()
+                self.dc_tree_widget.clear_sample_tree()
                 model_map = {"free-pin": 0, "ispyb": 1, "plate": 2}
                 self.sample_changer_widget.filter_cbox.setCurrentIndex(
                     model_map[loaded_model]
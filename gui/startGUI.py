@@ -32,7 +32,8 @@ gevent.monkey.patch_all(thread=False)
 
 import gui
 from gui import GUISupervisor
-from gui.utils import GUILogHandler, ErrorHandler, QtImport
+from gui.utils import GUILogHandler, ErrorHandler, QtImport, startup_profiler
+from gui.utils.hwobj_preloader import DEFAULT_WIDTH
 from HardwareRepository import HardwareRepository as HWR
 
 
@@ -185,12 +186,45 @@ def run(gui_config_file=None):
         default=None,
     )
 
+    parser.add_option(
+        "",
+        "--hwobjPreloadWidth",
+        action="store",
+        type="int",
+        help="Number of hardware objects loaded concurrently at startup "
+        + "(default %d, 1 loads hardware objects one by one)" % DEFAULT_WIDTH,
+        dest="hwobjPreloadWidth",
+        default=DEFAULT_WIDTH,
+    )
+    parser.add_option(
+        "",
+        "--lazyBricks",
+        action="store_true",
+        dest="lazyBricks",
+        default=False,
+        help="create bricks of hidden tab pages the first time the page "
+        + "is shown",
+    )
+    parser.add_option(
+        "",
+        "--profile-startup",
+        action="store_true",
+        dest="profileStartup",
+        default=False,
+        help="measure startup time of each phase, brick and hardware object. "
+        + "Report is saved as startup_profile.json (and .folded for "
+        + "flame graphs) in the user file directory",
+    )
+
     parser.add_option("", "--pyqt4", action="store_true", default=None)
     parser.add_option("", "--pyqt5", action="store_true", default=None)
     parser.add_option("", "--pyside", action="store_true", default=None)
 
     (opts, args) = parser.parse_args()
 
+    if opts.profileStartup:
+        startup_profiler.enable()
+
     log_file = start_log(opts.logFile, opts.logLevel)
 
     # get config from arguments
@@ -202,6 +236,11 @@ def run(gui_config_file=None):
     else:
         user_file_dir = os.path.join(os.environ["HOME"], ".mxcube")
 
+    if opts.profileStartup:
+        startup_profiler.get_profiler().report_path = os.path.join(
+            user_file_dir, "startup_profile"
+        )
+
     app_style = opts.appStyle
 
     if opts.hardwareRepositoryServer:
@@ -377,7 +416,11 @@ def run(gui_config_file=None):
         "------------------------------------------------------------------------------"
     )
 
-    HWR.init_hardware_repository(configuration_path)
+    with startup_profiler.measure("init_hardware_repository"):
+        HWR.init_hardware_repository(configuration_path)
+    startup_profiler.get_profiler().instrument_hardware_repository(
+        HWR.getHardwareRepository()
+    )
 
     QtImport.QApplication.setDesktopSettingsAware(False)
 
@@ -386,6 +429,8 @@ def run(gui_config_file=None):
         design_mode=opts.designMode,
         show_maximized=opts.showMaximized,
         no_border=opts.noBorder,
+        hwobj_preload_width=opts.hwobjPreloadWidth,
+        lazy_bricks=opts.lazyBricks,
     )
 
     supervisor.set_user_file_directory(user_file_dir)
@@ -28,7 +28,7 @@ import collections
 from functools import partial
 
 from gui.utils import Icons, Colors, PropertyEditor, QtImport
-from gui.BaseComponents import BaseWidget
+from gui.BaseComponents import BaseWidget, LazyBrick
 from gui.BaseLayoutItems import BrickCfg, SpacerCfg, WindowCfg, ContainerCfg, TabCfg
 
 from HardwareRepository import HardwareRepository as HWR
@@ -598,11 +598,22 @@ class CustomTabWidget(QtImport.QTabWidget):
         page = self.widget(index)
         self.count_changed[index] = False
 
+        if page is not None:
+            self.materialize_lazy_bricks(page)
+
         self.tabChangedSignal.emit(index, page)
 
         tab_name = self.objectName()
         BaseWidget.update_tab_widget(tab_name, index)
 
+    def materialize_lazy_bricks(self, page):
+        """Creates bricks of the page which were not created at startup.
+           Bricks in hidden pages of nested tab widgets stay lazy.
+        """
+        for lazy_brick in page.findChildren(LazyBrick):
+            if lazy_brick.isVisibleTo(page):
+                lazy_brick.materialize()
+
     def add_tab(self, page_widget, label, icon=""):
         """Add tab"""
 
@@ -802,6 +813,26 @@ class CustomTabWidget(QtImport.QTabWidget):
         # that's the real page
         return scroll_area
 
+def replace_widget(old_widget, new_widget):
+    """Puts new_widget in place of old_widget in the parent layout"""
+
+    parent = old_widget.parentWidget()
+    if isinstance(parent, QtImport.QSplitter):
+        parent.insertWidget(parent.indexOf(old_widget), new_widget)
+    else:
+        # QLayout.replaceWidget does not exist in Qt 4, box layouts
+        # (the layouts of GUI items) are updated item by item
+        layout = getattr(parent, "_preferred_layout", None) or parent.layout()
+        index = layout.indexOf(old_widget)
+        stretch = layout.stretch(index)
+        alignment = layout.itemAt(index).alignment()
+        layout.removeWidget(old_widget)
+        layout.insertWidget(index, new_widget, stretch, alignment)
+    old_widget.hide()
+    old_widget.setParent(None)
+    new_widget.show()
+
+
 def get_vertical_spacer(*args, **kwargs):
     """Vertical spacer"""
     kwargs["orientation"] = "vertical"
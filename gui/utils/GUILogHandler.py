@@ -20,6 +20,7 @@
 import logging
 import time
 import weakref
+from collections import deque
 import gevent
 
 from gui.utils import QtImport
@@ -31,28 +32,27 @@ __license__ = "LGPLv3+"
 _logHandler = None
 _timer = None
 
+# Max number of records waiting for delivery. Oldest records are dropped
+# if the GUI can not keep up with the logging (log storm)
+MAX_BUFFER_SIZE = 5000
+
 
 class LogEvent(QtImport.QEvent):
+    """Delivers a batch of log records to a viewer"""
 
-    def __init__(self, record):
+    def __init__(self, records):
 
         QtImport.QEvent.__init__(self, QtImport.QEvent.User)
-        self.record = record
+        self.records = records
 
 def processLogMessages():
-    i = 0
-    while i < 10:
-        if len(_logHandler.buffer) <= i:
-            break
-
-        record = _logHandler.buffer[i]
-
-        for viewer in _logHandler.registeredViewers:
-            QtImport.QApplication.postEvent(viewer, LogEvent(record))
+    """Delivers all pending records to every viewer as one event"""
+    records = _logHandler.take_records()
+    if not records:
+        return
 
-        i += 1
-
-    del _logHandler.buffer[0:i]
+    for viewer in list(_logHandler.registeredViewers.keys()):
+        QtImport.QApplication.postEvent(viewer, LogEvent(records))
 
 
 def do_process_log_messages(sleep_time):
@@ -77,6 +77,16 @@ def GUILogHandler():
     return _logHandler
 
 
+def get_metrics():
+    """
+    Returns dict with GUI log handler counters, empty if the handler
+    has not been created (the handler is not created here)
+    """
+    if _logHandler is None:
+        return {}
+    return _logHandler.get_metrics()
+
+
 class LogRecord:
     """
     Descript. :
@@ -91,6 +101,18 @@ class LogRecord:
         self.levelname = record.levelname
         self.time = record.created
         self.message = record.getMessage()
+        self.suppressed = 0
+
+    def is_similar(self, record):
+        """
+        Descript. : True if LogRecord record has the same origin, level
+                    and message
+        """
+        return (
+            self.levelno == record.levelno
+            and self.name == record.name
+            and self.message == record.message
+        )
 
     def getName(self):
         """
@@ -126,21 +148,33 @@ class LogRecord:
         """
         Descript. :
         """
+        if self.suppressed:
+            return "%s (%d similar messages suppressed)" % (
+                self.message,
+                self.suppressed,
+            )
         return self.message
 
 
 class __GUILogHandler(logging.Handler):
     """
-    Descript. :
+    Descript. : Keeps log records in a bounded buffer until they are
+                delivered to the registered viewers. Consecutive similar
+                records are coalesced and the oldest records are dropped
+                when the buffer is full.
     """
 
-    def __init__(self):
+    def __init__(self, max_buffer_size=MAX_BUFFER_SIZE):
         """
         Descript. :
         """
         logging.Handler.__init__(self)
 
-        self.buffer = []
+        self.buffer = deque(maxlen=max_buffer_size)
+        self.dropped_records = 0
+        self.suppressed_records = 0
+        self.delivered_records = 0
+        self.__unreported_drops = 0
 
         self.registeredViewers = weakref.WeakKeyDictionary()
 
@@ -149,11 +183,69 @@ class __GUILogHandler(logging.Handler):
         Descript. :
         """
         self.registeredViewers[viewer] = ""
-        for rec in self.buffer:
-            viewer.append_log_record(rec)
+        viewer.append_log_records(list(self.buffer))
 
     def emit(self, record):
         """
-        Descript. :
-        """
-        self.buffer.append(LogRecord(record))
+        Descript. : Called by handle() with the handler lock held, so the
+                    last record can not be taken by another thread. The
+                    message is formatted before the last record is read,
+                    as formatting may take the records in this thread.
+                    Only records not taken yet are coalesced
+        """
+        new_record = LogRecord(record)
+        try:
+            last_record = self.buffer[-1]
+        except IndexError:
+            last_record = None
+        if last_record is not None and last_record.is_similar(new_record):
+            last_record.suppressed += 1
+            self.suppressed_records += 1
+            return
+
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped_records += 1
+            self.__unreported_drops += 1
+        self.buffer.append(new_record)
+
+    def take_records(self):
+        """
+        Descript. : Removes and returns all pending records. Information
+                    about dropped records is appended as a warning record
+        """
+        self.acquire()
+        try:
+            records = list(self.buffer)
+            self.buffer.clear()
+            unreported_drops = self.__unreported_drops
+            self.__unreported_drops = 0
+        finally:
+            self.release()
+
+        if unreported_drops:
+            drop_record = logging.LogRecord(
+                "GUI",
+                logging.WARNING,
+                __file__,
+                0,
+                "%d log messages dropped (GUI log buffer full)",
+                (unreported_drops,),
+                None,
+            )
+            records.append(LogRecord(drop_record))
+
+        self.delivered_records += len(records)
+        return records
+
+    def get_metrics(self):
+        """
+        Descript. : Returns counters of the handler
+        """
+        return {
+            "backlog": len(self.buffer),
+            "max_backlog": self.buffer.maxlen,
+            "dropped": self.dropped_records,
+            "suppressed": self.suppressed_records,
+            "delivered": self.delivered_records,
+            "viewers": len(self.registeredViewers),
+        }
@@ -119,18 +119,22 @@ if (qt_variant == "PyQt5") or (qt_variant is None and not qt_imported):
             pyqtSlot,
             PYQT_VERSION_STR,
             Qt,
+            QAbstractTableModel,
             QCoreApplication,
             QDir,
             QEvent,
             QEventLoop,
+            QModelIndex,
             QObject,
             QPoint,
             QPointF,
             QRect,
             QRectF,
             QRegExp,
+            QRunnable,
             QSize,
             QT_VERSION_STR,
+            QThreadPool,
             QTimer,
         )
         from PyQt5.QtWidgets import (
@@ -221,6 +225,7 @@ if (qt_variant == "PyQt5") or (qt_variant is None and not qt_imported):
             QPixmap,
             QPolygon,
             QRegExpValidator,
+            QTransform,
             QValidator
         )
         from PyQt5.uic import loadUi
@@ -260,9 +265,11 @@ if (qt_variant == "PyQt4") or (qt_variant is None and not qt_imported):
             pyqtSlot,
             PYQT_VERSION_STR,
             Qt,
+            QAbstractTableModel,
             QDir,
             QEvent,
             QEventLoop,
+            QModelIndex,
             QUrl,
             QObject,
             QPoint,
@@ -270,9 +277,11 @@ if (qt_variant == "PyQt4") or (qt_variant is None and not qt_imported):
             QRect,
             QRectF,
             QRegExp,
+            QRunnable,
             QSize,
             QStringList,
             QT_VERSION_STR,
+            QThreadPool,
             QTimer,
             SIGNAL,
         )
@@ -357,6 +366,7 @@ if (qt_variant == "PyQt4") or (qt_variant is None and not qt_imported):
             QToolBox,
             QToolButton,
             QToolTip,
+            QTransform,
             QTreeView,
             QTreeWidget,
             QTreeWidgetItem,
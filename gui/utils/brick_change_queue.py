@@ -0,0 +1,99 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Coalescing of the brick changes mirrored to other instances
+
+Changes of synchronised widgets (brick name, widget name, method name and
+arguments) are collected during a short interval. Only the last change of
+each (brick, widget, method) is sent when the interval ends, so a burst of
+keystrokes in a line edit sends one message. Changes are sent in the order
+of their last update.
+"""
+
+from collections import OrderedDict
+
+from gui.utils import QtImport
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+# Interval in ms during which the changes are collected
+DEFAULT_INTERVAL = 50
+
+
+class BrickChangeQueue(QtImport.QObject):
+    """Last change of each (brick, widget, method), sent periodically"""
+
+    def __init__(self, send_function, interval=DEFAULT_INTERVAL, parent=None):
+        """
+        :param send_function: called with (brick_name, widget_name,
+                              method_name, method_args, master_sync)
+        :param interval: ms, 0 sends every change immediately
+        """
+        QtImport.QObject.__init__(self, parent)
+
+        self.send_function = send_function
+        self.interval = interval
+        self.received = 0
+        self.sent = 0
+
+        self._pending = OrderedDict()
+        self._timer = QtImport.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+    def add_change(
+        self, brick_name, widget_name, method_name, method_args, master_sync
+    ):
+        key = (brick_name, widget_name, method_name)
+        self._pending.pop(key, None)
+        self._pending[key] = (method_args, master_sync)
+        self.received += 1
+
+        if self.interval <= 0:
+            self.flush()
+        elif not self._timer.isActive():
+            self._timer.start(self.interval)
+
+    def has_pending_changes(self):
+        return bool(self._pending)
+
+    def flush(self):
+        """Sends the pending changes"""
+        self._timer.stop()
+        pending = self._pending
+        self._pending = OrderedDict()
+        for (brick_name, widget_name, method_name), (
+            method_args,
+            master_sync,
+        ) in pending.items():
+            self.sent += 1
+            self.send_function(
+                brick_name, widget_name, method_name, method_args, master_sync
+            )
+
+    def get_statistics(self):
+        return {
+            "received": self.received,
+            "sent": self.sent,
+            "pending": len(self._pending),
+        }
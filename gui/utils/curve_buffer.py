@@ -0,0 +1,96 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Growable x, y arrays of streaming curves (energy scans, XRF spectra).
+Points are appended in amortised O(1): capacity is doubled when full and
+the data is returned as views, without copying.
+"""
+
+import numpy as np
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+INITIAL_CAPACITY = 256
+
+
+class CurveBuffer(object):
+    """x, y arrays with amortised O(1) append"""
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self._x_array = np.empty(max(1, capacity))
+        self._y_array = np.empty(max(1, capacity))
+        self._size = 0
+        # min and max of data, updated on append
+        self.x_limits = [None, None]
+        self.y_limits = [None, None]
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, size):
+        capacity = self._x_array.size
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        x_array = np.empty(capacity)
+        y_array = np.empty(capacity)
+        x_array[: self._size] = self._x_array[: self._size]
+        y_array[: self._size] = self._y_array[: self._size]
+        self._x_array = x_array
+        self._y_array = y_array
+
+    def _update_limits(self, limits, values_min, values_max):
+        if limits[0] is None or values_min < limits[0]:
+            limits[0] = values_min
+        if limits[1] is None or values_max > limits[1]:
+            limits[1] = values_max
+
+    def append(self, x, y):
+        self._reserve(self._size + 1)
+        self._x_array[self._size] = x
+        self._y_array[self._size] = y
+        self._size += 1
+        self._update_limits(self.x_limits, x, x)
+        self._update_limits(self.y_limits, y, y)
+
+    def extend(self, x_array, y_array):
+        x_array = np.asarray(x_array, dtype=float)
+        y_array = np.asarray(y_array, dtype=float)
+        if not x_array.size:
+            return
+        self._reserve(self._size + x_array.size)
+        self._x_array[self._size : self._size + x_array.size] = x_array
+        self._y_array[self._size : self._size + y_array.size] = y_array
+        self._size += x_array.size
+        self._update_limits(self.x_limits, x_array.min(), x_array.max())
+        self._update_limits(self.y_limits, y_array.min(), y_array.max())
+
+    def get_data(self):
+        """Returns views of x and y arrays"""
+        return self._x_array[: self._size], self._y_array[: self._size]
+
+    def clear(self):
+        self._size = 0
+        self.x_limits = [None, None]
+        self.y_limits = [None, None]
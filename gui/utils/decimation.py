@@ -0,0 +1,152 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Peak preserving decimation of large 1D curves (hit maps, results)
+
+Curves are reduced to the min and max point of each bin, so spikes are
+never dropped (unlike stride slicing). DecimationPyramid caches min/max
+indices for bins of size BASE_BIN_SIZE * 2 ** level. A view (x range and
+number of pixels) is served from the coarsest level that still has
+enough bins, in time proportional to the number of returned points.
+"""
+
+import numpy as np
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+# Bin size of the finest level of the pyramid
+BASE_BIN_SIZE = 4
+# Default number of returned points (two points per bin)
+DEFAULT_MAX_POINTS = 4000
+
+
+def minmax_indices(y_array, bin_size):
+    """
+    Returns indices of min and max values of consecutive bins of y_array.
+    Last bin is padded with the last value.
+
+    :returns: (min_indices, max_indices)
+    """
+    y_array = np.asarray(y_array)
+    num_bins = -(-y_array.size // bin_size)
+    indices = np.arange(num_bins * bin_size).reshape(num_bins, bin_size)
+    np.minimum(indices, y_array.size - 1, out=indices)
+    values = y_array[indices]
+    rows = np.arange(num_bins)
+    return (
+        indices[rows, np.argmin(values, axis=1)],
+        indices[rows, np.argmax(values, axis=1)],
+    )
+
+
+def _merge_pairs(y_array, min_indices, max_indices):
+    """Merges pairs of neighbouring bins"""
+    if min_indices.size % 2:
+        min_indices = np.append(min_indices, min_indices[-1])
+        max_indices = np.append(max_indices, max_indices[-1])
+    first_min, second_min = min_indices[0::2], min_indices[1::2]
+    first_max, second_max = max_indices[0::2], max_indices[1::2]
+    return (
+        np.where(y_array[first_min] <= y_array[second_min], first_min, second_min),
+        np.where(y_array[first_max] >= y_array[second_max], first_max, second_max),
+    )
+
+
+def minmax_decimate(y_array, x_array=None, max_points=DEFAULT_MAX_POINTS):
+    """
+    Returns decimated x and y arrays with at most max_points points
+    (min and max of each bin). Use DecimationPyramid if the same curve
+    is displayed several times.
+    """
+    return DecimationPyramid(y_array, x_array).get_data(max_points=max_points)
+
+
+class DecimationPyramid(object):
+    """Multi resolution min/max cache of a curve"""
+
+    def __init__(self, y_array, x_array=None):
+        """
+        :param y_array: curve values
+        :param x_array: increasing x values (default index of values)
+        """
+        self.y_array = np.asarray(y_array)
+        self.x_array = None if x_array is None else np.asarray(x_array)
+        # list of (bin size, min indices, max indices)
+        self.levels = []
+
+        if self.y_array.size > BASE_BIN_SIZE:
+            bin_size = BASE_BIN_SIZE
+            min_indices, max_indices = minmax_indices(self.y_array, bin_size)
+            self.levels.append((bin_size, min_indices, max_indices))
+            while min_indices.size > 1:
+                bin_size *= 2
+                min_indices, max_indices = _merge_pairs(
+                    self.y_array, min_indices, max_indices
+                )
+                self.levels.append((bin_size, min_indices, max_indices))
+
+    def __len__(self):
+        return self.y_array.size
+
+    def get_index_range(self, x_min=None, x_max=None):
+        """Returns first and last + 1 index of points in x range"""
+        size = self.y_array.size
+        if self.x_array is None:
+            start = 0 if x_min is None else int(np.floor(x_min))
+            end = size if x_max is None else int(np.ceil(x_max)) + 1
+        else:
+            start = 0 if x_min is None else np.searchsorted(self.x_array, x_min)
+            end = (
+                size
+                if x_max is None
+                else np.searchsorted(self.x_array, x_max, side="right")
+            )
+        # one point outside the range on each side, so lines reach the border
+        return max(start - 1, 0), min(end + 1, size)
+
+    def get_indices(self, x_min=None, x_max=None, max_points=DEFAULT_MAX_POINTS):
+        """Returns sorted indices of points displayed in the x range"""
+        start, end = self.get_index_range(x_min, x_max)
+        if end - start <= max_points or not self.levels:
+            return np.arange(start, end)
+
+        max_bins = max(max_points // 2, 1)
+        for bin_size, min_indices, max_indices in self.levels:
+            if (end - start) / bin_size <= max_bins:
+                break
+        first_bin = start // bin_size
+        last_bin = -(-end // bin_size)
+        indices = np.concatenate(
+            (min_indices[first_bin:last_bin], max_indices[first_bin:last_bin])
+        )
+        indices = np.unique(indices)
+        return indices[(indices >= start) & (indices < end)]
+
+    def get_data(self, x_min=None, x_max=None, max_points=DEFAULT_MAX_POINTS):
+        """Returns decimated x and y arrays of the x range"""
+        indices = self.get_indices(x_min, x_max, max_points)
+        if self.x_array is None:
+            x_array = indices
+        else:
+            x_array = self.x_array[indices]
+        return x_array, self.y_array[indices]
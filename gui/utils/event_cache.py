@@ -0,0 +1,166 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Cache of the events received while mirroring is prevented
+
+Only the last call of each method is kept, in the order of the calls: a
+new call of a cached method moves it to the end. Objects of the methods
+are weakly referenced. When the cache is full the oldest event is
+dropped. Events are grouped by brick and replayed brick after brick, so
+the caller can suspend the updates of a brick while its events are
+replayed. Replay returns the number of events, failures and duration.
+"""
+
+import time
+import logging
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+DEFAULT_CAPACITY = 1000
+
+
+@contextmanager
+def _no_context(group):
+    yield
+
+
+class CachedEvent(object):
+    """Last call of a method"""
+
+    __slots__ = ("timestamp", "group", "func", "name", "obj_ref", "args")
+
+    def __init__(self, timestamp, group, method, args):
+        self.timestamp = timestamp
+        self.group = group
+        self.args = args
+        self.name = getattr(method, "__name__", None)
+        obj = getattr(method, "__self__", None)
+        if obj is None or self.name is None:
+            self.func = method
+            self.obj_ref = None
+        else:
+            # bound methods of Qt objects are builtins without __func__:
+            # the method is bound again by name when replayed
+            self.func = None
+            try:
+                self.obj_ref = weakref.ref(obj)
+            except TypeError:
+                self.obj_ref = lambda obj=obj: obj
+
+    def get_method(self):
+        """Returns the method or None if its object was deleted"""
+        if self.obj_ref is None:
+            return self.func
+        obj = self.obj_ref()
+        if obj is None:
+            return None
+        return getattr(obj, self.name, None)
+
+
+def get_method_key(method):
+    obj = getattr(method, "__self__", None)
+    name = getattr(method, "__name__", None)
+    if obj is None or name is None:
+        return method
+    return (id(obj), name)
+
+
+class EventCache(object):
+    """Last call of every method, insertion ordered, bounded"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        # events dropped because the cache was full
+        self.evicted = 0
+        self._events = OrderedDict()
+
+    def __len__(self):
+        return len(self._events)
+
+    def add(self, method, args, group=None, timestamp=None):
+        """
+        Caches the call method(*args). group identifies the brick of the
+        method (e.g. brick name)
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        key = get_method_key(method)
+        self._events.pop(key, None)
+        self._events[key] = CachedEvent(timestamp, group, method, tuple(args))
+        while len(self._events) > self.capacity:
+            self._events.popitem(last=False)
+            self.evicted += 1
+
+    def clear(self):
+        self._events.clear()
+
+    def get_groups(self):
+        """Returns OrderedDict group: events, in the order of first event"""
+        groups = OrderedDict()
+        for event in self._events.values():
+            groups.setdefault(event.group, []).append(event)
+        return groups
+
+    def replay(self, group_context=None):
+        """
+        Calls the cached methods group after group and empties the cache.
+        :param group_context: called with the group, returns the context
+                              manager wrapping the replay of the group
+        :returns: dict with number of events, failed events, groups and
+                  duration in seconds
+        """
+        if group_context is None:
+            group_context = _no_context
+
+        start_time = time.time()
+        groups = self.get_groups()
+        self._events = OrderedDict()
+        num_events = 0
+        num_failed = 0
+
+        for group, events in groups.items():
+            with group_context(group):
+                for event in events:
+                    method = event.get_method()
+                    if method is None:
+                        continue
+                    num_events += 1
+                    try:
+                        method(*event.args)
+                    except BaseException:
+                        num_failed += 1
+                        logging.getLogger().exception(
+                            "Could not replay cached event %s of %s",
+                            event.name or event.func,
+                            group,
+                        )
+
+        return {
+            "events": num_events,
+            "failed": num_failed,
+            "groups": len(groups),
+            "duration": time.time() - start_time,
+        }
@@ -0,0 +1,263 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Registry of the views displaying camera frames
+
+Bricks register their views as consumers of a camera, with an optional
+maximum frame rate. The registry receives the camera frames (imageReceived)
+and passes them only to visible views, at most max fps times per second.
+Video of a camera is switched off (set_video_live) when none of its views
+is visible, e.g. when their tab is hidden, and on again when a view is
+shown, if live video was requested. Frames received and displayed per
+camera and view are available with get_statistics.
+"""
+
+import time
+import logging
+import weakref
+
+from gui.utils import QtImport
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+FRAME_SIGNAL = "imageReceived"
+
+
+class FrameConsumer(object):
+    """View of a camera"""
+
+    def __init__(self, widget, callback, max_fps, suspend_hidden):
+        self.widget = weakref.ref(widget)
+        self.name = widget.objectName() or widget.__class__.__name__
+        self.callback = callback
+        self.min_interval = 1.0 / max_fps if max_fps else 0
+        self.suspend_hidden = suspend_hidden
+        self.visible = widget.isVisible()
+        self.last_frame_time = 0
+        self.displayed = 0
+        # frames not passed because of the frame rate limit
+        self.skipped = 0
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "visible": self.visible,
+            "displayed": self.displayed,
+            "skipped": self.skipped,
+        }
+
+
+class CameraFrames(object):
+    """Frame dispatch of one camera"""
+
+    def __init__(self, camera, name):
+        self.camera = camera
+        self.name = name
+        self.consumers = []
+        # live video requested by the bricks (None: not managed)
+        self.live_requested = None
+        self.live = None
+        self.received = 0
+        self.displayed = 0
+        # frames received while no view was visible
+        self.hidden = 0
+
+    def frame_received(self, frame, *args):
+        self.received += 1
+        now = time.time()
+        displayed = False
+        for consumer in self.consumers:
+            if (
+                not consumer.visible
+                or consumer.callback is None
+                or consumer.widget() is None
+            ):
+                continue
+            if now - consumer.last_frame_time < consumer.min_interval:
+                consumer.skipped += 1
+                continue
+            consumer.last_frame_time = now
+            consumer.displayed += 1
+            displayed = True
+            try:
+                consumer.callback(frame, *args)
+            except BaseException:
+                logging.getLogger().exception(
+                    "Could not display frame of %s in %s", self.name, consumer.name
+                )
+        if displayed:
+            self.displayed += 1
+        elif not self.is_visible():
+            self.hidden += 1
+
+    def is_visible(self):
+        return any(consumer.visible for consumer in self.consumers)
+
+    def can_suspend(self):
+        return all(
+            consumer.suspend_hidden
+            for consumer in self.consumers
+            if not consumer.visible
+        )
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "live": self.live,
+            "received": self.received,
+            "displayed": self.displayed,
+            "hidden": self.hidden,
+            "consumers": [consumer.as_dict() for consumer in self.consumers],
+        }
+
+
+class FrameConsumerRegistry(QtImport.QObject):
+    """Cameras and their views"""
+
+    def __init__(self):
+        QtImport.QObject.__init__(self)
+        # id(camera): CameraFrames
+        self._cameras = {}
+
+    def _get_camera_frames(self, camera, name=None):
+        camera_frames = self._cameras.get(id(camera))
+        if camera_frames is None:
+            if name is None:
+                name = getattr(camera, "username", None) or camera.__class__.__name__
+            camera_frames = CameraFrames(camera, name)
+            self._cameras[id(camera)] = camera_frames
+        return camera_frames
+
+    def register_consumer(
+        self, camera, widget, callback=None, max_fps=None, suspend_hidden=True
+    ):
+        """
+        Registers widget as a view of camera.
+        :param callback: called with the frames (imageReceived arguments)
+                         while widget is visible. If None, the widget is
+                         only used to switch off the video when hidden
+        :param max_fps: max. number of frames per second passed to callback
+        :param suspend_hidden: video can be switched off if widget is hidden
+        """
+        camera_frames = self._get_camera_frames(camera)
+        self.unregister_consumer(camera, widget)
+        if callback is not None and not any(
+            consumer.callback is not None for consumer in camera_frames.consumers
+        ):
+            camera.connect(FRAME_SIGNAL, camera_frames.frame_received)
+        camera_frames.consumers.append(
+            FrameConsumer(widget, callback, max_fps, suspend_hidden)
+        )
+        widget.installEventFilter(self)
+        self.update_video_live(camera_frames)
+
+    def unregister_consumer(self, camera, widget):
+        camera_frames = self._cameras.get(id(camera))
+        if camera_frames is None:
+            return
+        consumers = [
+            consumer
+            for consumer in camera_frames.consumers
+            if consumer.widget() is widget
+        ]
+        for consumer in consumers:
+            camera_frames.consumers.remove(consumer)
+            if consumer.callback is not None and not any(
+                other.callback is not None for other in camera_frames.consumers
+            ):
+                camera.disconnect(camera, FRAME_SIGNAL, camera_frames.frame_received)
+        if consumers and not any(
+            self._get_consumer(other, widget) for other in self._cameras.values()
+        ):
+            widget.removeEventFilter(self)
+
+    def set_video_live(self, camera, state):
+        """
+        Requests live video of camera. Video is on only while one of the
+        views of the camera is visible
+        """
+        camera_frames = self._get_camera_frames(camera)
+        camera_frames.live_requested = bool(state)
+        self.update_video_live(camera_frames)
+
+    def update_video_live(self, camera_frames):
+        if camera_frames.live_requested is None:
+            return
+        live = camera_frames.live_requested and (
+            camera_frames.is_visible() or not camera_frames.can_suspend()
+        )
+        if live != camera_frames.live and hasattr(camera_frames.camera, "set_video_live"):
+            camera_frames.live = live
+            camera_frames.camera.set_video_live(live)
+
+    def _get_consumer(self, camera_frames, widget):
+        for consumer in camera_frames.consumers:
+            if consumer.widget() is widget:
+                return consumer
+
+    def eventFilter(self, obj, event):
+        if event.type() in (QtImport.QEvent.Show, QtImport.QEvent.Hide):
+            visible = event.type() == QtImport.QEvent.Show
+            for camera_frames in self._cameras.values():
+                consumer = self._get_consumer(camera_frames, obj)
+                if consumer is not None and consumer.visible != visible:
+                    consumer.visible = visible
+                    self.update_video_live(camera_frames)
+        return False
+
+    def get_statistics(self, camera=None):
+        """
+        Returns frames received, displayed and received while hidden, of
+        camera (dict) or of all cameras (list)
+        """
+        if camera is not None:
+            return self._get_camera_frames(camera).as_dict()
+        return [camera_frames.as_dict() for camera_frames in self._cameras.values()]
+
+
+FRAME_CONSUMER_REGISTRY = None
+
+
+def get_frame_consumer_registry():
+    global FRAME_CONSUMER_REGISTRY
+    if FRAME_CONSUMER_REGISTRY is None:
+        FRAME_CONSUMER_REGISTRY = FrameConsumerRegistry()
+    return FRAME_CONSUMER_REGISTRY
+
+
+def register_consumer(camera, widget, callback=None, max_fps=None, suspend_hidden=True):
+    get_frame_consumer_registry().register_consumer(
+        camera, widget, callback, max_fps, suspend_hidden
+    )
+
+
+def unregister_consumer(camera, widget):
+    get_frame_consumer_registry().unregister_consumer(camera, widget)
+
+
+def set_video_live(camera, state):
+    get_frame_consumer_registry().set_video_live(camera, state)
+
+
+def get_statistics(camera=None):
+    return get_frame_consumer_registry().get_statistics(camera)
@@ -0,0 +1,251 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Transport of camera frames to the graphics views
+
+Camera hardware objects push frames (numpy arrays, QImage or QPixmap) from
+any thread or greenlet with FrameTransport.push_frame. Numpy arrays are
+wrapped in a QImage without copying. Only the latest frame is kept: a
+frame not yet displayed when the next one arrives is dropped, so a slow
+GUI does not build a queue of stale frames. Frames are delivered in the
+GUI thread (frameReceived signal) and can be displayed without conversion
+to QPixmap by FrameGraphicsItem.
+"""
+
+import time
+import threading
+from collections import deque
+
+import numpy as np
+
+from gui.utils import QtImport
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+# Number of displayed frames used to estimate the frame rate
+FPS_WINDOW = 50
+
+# (dtype, number of channels): QImage format, of the formats of this Qt
+# version (Grayscale8 since Qt 5.5, RGBA8888 since 5.2, Grayscale16 5.13)
+IMAGE_FORMATS = {(np.dtype(np.uint8), 3): QtImport.QImage.Format_RGB888}
+for _dtype, _channels, _format_name in (
+    (np.uint8, 1, "Format_Grayscale8"),
+    (np.uint8, 4, "Format_RGBA8888"),
+    (np.uint16, 1, "Format_Grayscale16"),
+):
+    if hasattr(QtImport.QImage, _format_name):
+        IMAGE_FORMATS[(np.dtype(_dtype), _channels)] = getattr(
+            QtImport.QImage, _format_name
+        )
+if (np.dtype(np.uint8), 1) not in IMAGE_FORMATS:
+    # grayscale displayed as indexed image with a gray color table
+    IMAGE_FORMATS[(np.dtype(np.uint8), 1)] = QtImport.QImage.Format_Indexed8
+GRAY_COLOR_TABLE = [QtImport.QColor(value, value, value).rgb() for value in range(256)]
+
+
+def numpy_to_qimage(array, image_format=None):
+    """
+    Returns a QImage sharing memory with array (height x width or
+    height x width x channels). The array is referenced by the image
+    (image.ndarray) and must not be modified while the image is displayed.
+    Array is copied only if its pixels are not contiguous in rows.
+    image_format is by default given by the dtype and number of channels
+    """
+    array = np.asarray(array)
+    channels = 1 if array.ndim == 2 else array.shape[2]
+    if image_format is None:
+        image_format = IMAGE_FORMATS.get((array.dtype, channels))
+    if image_format is None:
+        raise ValueError(
+            "Unsupported frame format %s with %d channels" % (array.dtype, channels)
+        )
+    if array.strides[1] != array.itemsize * channels or (
+        array.ndim == 3 and array.strides[2] != array.itemsize
+    ):
+        array = np.ascontiguousarray(array)
+
+    height, width = array.shape[:2]
+    image = QtImport.QImage(
+        array.ctypes.data, width, height, array.strides[0], image_format
+    )
+    if image_format == QtImport.QImage.Format_Indexed8:
+        image.setColorTable(GRAY_COLOR_TABLE)
+    # keeps the buffer alive as long as the image
+    image.ndarray = array
+    return image
+
+
+class FrameStatistics(object):
+    """Frame counters and latency of a FrameTransport"""
+
+    def __init__(self, name):
+        self.name = name
+        self.received = 0
+        self.displayed = 0
+        # frames replaced by a newer frame before they were displayed
+        self.dropped = 0
+        # time from frame timestamp to the end of display (seconds)
+        self.latency_sum = 0
+        self.latency_max = 0
+        self.display_times = deque(maxlen=FPS_WINDOW)
+
+    def frame_displayed(self, frame_time):
+        now = time.time()
+        latency = now - frame_time
+        self.displayed += 1
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.display_times.append(now)
+
+    def get_fps(self):
+        if len(self.display_times) < 2:
+            return 0
+        duration = self.display_times[-1] - self.display_times[0]
+        if duration <= 0:
+            return 0
+        return (len(self.display_times) - 1) / duration
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "received": self.received,
+            "displayed": self.displayed,
+            "dropped": self.dropped,
+            "fps": self.get_fps(),
+            "latency_mean": self.latency_sum / self.displayed
+            if self.displayed
+            else 0,
+            "latency_max": self.latency_max,
+        }
+
+
+class FrameTransport(QtImport.QObject):
+    """Latest frame slot between a camera and its views"""
+
+    frameReceived = QtImport.pyqtSignal(object)
+    frameQueuedSignal = QtImport.pyqtSignal()
+
+    def __init__(self, parent=None, name="camera"):
+        QtImport.QObject.__init__(self, parent)
+
+        self._lock = threading.Lock()
+        self._frame = None
+        self._frame_time = None
+        self._delivery_pending = False
+        self.statistics = FrameStatistics(name)
+
+        self.frameQueuedSignal.connect(
+            self.deliver_frame, QtImport.Qt.QueuedConnection
+        )
+
+    def push_frame(self, frame, timestamp=None):
+        """
+        Sets the frame to display (numpy array, QImage or QPixmap).
+        Can be called from any thread. timestamp is the acquisition time
+        (time.time()), used to compute the display latency
+        """
+        if isinstance(frame, np.ndarray):
+            frame = numpy_to_qimage(frame)
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self._lock:
+            self.statistics.received += 1
+            if self._frame is not None:
+                self.statistics.dropped += 1
+            self._frame = frame
+            self._frame_time = timestamp
+            delivery_pending = self._delivery_pending
+            self._delivery_pending = True
+
+        if not delivery_pending:
+            self.frameQueuedSignal.emit()
+
+    def deliver_frame(self):
+        """Emits the latest frame (called in the GUI thread)"""
+        with self._lock:
+            frame = self._frame
+            frame_time = self._frame_time
+            self._frame = None
+            self._delivery_pending = False
+
+        if frame is not None:
+            self.frameReceived.emit(frame)
+            self.statistics.frame_displayed(frame_time)
+
+    def get_statistics(self):
+        return self.statistics.as_dict()
+
+    def reset_statistics(self):
+        self.statistics = FrameStatistics(self.statistics.name)
+
+
+class FrameGraphicsItem(QtImport.QGraphicsItem):
+    """
+    Graphics item displaying the frames of a FrameTransport. QImage frames
+    are painted directly, without conversion to QPixmap
+    """
+
+    def __init__(self, parent=None):
+        QtImport.QGraphicsItem.__init__(self, parent)
+        self.frame = None
+        self.image_transform = None
+        self.image_pipeline = None
+        self._rect = QtImport.QRectF(0, 0, 0, 0)
+
+    def set_image_transform(self, image_transform, image_pipeline=None):
+        """
+        Frames are scaled, flipped or colour mapped by image_pipeline
+        (ImagePipeline) in worker threads before they are displayed.
+        None displays frames as received
+        """
+        if self.image_pipeline is not None:
+            self.image_pipeline.cancel(self)
+        self.image_transform = image_transform
+        self.image_pipeline = image_pipeline
+
+    def set_frame(self, frame):
+        if self.image_transform is not None and isinstance(frame, QtImport.QImage):
+            self.image_pipeline.process(
+                self, frame, self.image_transform, self.display_frame
+            )
+        else:
+            self.display_frame(frame)
+
+    def display_frame(self, frame):
+        if frame.width() != self._rect.width() or frame.height() != self._rect.height():
+            self.prepareGeometryChange()
+            self._rect = QtImport.QRectF(0, 0, frame.width(), frame.height())
+        self.frame = frame
+        self.update()
+
+    def boundingRect(self):
+        return self._rect
+
+    def paint(self, painter, option, widget):
+        if self.frame is None:
+            return
+        if isinstance(self.frame, QtImport.QImage):
+            painter.drawImage(0, 0, self.frame)
+        else:
+            painter.drawPixmap(0, 0, self.frame)
@@ -0,0 +1,129 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Loads hardware objects referenced by the GUI file in a pool of greenlets,
+while the bricks are being built. A brick waits only for the hardware
+objects referenced in its own properties.
+"""
+
+import logging
+from collections import OrderedDict
+
+import gevent
+import gevent.pool
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+# Number of hardware objects loaded at the same time
+DEFAULT_WIDTH = 4
+
+
+class HardwareObjectPreloader(object):
+    """Greenlet pool loading hardware objects"""
+
+    def __init__(self, hardware_repository, width=DEFAULT_WIDTH,
+                 progress_callback=None):
+        """
+        :param hardware_repository: object with getHardwareObject method
+        :param width: max. number of concurrently loaded hardware objects
+        :param progress_callback: called with (done, total, message)
+        """
+        self.hardware_repository = hardware_repository
+        self.width = max(int(width), 1)
+        self.progress_callback = progress_callback
+
+        self._pool = gevent.pool.Pool(self.width)
+        self._greenlets = OrderedDict()
+        self._brick_mnemonics = {}
+        self._num_done = 0
+        self._num_total = 0
+
+    def start(self, brick_mnemonics):
+        """
+        Starts to load hardware objects.
+        :param brick_mnemonics: dict brick name: list of mnemonics
+        """
+        self._brick_mnemonics = dict(brick_mnemonics)
+        mnemonics = []
+        for brick_mnemonic_list in brick_mnemonics.values():
+            for mnemonic in brick_mnemonic_list:
+                if mnemonic not in self._greenlets and mnemonic not in mnemonics:
+                    mnemonics.append(mnemonic)
+
+        # Bricks and hardware objects count as one step of progress
+        self._num_total += len(mnemonics) + len(brick_mnemonics)
+        greenlets = []
+        for mnemonic in mnemonics:
+            greenlet = gevent.Greenlet(self._load, mnemonic)
+            self._greenlets[mnemonic] = greenlet
+            greenlets.append(greenlet)
+        # Pool.start blocks if the pool is full, so greenlets are started
+        # (in the order of bricks) from a separate greenlet
+        gevent.spawn(self._start_greenlets, greenlets)
+
+    def _start_greenlets(self, greenlets):
+        for greenlet in greenlets:
+            self._pool.start(greenlet)
+
+    def _load(self, mnemonic):
+        try:
+            return self.hardware_repository.getHardwareObject(mnemonic)
+        except BaseException:
+            logging.getLogger("HWR").exception(
+                "Could not preload hardware object %s", mnemonic
+            )
+        finally:
+            self._step_done("Loading hardware object %s..." % mnemonic)
+
+    def _step_done(self, message):
+        self._num_done += 1
+        if self.progress_callback is not None:
+            try:
+                self.progress_callback(self._num_done, self._num_total, message)
+            except BaseException:
+                logging.getLogger("HWR").exception("Error in progress callback")
+
+    def wait_for_brick(self, brick_name, timeout=None):
+        """Waits until hardware objects referenced by the brick are loaded"""
+        if brick_name not in self._brick_mnemonics:
+            return
+        greenlets = [
+            self._greenlets[mnemonic]
+            for mnemonic in self._brick_mnemonics.pop(brick_name)
+        ]
+        gevent.joinall(greenlets, timeout=timeout)
+        self._step_done("Loading brick %s..." % brick_name)
+
+    def skip_brick(self, brick_name):
+        """Brick is not built now, its hardware objects load in background"""
+        if brick_name in self._brick_mnemonics:
+            del self._brick_mnemonics[brick_name]
+            self._step_done("Loading brick %s..." % brick_name)
+
+    def wait_all(self, timeout=None):
+        """Waits until all hardware objects are loaded"""
+        gevent.joinall(list(self._greenlets.values()), timeout=timeout)
+
+    def get_progress(self):
+        """Returns (done, total) number of steps"""
+        return self._num_done, self._num_total
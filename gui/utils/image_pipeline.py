@@ -0,0 +1,443 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Scaling, flipping, rotation, contrast and colour mapping of camera frames
+and snapshots in a pool of worker threads
+
+QImage.scaled keeps the Python GIL for the whole call, so images are
+transformed with numpy (which releases the GIL in its loops) and the GUI
+thread keeps running. Results are delivered in the GUI thread as QImage.
+A new request of a consumer (view) supersedes its previous request: work
+not started yet is skipped and late results are discarded. Scaled
+snapshots are kept in a small cache, per image and transformation.
+"""
+
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+from gui.utils import QtImport
+from gui.utils.frame_transport import IMAGE_FORMATS, numpy_to_qimage
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+DEFAULT_NUM_WORKERS = 2
+# Number of transformed snapshots kept in the cache
+SNAPSHOT_CACHE_SIZE = 16
+
+# QImage formats with 8 bit channels: number of channels, of the formats
+# of this Qt version (Grayscale8 since Qt 5.5, RGBA8888 since 5.2)
+QIMAGE_CHANNELS = {}
+for _format_name, _channels in (
+    ("Format_Grayscale8", 1),
+    ("Format_RGB888", 3),
+    ("Format_RGB32", 4),
+    ("Format_ARGB32", 4),
+    ("Format_ARGB32_Premultiplied", 4),
+    ("Format_RGBA8888", 4),
+):
+    if hasattr(QtImport.QImage, _format_name):
+        QIMAGE_CHANNELS[getattr(QtImport.QImage, _format_name)] = _channels
+
+# Format of colour mapped images, None: QImage.scaled is used instead
+COLOR_MAP_FORMAT = getattr(QtImport.QImage, "Format_RGBA8888", None)
+
+# Control points (value, (red, green, blue)) of colour maps
+COLOR_MAPS = {
+    "gray": ((0, (0, 0, 0)), (255, (255, 255, 255))),
+    "hot": (
+        (0, (0, 0, 0)),
+        (96, (255, 0, 0)),
+        (192, (255, 255, 0)),
+        (255, (255, 255, 255)),
+    ),
+    "jet": (
+        (0, (0, 0, 128)),
+        (32, (0, 0, 255)),
+        (96, (0, 255, 255)),
+        (160, (255, 255, 0)),
+        (224, (255, 0, 0)),
+        (255, (128, 0, 0)),
+    ),
+}
+
+
+class ImageTransform(object):
+    """Transformation applied to an image, in the order of the arguments"""
+
+    def __init__(
+        self,
+        width=None,
+        height=None,
+        scale=None,
+        smooth=True,
+        rotation=0,
+        flip_horizontal=False,
+        flip_vertical=False,
+        contrast=1.0,
+        brightness=0,
+        color_map=None,
+    ):
+        """
+        :param width, height: size of the result (aspect ratio is kept)
+        :param scale: scale factor, used if width and height are None
+        :param smooth: bilinear (and box filter) instead of nearest pixel
+        :param rotation: clockwise rotation, multiple of 90 degrees
+        :param contrast, brightness: applied to the pixel values
+        :param color_map: name in COLOR_MAPS, for grayscale images
+        """
+        if rotation % 90:
+            raise ValueError("Rotation must be a multiple of 90 degrees")
+        if color_map is not None and color_map not in COLOR_MAPS:
+            raise ValueError("Unknown color map %s" % color_map)
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self.smooth = smooth
+        self.rotation = rotation % 360
+        self.flip_horizontal = flip_horizontal
+        self.flip_vertical = flip_vertical
+        self.contrast = contrast
+        self.brightness = brightness
+        self.color_map = color_map
+
+    def key(self):
+        return (
+            self.width,
+            self.height,
+            self.scale,
+            self.smooth,
+            self.rotation,
+            self.flip_horizontal,
+            self.flip_vertical,
+            self.contrast,
+            self.brightness,
+            self.color_map,
+        )
+
+    def get_size(self, width, height):
+        """Returns size of the result for a source image of width x height"""
+        if self.rotation in (90, 270):
+            width, height = height, width
+        if self.width and self.height:
+            factor = min(self.width / float(width), self.height / float(height))
+        elif self.width:
+            factor = self.width / float(width)
+        elif self.height:
+            factor = self.height / float(height)
+        else:
+            factor = self.scale or 1.0
+        return max(int(round(width * factor)), 1), max(int(round(height * factor)), 1)
+
+
+def get_lookup_table(contrast=1.0, brightness=0):
+    values = (np.arange(256) - 128.0) * contrast + 128 + brightness
+    return np.clip(np.round(values), 0, 255).astype(np.uint8)
+
+
+def get_color_table(color_map):
+    """Returns 256 x 4 (RGBA) table of the color map"""
+    points = COLOR_MAPS[color_map]
+    positions = [point[0] for point in points]
+    table = np.empty((256, 4), dtype=np.uint8)
+    for channel in range(3):
+        table[:, channel] = np.interp(
+            np.arange(256), positions, [point[1][channel] for point in points]
+        )
+    table[:, 3] = 255
+    return table
+
+
+def _box_downscale(array, factor_y, factor_x):
+    height = array.shape[0] // factor_y
+    width = array.shape[1] // factor_x
+    blocks = array[: height * factor_y, : width * factor_x].reshape(
+        (height, factor_y, width, factor_x) + array.shape[2:]
+    )
+    result = blocks.sum(axis=(1, 3), dtype=np.uint32)
+    result += factor_y * factor_x // 2
+    result //= factor_y * factor_x
+    return result.astype(np.uint8)
+
+
+def _bilinear_indices(source_size, size):
+    positions = (np.arange(size) + 0.5) * source_size / float(size) - 0.5
+    np.clip(positions, 0, source_size - 1, out=positions)
+    first = positions.astype(np.intp)
+    second = np.minimum(first + 1, source_size - 1)
+    # 8 bit fixed point weights of the second pixel
+    weights = np.round((positions - first) * 256).astype(np.uint16)
+    return first, second, weights
+
+
+def _interpolate(first, second, weights):
+    result = first.astype(np.uint16)
+    result *= 256 - weights
+    second = second.astype(np.uint16)
+    second *= weights
+    result += second
+    result += 128
+    result >>= 8
+    return result.astype(np.uint8)
+
+
+def _bilinear_resize(array, width, height):
+    first_y, second_y, weights_y = _bilinear_indices(array.shape[0], height)
+    first_x, second_x, weights_x = _bilinear_indices(array.shape[1], width)
+    weights_y = weights_y.reshape((-1, 1) + (1,) * (array.ndim - 2))
+    weights_x = weights_x.reshape((1, -1) + (1,) * (array.ndim - 2))
+
+    rows = _interpolate(array[first_y], array[second_y], weights_y)
+    return _interpolate(rows[:, first_x], rows[:, second_x], weights_x)
+
+
+def _nearest_resize(array, width, height):
+    rows = (np.arange(height) * array.shape[0]) // height
+    cols = (np.arange(width) * array.shape[1]) // width
+    return np.take(np.take(array, rows, axis=0), cols, axis=1)
+
+
+def transform_array(array, transform):
+    """
+    Returns transformed copy of array (height x width [x channels], uint8).
+    With a color map, grayscale arrays are returned as RGBA
+    """
+    source = array
+    width, height = transform.get_size(array.shape[1], array.shape[0])
+
+    # geometry: views only
+    if transform.rotation:
+        array = np.rot90(array, k=-transform.rotation // 90, axes=(0, 1))
+    if transform.flip_horizontal:
+        array = array[:, ::-1]
+    if transform.flip_vertical:
+        array = array[::-1]
+
+    if (width, height) != array.shape[1::-1]:
+        if transform.smooth:
+            factor_y = array.shape[0] // (2 * height) or 1
+            factor_x = array.shape[1] // (2 * width) or 1
+            if factor_y > 1 or factor_x > 1:
+                array = _box_downscale(array, factor_y, factor_x)
+            array = _bilinear_resize(array, width, height)
+        else:
+            array = _nearest_resize(array, width, height)
+
+    lookup_table = None
+    if transform.contrast != 1.0 or transform.brightness:
+        lookup_table = get_lookup_table(transform.contrast, transform.brightness)
+    if transform.color_map is not None and array.ndim == 2:
+        color_table = get_color_table(transform.color_map)
+        if lookup_table is not None:
+            color_table = color_table[lookup_table]
+        return np.take(color_table, array, axis=0)
+    if lookup_table is not None:
+        if array.ndim == 3 and array.shape[2] == 4:
+            # alpha channel is not changed
+            array = np.array(array)
+            array[..., :3] = np.take(lookup_table, array[..., :3])
+        else:
+            array = np.take(lookup_table, array)
+    result = np.ascontiguousarray(array)
+    if np.may_share_memory(result, source):
+        result = result.copy()
+    return result
+
+
+def transform_qimage(image, transform):
+    """
+    Returns image transformed by Qt (in the calling thread). Used if the
+    image formats of the worker threads are missing (Qt < 5.2), contrast
+    and color map are not applied
+    """
+    width, height = transform.get_size(image.width(), image.height())
+    if transform.rotation:
+        image = image.transformed(QtImport.QTransform().rotate(transform.rotation))
+    if transform.flip_horizontal or transform.flip_vertical:
+        image = image.mirrored(transform.flip_horizontal, transform.flip_vertical)
+    if (width, height) != (image.width(), image.height()):
+        if transform.smooth:
+            mode = QtImport.Qt.SmoothTransformation
+        else:
+            mode = QtImport.Qt.FastTransformation
+        image = image.scaled(width, height, QtImport.Qt.IgnoreAspectRatio, mode)
+    return image
+
+
+def qimage_to_numpy(image):
+    """
+    Returns (array, format, image): array shares memory with the returned
+    image, which must be kept alive. Images with other than 8 bit channels
+    are converted to Format_RGB32
+    """
+    if image.format() not in QIMAGE_CHANNELS:
+        image = image.convertToFormat(QtImport.QImage.Format_RGB32)
+    channels = QIMAGE_CHANNELS[image.format()]
+    buffer = image.constBits()
+    buffer.setsize(image.bytesPerLine() * image.height())
+    array = np.frombuffer(buffer, dtype=np.uint8).reshape(
+        image.height(), image.bytesPerLine()
+    )
+    array = array[:, : image.width() * channels]
+    if channels > 1:
+        array = array.reshape(image.height(), image.width(), channels)
+    # memory belongs to the image
+    array = array.view()
+    array.flags.writeable = False
+    return array, image.format(), image
+
+
+class TransformRunnable(QtImport.QRunnable):
+    def __init__(self, pipeline, consumer, request, array, transform):
+        QtImport.QRunnable.__init__(self)
+        self.pipeline = pipeline
+        self.consumer = consumer
+        self.request = request
+        self.array = array
+        self.transform = transform
+
+    def run(self):
+        self.pipeline.run_transform(
+            self.consumer, self.request, self.array, self.transform
+        )
+
+
+class ImagePipeline(QtImport.QObject):
+    """Worker pool transforming images of views"""
+
+    imageReadySignal = QtImport.pyqtSignal(object, object, object)
+
+    def __init__(self, num_workers=DEFAULT_NUM_WORKERS, cache_size=SNAPSHOT_CACHE_SIZE):
+        QtImport.QObject.__init__(self)
+
+        self._thread_pool = QtImport.QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(num_workers)
+        self._cache_size = cache_size
+        # (image cache key, transform key): transformed QImage
+        self._cache = OrderedDict()
+        # consumer: latest request (image format, callback, cache key)
+        self._requests = {}
+        self.statistics = {"submitted": 0, "done": 0, "cancelled": 0, "cache_hits": 0}
+
+        self.imageReadySignal.connect(self.image_ready, QtImport.Qt.QueuedConnection)
+
+    def process(self, consumer, image, transform, callback, cache=False):
+        """
+        Transforms image (QImage or numpy array) in a worker thread and
+        calls callback with the resulting QImage in the GUI thread.
+        The previous request of consumer is cancelled. With cache the
+        result is stored (use for snapshots, not for camera frames)
+        """
+        cache_key = None
+        if cache and isinstance(image, QtImport.QImage):
+            cache_key = (image.cacheKey(), transform.key())
+            if cache_key in self._cache:
+                self.cancel(consumer)
+                self._cache[cache_key] = self._cache.pop(cache_key)
+                self.statistics["cache_hits"] += 1
+                callback(self._cache[cache_key])
+                return
+
+        if isinstance(image, QtImport.QImage):
+            array, image_format, image = qimage_to_numpy(image)
+        else:
+            array = np.asarray(image)
+            channels = 1 if array.ndim == 2 else array.shape[2]
+            image_format = IMAGE_FORMATS.get((array.dtype, channels))
+        if transform.color_map is not None and array.ndim == 2:
+            image_format = COLOR_MAP_FORMAT
+            if image_format is None:
+                self.process_sync(consumer, image, transform, callback)
+                return
+
+        # the source image is referenced until the transformation is done
+        request = (image_format, callback, cache_key, image)
+        if consumer in self._requests:
+            self.statistics["cancelled"] += 1
+        self._requests[consumer] = request
+        self.statistics["submitted"] += 1
+        self._thread_pool.start(
+            TransformRunnable(self, consumer, request, array, transform)
+        )
+
+    def process_sync(self, consumer, image, transform, callback):
+        """Transforms image with QImage.scaled and calls callback"""
+        self.cancel(consumer)
+        if not isinstance(image, QtImport.QImage):
+            image = numpy_to_qimage(image)
+        self.statistics["done"] += 1
+        callback(transform_qimage(image, transform))
+
+    def cancel(self, consumer):
+        """Cancels pending request of consumer"""
+        if self._requests.pop(consumer, None) is not None:
+            self.statistics["cancelled"] += 1
+
+    def is_pending(self, consumer):
+        return consumer in self._requests
+
+    def run_transform(self, consumer, request, array, transform):
+        """Called in a worker thread"""
+        if self._requests.get(consumer) is not request:
+            # superseded before it was started
+            return
+        try:
+            result = transform_array(array, transform)
+        except BaseException as ex:
+            result = ex
+        self.imageReadySignal.emit(consumer, request, result)
+
+    def image_ready(self, consumer, request, result):
+        if self._requests.get(consumer) is not request:
+            return
+        del self._requests[consumer]
+        if isinstance(result, BaseException):
+            logging.getLogger().error("Could not transform image: %s", str(result))
+            return
+
+        image_format, callback, cache_key = request[:3]
+        image = numpy_to_qimage(result, image_format)
+        if cache_key is not None:
+            self._cache[cache_key] = image
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        self.statistics["done"] += 1
+        callback(image)
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def wait_done(self, msecs=-1):
+        """Waits for running transformations (results are not delivered)"""
+        return self._thread_pool.waitForDone(msecs)
+
+
+IMAGE_PIPELINE = None
+
+
+def get_image_pipeline():
+    global IMAGE_PIPELINE
+    if IMAGE_PIPELINE is None:
+        IMAGE_PIPELINE = ImagePipeline()
+    return IMAGE_PIPELINE
@@ -0,0 +1,299 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Batched mirroring of the GUI between instances
+
+Widget updates (brick name, widget name, method name, arguments,
+master sync) of the instance in control are coalesced by the brick change
+queue of BaseWidget (see brick_change_queue), which delivers them in one
+burst. MirrorBatcher does not wait any longer: it sends the updates and
+tab changes of one pass of the event loop as one message. Values equal to
+the last sent value are not sent again.
+
+MirrorState holds the last value of every widget method and tab, sent or
+received, so a newly connected instance gets the whole GUI state in one
+snapshot message instead of replaying the event history. The snapshot is
+broadcast to all connected instances: instances already up to date apply
+only the values that differ from their own state, i.e. none.
+
+Messages are dicts {"updates": [...], "tabs": [...], "snapshot": bool}
+applied on the receiving instance with apply_message. Messages and bytes
+per second are counted by MirrorStatistics.
+"""
+
+import time
+import pickle
+from collections import OrderedDict, deque
+
+from gui.utils import QtImport
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+# Period in seconds used to compute messages and bytes per second
+RATE_WINDOW = 10
+
+
+def get_message_size(message):
+    """Size of the pickled message in bytes"""
+    return len(pickle.dumps(message, 2))
+
+
+def get_update_method(bricks, brick_name, widget_name, method_name):
+    """
+    Returns the method called by a widget update, None if there is none.
+    :param bricks: dict brick name: brick
+    """
+    try:
+        widget = bricks[brick_name]
+        if widget_name:
+            widget = getattr(widget, widget_name)
+        return getattr(widget, method_name)
+    except (KeyError, AttributeError):
+        return None
+
+
+def apply_message(message, apply_update, apply_tab):
+    """
+    Applies widget updates and then tab changes of message.
+    :param apply_update: called with (brick_name, widget_name, method_name,
+                         method_args, master_sync)
+    :param apply_tab: called with (tab_name, tab_index)
+    """
+    for update in message.get("updates", ()):
+        apply_update(*update)
+    for tab_name, tab_index in message.get("tabs", ()):
+        apply_tab(tab_name, tab_index)
+
+
+class MirrorState(object):
+    """Last value of every mirrored widget method and tab"""
+
+    def __init__(self):
+        # (brick_name, widget_name, method_name): update
+        self.widgets = OrderedDict()
+        # tab_name: tab_index
+        self.tabs = OrderedDict()
+
+    def update_widget(
+        self, brick_name, widget_name, method_name, method_args, master_sync
+    ):
+        """Returns True if the value changed"""
+        key = (brick_name, widget_name, method_name)
+        update = (brick_name, widget_name, method_name, tuple(method_args), master_sync)
+        if self.widgets.get(key) == update:
+            return False
+        self.widgets.pop(key, None)
+        self.widgets[key] = update
+        return True
+
+    def update_tab(self, tab_name, tab_index):
+        """Returns True if the value changed"""
+        if self.tabs.get(tab_name) == tab_index:
+            return False
+        self.tabs.pop(tab_name, None)
+        self.tabs[tab_name] = tab_index
+        return True
+
+    def record_message(self, message):
+        """
+        Updates the state with a received message.
+        :returns: message with the updates and tab changes to apply. All
+                  of them, except for a snapshot: values equal to the
+                  state are already applied
+        """
+        changed = {
+            "updates": [],
+            "tabs": [],
+            "snapshot": message.get("snapshot", False),
+        }
+        for update in message.get("updates", ()):
+            if self.update_widget(*update) or not changed["snapshot"]:
+                changed["updates"].append(update)
+        for tab_name, tab_index in message.get("tabs", ()):
+            if self.update_tab(tab_name, tab_index) or not changed["snapshot"]:
+                changed["tabs"].append((tab_name, tab_index))
+        return changed
+
+    def get_snapshot(self):
+        return {
+            "updates": list(self.widgets.values()),
+            "tabs": list(self.tabs.items()),
+            "snapshot": True,
+        }
+
+    def clear(self):
+        self.widgets.clear()
+        self.tabs.clear()
+
+
+class MirrorStatistics(object):
+    """Messages and bytes sent by a MirrorBatcher"""
+
+    def __init__(self):
+        self.start_time = time.time()
+        # updates and tab changes given to the batcher
+        self.received = 0
+        # not sent: replaced in the same message or equal to the sent value
+        self.coalesced = 0
+        self.sent = 0
+        self.messages = 0
+        self.snapshots = 0
+        self.bytes = 0
+        # (time, bytes) of the messages of the last RATE_WINDOW seconds
+        self.recent_messages = deque()
+
+    def message_sent(self, num_bytes, num_values, snapshot=False):
+        now = time.time()
+        self.messages += 1
+        self.bytes += num_bytes
+        if snapshot:
+            self.snapshots += 1
+        else:
+            self.sent += num_values
+        self.recent_messages.append((now, num_bytes))
+        while self.recent_messages[0][0] < now - RATE_WINDOW:
+            self.recent_messages.popleft()
+
+    def get_rates(self):
+        """Returns messages and bytes per second of the last RATE_WINDOW s"""
+        now = time.time()
+        while self.recent_messages and self.recent_messages[0][0] < now - RATE_WINDOW:
+            self.recent_messages.popleft()
+        period = min(RATE_WINDOW, max(now - self.start_time, 1e-3))
+        return (
+            len(self.recent_messages) / period,
+            sum(num_bytes for _, num_bytes in self.recent_messages) / period,
+        )
+
+    def as_dict(self):
+        messages_per_second, bytes_per_second = self.get_rates()
+        return {
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "sent": self.sent,
+            "messages": self.messages,
+            "snapshots": self.snapshots,
+            "bytes": self.bytes,
+            "messages_per_second": messages_per_second,
+            "bytes_per_second": bytes_per_second,
+        }
+
+
+class MirrorBatcher(QtImport.QObject):
+    """Sends the widget updates and tab changes of one event loop pass"""
+
+    def __init__(self, send_function, parent=None):
+        """
+        :param send_function: called with the message (dict)
+        """
+        QtImport.QObject.__init__(self, parent)
+
+        self.send_function = send_function
+        self.state = MirrorState()
+        self.statistics = MirrorStatistics()
+
+        self._pending_updates = OrderedDict()
+        self._pending_tabs = OrderedDict()
+        # fires once the pending events are processed, no extra latency
+        self._timer = QtImport.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.flush)
+
+    def add_update(
+        self, brick_name, widget_name, method_name, method_args, master_sync
+    ):
+        self.statistics.received += 1
+        key = (brick_name, widget_name, method_name)
+        update = (brick_name, widget_name, method_name, tuple(method_args), master_sync)
+        if self._pending_updates.pop(key, None) is not None:
+            self.statistics.coalesced += 1
+        if self.state.widgets.get(key) == update:
+            # value already sent
+            self.statistics.coalesced += 1
+            return
+        self._pending_updates[key] = update
+        self._schedule()
+
+    def add_tab(self, tab_name, tab_index):
+        self.statistics.received += 1
+        if self._pending_tabs.pop(tab_name, None) is not None:
+            self.statistics.coalesced += 1
+        if self.state.tabs.get(tab_name) == tab_index:
+            self.statistics.coalesced += 1
+            return
+        self._pending_tabs[tab_name] = tab_index
+        self._schedule()
+
+    def record_message(self, message):
+        """
+        Updates the state with a message received from another instance.
+        :returns: message with the updates and tab changes to apply
+        """
+        return self.state.record_message(message)
+
+    def _schedule(self):
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def has_pending_updates(self):
+        return bool(self._pending_updates or self._pending_tabs)
+
+    def flush(self):
+        """Sends the pending updates in one message"""
+        self._timer.stop()
+        if not self.has_pending_updates():
+            return
+
+        for update in self._pending_updates.values():
+            self.state.update_widget(*update)
+        for tab_name, tab_index in self._pending_tabs.items():
+            self.state.update_tab(tab_name, tab_index)
+
+        message = {
+            "updates": list(self._pending_updates.values()),
+            "tabs": list(self._pending_tabs.items()),
+            "snapshot": False,
+        }
+        self._pending_updates = OrderedDict()
+        self._pending_tabs = OrderedDict()
+        self._send(message)
+
+    def send_snapshot(self):
+        """
+        Sends the pending updates and then the whole state. The message
+        goes to every connected instance, see MirrorState.record_message
+        """
+        self.flush()
+        self._send(self.state.get_snapshot())
+
+    def _send(self, message):
+        self.statistics.message_sent(
+            get_message_size(message),
+            len(message["updates"]) + len(message["tabs"]),
+            message["snapshot"],
+        )
+        self.send_function(message)
+
+    def get_statistics(self):
+        return self.statistics.as_dict()
@@ -0,0 +1,323 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compiled GUI layout cache
+
+Parsing a GUI file (yml, json or legacy .gui with pickled property bags)
+is done once. The resolved layout tree, the mnemonics of hardware objects
+used by each brick and the paths of brick modules are stored in a single
+pickle file. Cache file is valid while the GUI file has the same
+modification time and size, or the same sha1 hash, and the bricks search
+path (standard and custom bricks directories) has not changed.
+"""
+
+import os
+import imp
+import json
+import pickle
+import hashlib
+import logging
+from collections import OrderedDict
+
+import gui
+
+try:
+    import ruamel.yaml as yaml
+except ImportError:
+    import yaml
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+# Increase if the content of the compiled layout changes
+CACHE_VERSION = 2
+CACHE_DIRECTORY_NAME = "layout_cache"
+
+
+class LayoutLoader(yaml.SafeLoader):
+    """Safe yaml loader accepting tuples (used in signals and slots)"""
+
+
+LayoutLoader.add_constructor(
+    "tag:yaml.org,2002:python/tuple",
+    lambda loader, node: tuple(loader.construct_sequence(node)),
+)
+
+
+class CompiledLayout(object):
+    """Parsed GUI file with resolved properties"""
+
+    def __init__(self, layout, mnemonics, brick_mnemonics, brick_modules):
+        # list of windows with properties of items already unpickled
+        self.layout = layout
+        # list of all hardware objects mnemonics
+        self.mnemonics = mnemonics
+        # dict brick name: list of mnemonics
+        self.brick_mnemonics = brick_mnemonics
+        # dict brick type: module file name
+        self.brick_modules = brick_modules
+
+
+def is_dict_layout(filename):
+    """True if the properties are stored as dict (yml and json files)"""
+    return filename.endswith(".json") or filename.endswith(".yml")
+
+
+def parse_layout(filename, text):
+    """Returns list of windows defined in the text of a GUI file"""
+    if filename.endswith(".json"):
+        return json.loads(text)
+    elif filename.endswith(".yml"):
+        return yaml.load(text, Loader=LayoutLoader)
+    else:
+        return eval(text)
+
+
+def resolve_properties(items_list, load_from_dict, brick_mnemonics):
+    """
+    Unpickles properties of the bricks (if needed) and collects mnemonics
+    of hardware objects used by the bricks.
+    Mnemonics of each brick are stored in brick_mnemonics.
+
+    :returns: list of all mnemonics
+    """
+    mne_list = []
+
+    for item in items_list:
+        if "brick" in item:
+            brick_mne_list = brick_mnemonics.setdefault(item["name"], [])
+            try:
+                if load_from_dict:
+                    props = item["properties"]
+                else:
+                    props = pickle.loads(item["properties"])
+            except BaseException:
+                logging.getLogger().exception(
+                    "Could not load properties for %s" % item["name"]
+                )
+            else:
+                item["properties"] = props
+                try:
+                    for prop in props:
+                        if load_from_dict:
+                            prop_value = prop["value"]
+                        else:
+                            prop_value = prop.get_value()
+                        if isinstance(prop_value, type("")) and prop_value.startswith(
+                            "/"
+                        ):
+                            mne_list.append(prop_value)
+                            brick_mne_list.append(prop_value)
+                except BaseException:
+                    logging.exception(
+                        "Could not " + "build list of required " + "hardware objects"
+                    )
+
+            continue
+
+        mne_list += resolve_properties(
+            item["children"], load_from_dict, brick_mnemonics
+        )
+
+    return mne_list
+
+
+def find_brick_modules(items_list, brick_modules=None):
+    """Returns dict brick type: file name of the brick module"""
+    if brick_modules is None:
+        brick_modules = {}
+
+    for item in items_list:
+        if "brick" in item:
+            brick_type = item["type"]
+            if brick_type not in brick_modules:
+                try:
+                    fp, path_name, description = imp.find_module(brick_type)
+                except ImportError:
+                    continue
+                if fp:
+                    fp.close()
+                brick_modules[brick_type] = path_name
+        else:
+            find_brick_modules(item["children"], brick_modules)
+
+    return brick_modules
+
+
+def compile_layout(filename, source=None):
+    """
+    Parses GUI file and resolves its properties
+
+    :returns: CompiledLayout
+    """
+    if source is None:
+        with open(filename, "rb") as source_file:
+            source = source_file.read()
+
+    layout = parse_layout(filename, source.decode("utf-8"))
+    brick_mnemonics = OrderedDict()
+    mnemonics = resolve_properties(layout, is_dict_layout(filename), brick_mnemonics)
+
+    return CompiledLayout(
+        layout, mnemonics, brick_mnemonics, find_brick_modules(layout)
+    )
+
+
+def get_cache_filename(filename, cache_dir):
+    """Returns name of the cache file of the GUI file"""
+    filename = os.path.abspath(filename)
+    path_hash = hashlib.sha1(filename.encode("utf-8")).hexdigest()[:10]
+    return os.path.join(
+        cache_dir, "%s-%s.cache" % (os.path.basename(filename), path_hash)
+    )
+
+
+def get_bricks_search_path():
+    """
+    Returns directories searched for brick modules, custom bricks
+    directories (--bricksDirs, CUSTOM_BRICKS_PATH) first
+    """
+    return list(gui.get_custom_bricks_dirs()) + [gui.base_bricks_path]
+
+
+def _get_source_info(filename, source=None, bricks_path=None):
+    filestat = os.stat(filename)
+    source_info = {
+        "filename": os.path.abspath(filename),
+        "mtime": filestat.st_mtime,
+        "size": filestat.st_size,
+    }
+    if source is not None:
+        source_info["sha1"] = hashlib.sha1(source).hexdigest()
+    if bricks_path is not None:
+        source_info["bricks_path"] = list(bricks_path)
+    return source_info
+
+
+def _write_cache_file(cache_filename, cached):
+    tmp_filename = "%s.%d.tmp" % (cache_filename, os.getpid())
+    with open(tmp_filename, "wb") as cache_file:
+        pickle.dump(cached, cache_file, pickle.HIGHEST_PROTOCOL)
+    os.rename(tmp_filename, cache_filename)
+
+
+def load_cached_layout(filename, cache_dir, bricks_path=None):
+    """
+    Returns CompiledLayout from the cache or None if the cache does not
+    exist or is out of date.
+    :param bricks_path: bricks search path, default get_bricks_search_path()
+    """
+    if bricks_path is None:
+        bricks_path = get_bricks_search_path()
+    cache_filename = get_cache_filename(filename, cache_dir)
+    try:
+        with open(cache_filename, "rb") as cache_file:
+            cached = pickle.loads(cache_file.read())
+    except (IOError, OSError):
+        return None
+    except BaseException:
+        logging.getLogger().warning("Could not read layout cache %s", cache_filename)
+        return None
+
+    if not isinstance(cached, dict) or cached.get("version") != CACHE_VERSION:
+        return None
+
+    cached_info = cached["source"]
+    if cached_info.get("bricks_path") != list(bricks_path):
+        # brick modules were found with other bricks directories
+        return None
+
+    source_info = _get_source_info(filename)
+    if (
+        source_info["filename"] != cached_info["filename"]
+        or source_info["mtime"] != cached_info["mtime"]
+        or source_info["size"] != cached_info["size"]
+    ):
+        # File was touched, valid if the content is the same
+        with open(filename, "rb") as source_file:
+            sha1 = hashlib.sha1(source_file.read()).hexdigest()
+        if sha1 != cached_info["sha1"]:
+            return None
+
+        # next start does not have to hash the file
+        cached_info.update(source_info)
+        try:
+            _write_cache_file(cache_filename, cached)
+        except BaseException:
+            logging.getLogger().warning(
+                "Could not update layout cache %s", cache_filename
+            )
+
+    return cached["layout"]
+
+
+def save_cached_layout(
+    compiled_layout, filename, cache_dir, source=None, bricks_path=None
+):
+    """
+    Saves compiled layout, returns name of the cache file.
+    :param bricks_path: bricks search path the brick modules were found
+                        with, default get_bricks_search_path()
+    """
+    if bricks_path is None:
+        bricks_path = get_bricks_search_path()
+    if source is None:
+        with open(filename, "rb") as source_file:
+            source = source_file.read()
+
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+
+    cache_filename = get_cache_filename(filename, cache_dir)
+    _write_cache_file(
+        cache_filename,
+        {
+            "version": CACHE_VERSION,
+            "source": _get_source_info(filename, source, bricks_path),
+            "layout": compiled_layout,
+        },
+    )
+    return cache_filename
+
+
+def load_layout(filename, cache_dir=None):
+    """
+    Returns CompiledLayout of the GUI file. If cache_dir is defined the
+    compiled layout is read from the cache or stored in the cache.
+    """
+    if cache_dir:
+        compiled_layout = load_cached_layout(filename, cache_dir)
+        if compiled_layout is not None:
+            return compiled_layout
+
+    with open(filename, "rb") as source_file:
+        source = source_file.read()
+    compiled_layout = compile_layout(filename, source)
+
+    if cache_dir:
+        try:
+            save_cached_layout(compiled_layout, filename, cache_dir, source)
+        except BaseException:
+            logging.getLogger().exception(
+                "Could not save layout cache of %s", filename
+            )
+    return compiled_layout
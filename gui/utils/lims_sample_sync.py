@@ -0,0 +1,269 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Asynchronous synchronisation of the sample list with LIMS
+
+Samples of a session are retrieved from LIMS (get_samples) in a greenlet,
+or in a thread of the gevent thread pool if the LIMS client blocks, so the
+GUI stays responsive while LIMS is slow. The last sample list of each
+session is cached on disk: it is displayed immediately and only the
+differences to the fresh list (diff_samples) have to be applied when LIMS
+answers.
+"""
+
+import os
+import time
+import pickle
+import logging
+
+import gevent
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+CACHE_DIRECTORY_NAME = "lims_samples"
+CACHE_VERSION = 1
+
+# Marks records of LIMS objects (attributes) as opposed to dicts
+OBJECT_KEY = "__lims_object__"
+
+
+class LimsSample(object):
+    """LIMS object restored from the cache, attributes as the LIMS object"""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def __repr__(self):
+        return "LimsSample(%s)" % ", ".join(
+            "%s=%r" % item for item in sorted(self.__dict__.items())
+        )
+
+
+def to_record(value):
+    """
+    Converts LIMS value (objects with attributes, dicts, lists) to plain
+    dicts and lists, that can be pickled and compared
+    """
+    if isinstance(value, dict):
+        return dict((key, to_record(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [to_record(item) for item in value]
+    if hasattr(value, "__dict__"):
+        record = dict(
+            (key, to_record(item))
+            for key, item in vars(value).items()
+            if not key.startswith("_")
+        )
+        record[OBJECT_KEY] = True
+        return record
+    return value
+
+
+def from_record(record):
+    """Converts record back to LIMS value, objects as LimsSample"""
+    if isinstance(record, dict):
+        values = dict(
+            (key, from_record(item))
+            for key, item in record.items()
+            if key != OBJECT_KEY
+        )
+        if record.get(OBJECT_KEY):
+            return LimsSample(**values)
+        return values
+    if isinstance(record, list):
+        return [from_record(item) for item in record]
+    return record
+
+
+def get_sample_key(record):
+    """Identifies a sample record: LIMS id or container, location and name"""
+    sample_id = record.get("sampleId")
+    if sample_id is not None:
+        return sample_id
+    return (
+        record.get("containerCode"),
+        record.get("containerSampleChangerLocation"),
+        record.get("sampleLocation"),
+        record.get("sampleName"),
+    )
+
+
+class SampleListDiff(object):
+    """Differences between two sample lists"""
+
+    def __init__(self, added=None, removed=None, changed=None):
+        # samples of the new list (LIMS values)
+        self.added = added or []
+        self.changed = changed or []
+        # samples of the old list
+        self.removed = removed or []
+
+    def is_empty(self):
+        return not (self.added or self.removed or self.changed)
+
+    def as_dict(self):
+        return {
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "changed": len(self.changed),
+        }
+
+
+def diff_samples(old_samples, new_samples):
+    """Returns SampleListDiff of new_samples compared to old_samples"""
+    old_records = [to_record(sample) for sample in old_samples]
+    old_keys = [get_sample_key(record) for record in old_records]
+    old_records = dict(zip(old_keys, old_records))
+    diff = SampleListDiff()
+    new_keys = set()
+
+    for sample in new_samples:
+        record = to_record(sample)
+        key = get_sample_key(record)
+        new_keys.add(key)
+        old_record = old_records.get(key)
+        if old_record is None:
+            diff.added.append(sample)
+        elif old_record != record:
+            diff.changed.append(sample)
+
+    for sample, key in zip(old_samples, old_keys):
+        if key not in new_keys:
+            diff.removed.append(sample)
+    return diff
+
+
+def get_cache_filename(cache_dir, proposal_id, session_id):
+    return os.path.join(cache_dir, "samples-%s-%s.cache" % (proposal_id, session_id))
+
+
+def load_cached_samples(cache_dir, proposal_id, session_id):
+    """Returns the cached sample list of the session or None"""
+    cache_filename = get_cache_filename(cache_dir, proposal_id, session_id)
+    try:
+        with open(cache_filename, "rb") as cache_file:
+            cached = pickle.loads(cache_file.read())
+    except (IOError, OSError):
+        return None
+    except BaseException:
+        logging.getLogger().warning("Could not read sample cache %s", cache_filename)
+        return None
+
+    if not isinstance(cached, dict) or cached.get("version") != CACHE_VERSION:
+        return None
+    return [from_record(record) for record in cached["samples"]]
+
+
+def save_cached_samples(samples, cache_dir, proposal_id, session_id):
+    """Saves the sample list of the session, returns name of the cache file"""
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+
+    cache_filename = get_cache_filename(cache_dir, proposal_id, session_id)
+    tmp_filename = "%s.%d.tmp" % (cache_filename, os.getpid())
+    with open(tmp_filename, "wb") as cache_file:
+        pickle.dump(
+            {
+                "version": CACHE_VERSION,
+                "time": time.time(),
+                "samples": [to_record(sample) for sample in samples],
+            },
+            cache_file,
+            pickle.HIGHEST_PROTOCOL,
+        )
+    os.rename(tmp_filename, cache_filename)
+    return cache_filename
+
+
+class LimsSampleSync(object):
+    """Retrieves samples from LIMS in the background and caches them"""
+
+    def __init__(self, lims, cache_dir=None, in_thread=False):
+        """
+        :param lims: LIMS client with get_samples(proposal_id, session_id)
+        :param cache_dir: directory of the sample cache, None: no cache
+        :param in_thread: get_samples is called in a thread (LIMS client
+                          blocking gevent), otherwise in a greenlet
+        """
+        self.lims = lims
+        self.cache_dir = cache_dir
+        self.in_thread = in_thread
+        self.fetch_time = None
+
+        self._fetch_task = None
+
+    def load_cached_samples(self, proposal_id, session_id):
+        if self.cache_dir is None:
+            return None
+        return load_cached_samples(self.cache_dir, proposal_id, session_id)
+
+    def fetch_samples(self, proposal_id, session_id, callback):
+        """
+        Retrieves samples of the session from LIMS and caches them. Returns
+        immediately, callback is called with the sample list in the main
+        thread. A sync in progress is cancelled
+        """
+        self.cancel()
+        self._fetch_task = gevent.spawn(
+            self._fetch_samples, proposal_id, session_id, callback
+        )
+        return self._fetch_task
+
+    def is_fetching(self):
+        return self._fetch_task is not None and not self._fetch_task.ready()
+
+    def cancel(self):
+        if self.is_fetching():
+            self._fetch_task.kill(block=False)
+        self._fetch_task = None
+
+    def wait(self, timeout=None):
+        if self._fetch_task is not None:
+            self._fetch_task.join(timeout)
+
+    def _fetch_samples(self, proposal_id, session_id, callback):
+        start_time = time.time()
+        try:
+            if self.in_thread:
+                samples = gevent.get_hub().threadpool.apply(
+                    self.lims.get_samples, (proposal_id, session_id)
+                )
+            else:
+                samples = self.lims.get_samples(proposal_id, session_id)
+        except BaseException:
+            logging.getLogger("GUI").exception("Could not retrieve samples from LIMS")
+            return
+        self.fetch_time = time.time() - start_time
+        samples = samples or []
+
+        if self.cache_dir is not None:
+            try:
+                save_cached_samples(samples, self.cache_dir, proposal_id, session_id)
+            except BaseException:
+                logging.getLogger().warning(
+                    "Could not save sample cache in %s", self.cache_dir, exc_info=True
+                )
+        try:
+            callback(samples)
+        except BaseException:
+            logging.getLogger("GUI").exception("Could not update samples from LIMS")
@@ -104,10 +104,11 @@ class QueueItem(QtImport.QTreeWidgetItem):
         if self._data_model:
             self._data_model.set_enabled(check_state > 0)
 
-    def set_hidden(self, hidden):
+    def set_hidden(self, hidden, recursive=True):
         self.setHidden(hidden)
-        for index in range(self.childCount()):
-            self.child(index).setHidden(hidden)
+        if recursive:
+            for index in range(self.childCount()):
+                self.child(index).setHidden(hidden)
 
         if self._queue_entry:
             self._queue_entry.set_enabled(not hidden)
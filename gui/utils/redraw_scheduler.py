@@ -0,0 +1,236 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Redraw scheduler shared by the plot widgets
+
+Plot widgets do not draw their canvas when data is updated, they mark it
+dirty with request_redraw. Dirty canvases are redrawn from the Qt event
+loop, at most max frame rate times per second. Several requests arriving
+between two frames are coalesced into a single redraw. Hidden canvases
+are not drawn, they are redrawn when shown again.
+"""
+
+import time
+import logging
+import weakref
+from collections import OrderedDict
+
+from gui.utils import QtImport
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+DEFAULT_MAX_FRAME_RATE = 20
+
+
+class RedrawStatistics(object):
+    """Redraw counters of one widget"""
+
+    def __init__(self, name):
+        self.name = name
+        # number of redraw requests
+        self.requested = 0
+        # number of redraws done
+        self.drawn = 0
+        # requests merged into an already pending redraw
+        self.coalesced = 0
+        # pending redraws skipped because the widget was hidden
+        self.dropped = 0
+        # total time spent in drawing (seconds)
+        self.draw_time = 0
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "requested": self.requested,
+            "drawn": self.drawn,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "draw_time": self.draw_time,
+        }
+
+
+class RedrawScheduler(QtImport.QObject):
+    """Coalesces and rate limits redraws of plot widgets"""
+
+    def __init__(self, max_frame_rate=DEFAULT_MAX_FRAME_RATE, clock=time.time):
+        """
+        :param clock: function returning the current time in seconds
+        """
+        QtImport.QObject.__init__(self)
+
+        self._clock = clock
+        self._frame_interval = 1.0 / max_frame_rate
+        self._last_frame_time = 0
+        # widget: draw function, in order of requests
+        self._pending = OrderedDict()
+        self._statistics = weakref.WeakKeyDictionary()
+        self._hidden = weakref.WeakKeyDictionary()
+
+        self._timer = None
+
+    def _get_timer(self):
+        # Timer is created on the first request, when QApplication exists
+        if self._timer is None:
+            self._timer = QtImport.QTimer(self)
+            self._timer.setSingleShot(True)
+            self._timer.timeout.connect(self.redraw_pending)
+        return self._timer
+
+    def set_max_frame_rate(self, max_frame_rate):
+        self._frame_interval = 1.0 / max(max_frame_rate, 0.1)
+
+    def get_max_frame_rate(self):
+        return 1.0 / self._frame_interval
+
+    def request_redraw(self, widget, draw_function=None):
+        """
+        Marks widget dirty. It is redrawn at the next frame by calling
+        draw_function (default widget.draw)
+        """
+        statistics = self._get_statistics(widget)
+        statistics.requested += 1
+
+        if widget in self._pending:
+            statistics.coalesced += 1
+        self._pending[widget] = draw_function or widget.draw
+
+        timer = self._get_timer()
+        if not timer.isActive():
+            delay = self._last_frame_time + self._frame_interval - self._clock()
+            timer.start(max(0, int(delay * 1000)))
+
+    def cancel_redraw(self, widget):
+        """Removes pending redraw of the widget (e.g. if it is cleared)"""
+        self._pending.pop(widget, None)
+
+    def is_pending(self, widget):
+        return widget in self._pending
+
+    def redraw_pending(self):
+        """Redraws all dirty widgets"""
+        self._last_frame_time = self._clock()
+        pending = self._pending
+        self._pending = OrderedDict()
+
+        for widget, draw_function in pending.items():
+            statistics = self._get_statistics(widget)
+            try:
+                visible = widget.isVisible()
+            except RuntimeError:
+                # underlying C++ object deleted
+                continue
+            if not visible:
+                statistics.dropped += 1
+                self._watch_show_event(widget, draw_function)
+                continue
+
+            start = time.time()
+            try:
+                draw_function()
+            except BaseException:
+                logging.getLogger().exception(
+                    "Could not redraw %s", statistics.name
+                )
+            statistics.drawn += 1
+            statistics.draw_time += time.time() - start
+
+    def flush(self):
+        """Redraws dirty widgets immediately"""
+        if self._timer is not None:
+            self._timer.stop()
+        self.redraw_pending()
+
+    def get_statistics(self, widget=None):
+        """
+        Returns counters (dict) of the widget or list of counters of
+        all widgets if widget is None
+        """
+        if widget is not None:
+            return self._get_statistics(widget).as_dict()
+        return [statistics.as_dict() for statistics in self._statistics.values()]
+
+    def reset_statistics(self):
+        for widget in list(self._statistics.keys()):
+            self._statistics[widget] = RedrawStatistics(
+                self._statistics[widget].name
+            )
+
+    def _get_statistics(self, widget):
+        statistics = self._statistics.get(widget)
+        if statistics is None:
+            name = widget.objectName() or widget.__class__.__name__
+            parent = widget.parent()
+            if parent is not None and parent.objectName():
+                name = "%s.%s" % (parent.objectName(), name)
+            statistics = RedrawStatistics(name)
+            self._statistics[widget] = statistics
+        return statistics
+
+    def _watch_show_event(self, widget, draw_function):
+        if widget not in self._hidden:
+            widget.installEventFilter(self)
+        # weak reference to the object of a bound method, otherwise the
+        # widget would be kept alive by the value of the weak dictionary
+        obj = getattr(draw_function, "__self__", None)
+        if obj is not None and hasattr(draw_function, "__func__"):
+            self._hidden[widget] = (weakref.ref(obj), draw_function.__func__)
+        else:
+            self._hidden[widget] = (None, draw_function)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QtImport.QEvent.Show and obj in self._hidden:
+            obj_ref, draw_function = self._hidden.pop(obj)
+            obj.removeEventFilter(self)
+            if obj_ref is not None:
+                method_obj = obj_ref()
+                if method_obj is None:
+                    return False
+                draw_function = draw_function.__get__(method_obj)
+            self.request_redraw(obj, draw_function)
+        return False
+
+
+REDRAW_SCHEDULER = None
+
+
+def get_redraw_scheduler():
+    global REDRAW_SCHEDULER
+    if REDRAW_SCHEDULER is None:
+        REDRAW_SCHEDULER = RedrawScheduler()
+    return REDRAW_SCHEDULER
+
+
+def request_redraw(widget, draw_function=None):
+    get_redraw_scheduler().request_redraw(widget, draw_function)
+
+
+def cancel_redraw(widget):
+    get_redraw_scheduler().cancel_redraw(widget)
+
+
+def get_statistics(widget=None):
+    return get_redraw_scheduler().get_statistics(widget)
+
+
+def set_max_frame_rate(max_frame_rate):
+    get_redraw_scheduler().set_max_frame_rate(max_frame_rate)
@@ -0,0 +1,195 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Reconciliation of the sample changer content with the LIMS samples
+
+LIMS samples are indexed by barcode and by location (index_lims_samples)
+and every sample changer sample is matched with one lookup. First by
+barcode, then by location:
+
+- matched: same barcode and location, or same location and no barcode
+  in LIMS. The LIMS sample is used
+- mismatched_location: barcode in LIMS, but at another location. The
+  sample changer sample is used
+- missing_barcode: LIMS sample at the location has a barcode, the sample
+  changer has none (or another one). The LIMS sample is used
+- unknown: no LIMS sample. The sample changer sample is used
+
+Samples are grouped by basket in one pass (group_samples_by_basket).
+Samples are queue model samples (code, location, lims_code, lims_location).
+"""
+
+import logging
+from collections import OrderedDict
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+MATCHED = "matched"
+MISMATCHED_LOCATION = "mismatched_location"
+MISSING_BARCODE = "missing_barcode"
+UNKNOWN = "unknown"
+
+STATUSES = (MATCHED, MISMATCHED_LOCATION, MISSING_BARCODE, UNKNOWN)
+
+
+def index_lims_samples(lims_sample_list):
+    """Returns dicts barcode: sample and location: sample"""
+    barcode_samples = {}
+    location_samples = {}
+    for sample in lims_sample_list:
+        if sample.lims_code:
+            barcode_samples[sample.lims_code] = sample
+        if sample.lims_location:
+            location_samples[sample.lims_location] = sample
+    return barcode_samples, location_samples
+
+
+class ReconciliationEntry(object):
+    """Sample changer sample, its LIMS sample and the match status"""
+
+    __slots__ = ("status", "sc_sample", "lims_sample")
+
+    def __init__(self, status, sc_sample, lims_sample):
+        self.status = status
+        self.sc_sample = sc_sample
+        self.lims_sample = lims_sample
+
+    def get_sample(self):
+        """Sample displayed in the tree"""
+        if self.status in (MATCHED, MISSING_BARCODE):
+            return self.lims_sample
+        return self.sc_sample
+
+    def as_dict(self):
+        return {
+            "status": self.status,
+            "location": self.sc_sample.location,
+            "code": self.sc_sample.code,
+            "lims_location": getattr(self.lims_sample, "lims_location", None),
+            "lims_code": getattr(self.lims_sample, "lims_code", None),
+        }
+
+
+class ReconciliationReport(object):
+    """Entries of the sample changer samples, in sample changer order"""
+
+    def __init__(self):
+        self.entries = []
+        self._entries_by_status = dict((status, []) for status in STATUSES)
+
+    def add(self, status, sc_sample, lims_sample=None):
+        entry = ReconciliationEntry(status, sc_sample, lims_sample)
+        self.entries.append(entry)
+        self._entries_by_status[status].append(entry)
+
+    def get_entries(self, status):
+        return self._entries_by_status[status]
+
+    def get_sample_list(self):
+        return [entry.get_sample() for entry in self.entries]
+
+    def get_counts(self):
+        return dict(
+            (status, len(entries))
+            for status, entries in self._entries_by_status.items()
+        )
+
+    def as_dict(self):
+        return {
+            "counts": self.get_counts(),
+            "entries": [entry.as_dict() for entry in self.entries],
+        }
+
+    def log(self, log=None):
+        """Logs counts and the samples with a wrong location or barcode"""
+        if log is None:
+            log = logging.getLogger("user_level_log")
+        counts = self.get_counts()
+        log.debug(
+            "Samples reconciled with LIMS: %d matched, %d with wrong location, "
+            "%d without barcode, %d unknown",
+            counts[MATCHED],
+            counts[MISMATCHED_LOCATION],
+            counts[MISSING_BARCODE],
+            counts[UNKNOWN],
+        )
+        if counts[MISMATCHED_LOCATION]:
+            log.warning(
+                "Samples with a barcode in LIMS but at another location "
+                "(sample changer location / LIMS location): %s",
+                ", ".join(
+                    "%s %s / %s"
+                    % (
+                        entry.sc_sample.code,
+                        entry.sc_sample.location,
+                        entry.lims_sample.lims_location,
+                    )
+                    for entry in self.get_entries(MISMATCHED_LOCATION)
+                ),
+            )
+        if counts[MISSING_BARCODE]:
+            log.warning(
+                "Samples with a barcode in LIMS, but no barcode information "
+                "in the sample changer. Locations: %s",
+                ", ".join(
+                    str(entry.sc_sample.location)
+                    for entry in self.get_entries(MISSING_BARCODE)
+                ),
+            )
+
+
+def reconcile_samples(sc_sample_list, barcode_samples, location_samples):
+    """
+    Matches sample changer samples with the LIMS samples indexed by
+    barcode and location (index_lims_samples).
+    Returns ReconciliationReport
+    """
+    report = ReconciliationReport()
+    for sc_sample in sc_sample_list:
+        lims_sample = barcode_samples.get(sc_sample.code) if sc_sample.code else None
+        if lims_sample is not None:
+            if lims_sample.lims_location == sc_sample.location:
+                report.add(MATCHED, sc_sample, lims_sample)
+            else:
+                report.add(MISMATCHED_LOCATION, sc_sample, lims_sample)
+            continue
+
+        lims_sample = location_samples.get(sc_sample.location)
+        if lims_sample is None:
+            report.add(UNKNOWN, sc_sample)
+        elif lims_sample.lims_code:
+            report.add(MISSING_BARCODE, sc_sample, lims_sample)
+        else:
+            report.add(MATCHED, sc_sample, lims_sample)
+    return report
+
+
+def group_samples_by_basket(sample_list):
+    """Returns OrderedDict basket number (location[0]): list of samples"""
+    baskets = OrderedDict()
+    for sample in sample_list:
+        basket_samples = baskets.get(sample.location[0])
+        if basket_samples is None:
+            basket_samples = baskets[sample.location[0]] = []
+        basket_samples.append(sample)
+    return baskets
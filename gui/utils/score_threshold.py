@@ -0,0 +1,160 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Threshold filtering of hit map scores
+
+Scores below the threshold are set to 0 in a buffer that is allocated once
+and reused. Score indices are sorted (on the first threshold change after
+a data update), so moving the threshold only rewrites the values that
+crossed it, found by binary search in the sorted scores.
+"""
+
+import numpy as np
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+class ScoreThresholdFilter(object):
+    """Keeps scores above a threshold in a reusable buffer"""
+
+    def __init__(self):
+        self.values = None
+        self.threshold = None
+        self._buffer = None
+        self._mask = None
+        # flat indices of values sorted by value and the sorted values
+        self._order = None
+        self._sorted_values = None
+        # number of values (first sorted values) set to 0 in the buffer
+        self._num_below = 0
+
+    def set_values(self, values):
+        """Sets the filtered array. The threshold is kept"""
+        self.values = np.asarray(values)
+        if (
+            self._buffer is None
+            or self._buffer.shape != self.values.shape
+            or self._buffer.dtype != self.values.dtype
+        ):
+            self._buffer = np.empty(self.values.shape, dtype=self.values.dtype)
+            self._mask = np.empty(self.values.shape, dtype=bool)
+        self.update()
+
+    def update(self):
+        """Refilters the values, after they were changed in place"""
+        self._order = None
+        self._sorted_values = None
+        if self.values is None:
+            return
+        np.copyto(self._buffer, self.values)
+        if self.threshold is not None:
+            np.less(self.values, self.threshold, out=self._mask)
+            np.copyto(self._buffer, 0, where=self._mask)
+
+    def clear(self):
+        self.values = None
+        self.threshold = None
+        self._order = None
+        self._sorted_values = None
+        self._num_below = 0
+
+    def _sort(self):
+        flat_values = self.values.reshape(-1)
+        self._order = np.argsort(flat_values)
+        self._sorted_values = flat_values[self._order]
+        self._num_below = self.get_num_below(self.threshold)
+
+    def get_num_below(self, threshold):
+        """Returns number of values lower than threshold"""
+        if threshold is None or self.values is None:
+            return 0
+        if self._sorted_values is None:
+            self._sort()
+        return int(np.searchsorted(self._sorted_values, threshold, side="left"))
+
+    def get_max_value(self):
+        if self.values is None or not self.values.size:
+            return 0
+        if self._sorted_values is None:
+            return np.nanmax(self.values)
+        # nan values are sorted at the end
+        return self._sorted_values[
+            max(self.values.size - self.get_num_nan() - 1, 0)
+        ]
+
+    def get_num_nan(self):
+        if self._sorted_values is None or self._sorted_values.dtype.kind != "f":
+            return 0
+        return self._sorted_values.size - int(
+            np.searchsorted(self._sorted_values, np.nan, side="left")
+        )
+
+    def get_percentile(self, percent):
+        """Returns the value at percent of the sorted values"""
+        if self.values is None or not self.values.size:
+            return 0
+        if self._sorted_values is None:
+            self._sort()
+        num_values = self.values.size - self.get_num_nan()
+        index = int(round(percent / 100.0 * max(num_values - 1, 0)))
+        return self._sorted_values[index]
+
+    def set_threshold(self, threshold):
+        """
+        Sets values lower than threshold to 0 (None disables filtering)
+        and returns the filtered array. Only values between the previous
+        and new threshold are written.
+        """
+        if self.values is None:
+            self.threshold = threshold
+            return None
+        if threshold is None and self.threshold is None:
+            # nothing filtered
+            return self._buffer
+        if self._sorted_values is None:
+            self._sort()
+
+        num_below = self.get_num_below(threshold)
+        flat_buffer = self._buffer.reshape(-1)
+        if num_below > self._num_below:
+            flat_buffer[self._order[self._num_below : num_below]] = 0
+        elif num_below < self._num_below:
+            indices = self._order[num_below : self._num_below]
+            flat_buffer[indices] = self.values.reshape(-1)[indices]
+        self._num_below = num_below
+        self.threshold = threshold
+        return self._buffer
+
+    def set_relative_threshold(self, percent):
+        """
+        Sets the threshold to percent of the maximum of the current values
+        (0 disables filtering) and returns the filtered array. Has to be
+        called again when the values change, as the maximum changes
+        """
+        threshold = None
+        if percent:
+            threshold = self.get_max_value() * percent / 100.0
+        return self.set_threshold(threshold)
+
+    def get_data(self):
+        """Returns the filtered array (reused buffer)"""
+        return self._buffer if self.values is not None else None
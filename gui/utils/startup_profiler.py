@@ -0,0 +1,264 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Startup profiler (enabled with the --profile-startup option)
+
+Records wall time of startup phases, brick steps (import, __init__,
+properties, run) and hardware object loading. Report is written as:
+    <report path>.json   : phases, bricks and hardware objects timing
+    <report path>.folded : folded stacks (input of flamegraph.pl or speedscope)
+"""
+
+import json
+import time
+import logging
+import weakref
+import functools
+from contextlib import contextmanager
+from collections import OrderedDict
+
+import gevent
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+BRICK_STEPS = ("import", "__init__", "properties", "run")
+
+_profiler = None
+
+
+class StartupProfiler(object):
+    """
+    Collects nested wall time measurements. Every greenlet has its own
+    stack of frames, frames of a greenlet spawned during startup (e.g.
+    hardware objects loaded by the preloader) are children of the root
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.start_time = None
+        self.report_path = None
+        # greenlet: list of frame labels
+        self._stacks = weakref.WeakKeyDictionary()
+        # key: stack tuple, value: [number of calls, total time, children time]
+        self._frames = OrderedDict()
+        self._bricks = OrderedDict()
+        self._hardware_objects = OrderedDict()
+
+    def enable(self, report_path=None):
+        self.enabled = True
+        self.start_time = time.time()
+        self.report_path = report_path
+
+    @contextmanager
+    def measure(self, label):
+        """Measures wall time of the code block as a child of current frame"""
+        if not self.enabled:
+            yield
+            return
+
+        stack = self._get_stack()
+        stack.append(label)
+        path = tuple(stack)
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            duration = time.time() - start_time
+            stack.pop()
+            frame = self._frames.setdefault(path, [0, 0.0, 0.0])
+            frame[0] += 1
+            frame[1] += duration
+            self._frames.setdefault(path[:-1], [0, 0.0, 0.0])[2] += duration
+
+    def _get_stack(self):
+        """Returns stack of frames of the current greenlet"""
+        current = gevent.getcurrent()
+        stack = self._stacks.get(current)
+        if stack is None:
+            stack = self._stacks[current] = ["startup"]
+        return stack
+
+    @contextmanager
+    def brick_step(self, brick_name, step):
+        """Measures one of the BRICK_STEPS of a brick"""
+        if not self.enabled:
+            yield
+            return
+
+        start_time = time.time()
+        try:
+            with self.measure("%s (%s)" % (brick_name, step)):
+                yield
+        finally:
+            steps = self._bricks.setdefault(brick_name, OrderedDict())
+            steps[step] = steps.get(step, 0.0) + time.time() - start_time
+
+    @contextmanager
+    def hardware_object(self, name):
+        """Measures loading of a hardware object"""
+        if not self.enabled:
+            yield
+            return
+
+        start_time = time.time()
+        try:
+            with self.measure("hwobj %s" % name):
+                yield
+        finally:
+            self._hardware_objects[name] = (
+                self._hardware_objects.get(name, 0.0) + time.time() - start_time
+            )
+
+    def instrument_hardware_repository(self, hardware_repository):
+        """Wraps hardware object loading method of the hardware repository"""
+        if not self.enabled:
+            return
+
+        for method_name in ("_loadHardwareObject", "getHardwareObject"):
+            method = getattr(hardware_repository, method_name, None)
+            if method is not None:
+                break
+        else:
+            logging.getLogger("HWR").warning(
+                "Startup profiler: hardware object loading can not be profiled"
+            )
+            return
+
+        @functools.wraps(method)
+        def load_hardware_object(name="", *args, **kwargs):
+            with self.hardware_object(name):
+                return method(name, *args, **kwargs)
+
+        setattr(hardware_repository, method_name, load_hardware_object)
+
+    def get_total_time(self):
+        if self.start_time is None:
+            return 0.0
+        return time.time() - self.start_time
+
+    def get_brick_times(self):
+        """Returns list of (brick name, steps dict, total time) sorted by time"""
+        brick_times = []
+        for brick_name, steps in self._bricks.items():
+            brick_times.append((brick_name, dict(steps), sum(steps.values())))
+        return sorted(brick_times, key=lambda brick: brick[2], reverse=True)
+
+    def get_hardware_object_times(self):
+        """Returns list of (hardware object name, time) sorted by time"""
+        return sorted(
+            self._hardware_objects.items(), key=lambda hwobj: hwobj[1], reverse=True
+        )
+
+    def get_top_offenders(self, count=10):
+        """Returns list of (description, time) of slowest bricks and hwobjs"""
+        offenders = [
+            ("brick %s" % brick_name, total_time)
+            for brick_name, steps, total_time in self.get_brick_times()
+        ]
+        offenders.extend(
+            ("hwobj %s" % name, load_time)
+            for name, load_time in self.get_hardware_object_times()
+        )
+        offenders.sort(key=lambda offender: offender[1], reverse=True)
+        return offenders[:count]
+
+    def get_report(self):
+        """Returns report as a dict"""
+        phases = []
+        for path, (calls, total_time, children_time) in self._frames.items():
+            if len(path) == 2:
+                phases.append({"name": path[1], "time": total_time})
+
+        return {
+            "total_time": self.get_total_time(),
+            "phases": phases,
+            "bricks": [
+                dict(name=brick_name, total=total_time, **steps)
+                for brick_name, steps, total_time in self.get_brick_times()
+            ],
+            "hardware_objects": [
+                {"name": name, "time": load_time}
+                for name, load_time in self.get_hardware_object_times()
+            ],
+        }
+
+    def get_folded_stacks(self):
+        """
+        Returns stacks in the folded format: frames separated by ";"
+        followed by self time in microseconds
+        """
+        lines = []
+        frames = OrderedDict(
+            (path, list(frame)) for path, frame in self._frames.items()
+        )
+        # Time of the root frame that was not measured by any child
+        root_frame = frames.setdefault(("startup",), [1, 0.0, 0.0])
+        root_frame[1] = max(self.get_total_time(), root_frame[2])
+
+        for path, (calls, total_time, children_time) in frames.items():
+            self_time = int((total_time - children_time) * 1e6)
+            if self_time > 0:
+                lines.append(
+                    "%s %d" % (";".join(frame.replace(";", ",") for frame in path),
+                               self_time)
+                )
+        return lines
+
+    def write_report(self, report_path=None):
+        """Writes json and folded stacks files, returns list of file names"""
+        report_path = report_path or self.report_path
+        if not report_path:
+            return []
+
+        json_filename = report_path + ".json"
+        folded_filename = report_path + ".folded"
+        with open(json_filename, "w") as report_file:
+            json.dump(self.get_report(), report_file, indent=2)
+        with open(folded_filename, "w") as folded_file:
+            folded_file.write("\n".join(self.get_folded_stacks()) + "\n")
+        return [json_filename, folded_filename]
+
+
+def get_profiler():
+    """Returns startup profiler singleton"""
+    global _profiler
+
+    if _profiler is None:
+        _profiler = StartupProfiler()
+    return _profiler
+
+
+def is_enabled():
+    return get_profiler().enabled
+
+
+def enable(report_path=None):
+    get_profiler().enable(report_path)
+
+
+def measure(label):
+    return get_profiler().measure(label)
+
+
+def brick_step(brick_name, step):
+    return get_profiler().brick_step(brick_name, step)
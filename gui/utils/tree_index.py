@@ -0,0 +1,435 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Lookup structures used by the queue tree (DataCollectTree)"""
+
+import os
+import weakref
+from collections import OrderedDict, namedtuple
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+class ModelItemIndex(object):
+    """
+    Maps queue model objects to their tree items.
+    Models are weak keys, so a model dropped from the queue model does not
+    keep its (already deleted) tree item alive.
+    """
+
+    def __init__(self):
+        self._items = weakref.WeakKeyDictionary()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, model):
+        return model in self._items
+
+    def add(self, model, item):
+        """Registers item as the view of model"""
+        if model is not None:
+            self._items[model] = item
+
+    def get(self, model, default=None):
+        """Returns item of the model or default if model is not indexed"""
+        if model is None:
+            return default
+        return self._items.get(model, default)
+
+    def remove(self, item):
+        """Removes item and all its children from the index"""
+        stack = [item]
+        while stack:
+            current = stack.pop()
+            model = current.get_model()
+            if model is not None and self._items.get(model) is current:
+                del self._items[model]
+            for index in range(current.childCount()):
+                stack.append(current.child(index))
+
+    def items(self):
+        """Returns a list of all indexed tree items"""
+        return list(self._items.values())
+
+    def clear(self):
+        self._items.clear()
+
+
+TreeFilterOptions = namedtuple(
+    "TreeFilterOptions",
+    [
+        "NONE",
+        "STAR",
+        "SAMPLE_NAME",
+        "PROTEIN_NAME",
+        "BASKET_INDEX",
+        "EXECUTED",
+        "NOT_EXECUTED",
+        "OSC",
+        "HELICAL",
+        "CHARACTERISATION",
+        "ENERGY_SCAN",
+        "XRF_SPECTRUM",
+    ],
+)
+
+# Same order as the items of TreeBrick filter combo
+TREE_FILTER_OPTIONS = TreeFilterOptions(*range(12))
+
+TEXT_FILTER_OPTIONS = (
+    TREE_FILTER_OPTIONS.SAMPLE_NAME,
+    TREE_FILTER_OPTIONS.PROTEIN_NAME,
+    TREE_FILTER_OPTIONS.BASKET_INDEX,
+)
+
+ItemKinds = namedtuple("ItemKinds", ["BASKET", "SAMPLE", "GROUP", "TASK"])
+ITEM_KINDS = ItemKinds("basket", "sample", "group", "task")
+
+TASK_TYPE_FILTERS = {
+    TREE_FILTER_OPTIONS.CHARACTERISATION: "characterisation",
+    TREE_FILTER_OPTIONS.ENERGY_SCAN: "energy_scan",
+    TREE_FILTER_OPTIONS.XRF_SPECTRUM: "xrf_spectrum",
+}
+
+
+class FilterRecord(object):
+    """Filter attributes of one tree item"""
+
+    __slots__ = (
+        "item",
+        "parent_key",
+        "kind",
+        "task_type",
+        "starred",
+        "executed",
+        "helical",
+        "sample_name",
+        "protein_acronym",
+        "basket_index",
+    )
+
+    def __init__(self, item, parent_key, kind, **attributes):
+        self.item = item
+        self.parent_key = parent_key
+        self.kind = kind
+        self.task_type = attributes.get("task_type")
+        self.starred = attributes.get("starred", False)
+        self.executed = attributes.get("executed", False)
+        self.helical = attributes.get("helical", False)
+        self.sample_name = attributes.get("sample_name") or ""
+        self.protein_acronym = attributes.get("protein_acronym") or ""
+        self.basket_index = attributes.get("basket_index")
+
+
+class TreeFilterIndex(object):
+    """
+    Filter engine of the queue tree. Filter attributes of every item are
+    kept in a FilterRecord, so evaluating a filter does not touch the
+    tree widget. Result is applied as a diff: only items with changed
+    visibility are hidden or shown.
+    """
+
+    def __init__(self):
+        self._records = {}
+        # None means that visibility was changed outside of the index
+        self._hidden_keys = set()
+
+    def __len__(self):
+        return len(self._records)
+
+    def update(self, item, kind, **attributes):
+        """Adds or updates filter attributes of the item"""
+        parent = item.parent()
+        parent_key = id(parent) if parent is not None else None
+        self._records[id(item)] = FilterRecord(item, parent_key, kind, **attributes)
+
+    def get(self, item):
+        return self._records.get(id(item))
+
+    def remove(self, item):
+        """Removes item and all its children from the index"""
+        stack = [item]
+        while stack:
+            current = stack.pop()
+            key = id(current)
+            self._records.pop(key, None)
+            if self._hidden_keys is not None:
+                self._hidden_keys.discard(key)
+            for index in range(current.childCount()):
+                stack.append(current.child(index))
+
+    def clear(self):
+        self._records.clear()
+        self._hidden_keys = set()
+
+    def invalidate_visibility(self):
+        """Item visibility was changed directly (without apply)"""
+        self._hidden_keys = None
+
+    def evaluate(self, option, text=""):
+        """
+        Returns a set of keys of items that should be hidden.
+        Baskets and task groups without visible children are hidden,
+        except for the protein name filter.
+        """
+        text = str(text)
+        basket_indexes = None
+        if option == TREE_FILTER_OPTIONS.BASKET_INDEX:
+            basket_indexes = self._parse_basket_indexes(text)
+
+        hidden = set()
+        for key, record in self._records.items():
+            if self._is_hidden(record, option, text, basket_indexes):
+                hidden.add(key)
+
+        if option != TREE_FILTER_OPTIONS.PROTEIN_NAME:
+            with_visible_children = set()
+            for key, record in self._records.items():
+                if key not in hidden and record.parent_key is not None:
+                    with_visible_children.add(record.parent_key)
+            for key, record in self._records.items():
+                if (
+                    record.kind in (ITEM_KINDS.BASKET, ITEM_KINDS.GROUP)
+                    and key not in with_visible_children
+                ):
+                    hidden.add(key)
+        return hidden
+
+    def apply(self, hidden_keys, set_hidden):
+        """
+        Calls set_hidden(item, state) for items which visibility differs
+        from hidden_keys. Returns number of changed items.
+        """
+        if self._hidden_keys is None:
+            self._hidden_keys = set(
+                key for key, record in self._records.items()
+                if record.item.isHidden()
+            )
+
+        changed_keys = hidden_keys.symmetric_difference(self._hidden_keys)
+        for key in changed_keys:
+            record = self._records.get(key)
+            if record is not None:
+                set_hidden(record.item, key in hidden_keys)
+        self._hidden_keys = set(hidden_keys)
+        return len(changed_keys)
+
+    def _parse_basket_indexes(self, text):
+        if text.isdigit():
+            # Display one basket
+            return (int(text),)
+        # Display several baskets. Separated with ","
+        basket_list = [value.strip() for value in text.split(",")]
+        if len(basket_list) > 1:
+            return tuple(int(value) for value in basket_list if value.isdigit())
+
+    def _is_hidden(self, record, option, text, basket_indexes):
+        if option == TREE_FILTER_OPTIONS.SAMPLE_NAME:
+            return record.kind == ITEM_KINDS.SAMPLE and text not in record.sample_name
+        elif option == TREE_FILTER_OPTIONS.PROTEIN_NAME:
+            return (
+                record.kind == ITEM_KINDS.SAMPLE
+                and text not in record.protein_acronym
+            )
+        elif option == TREE_FILTER_OPTIONS.BASKET_INDEX:
+            return (
+                record.kind == ITEM_KINDS.BASKET
+                and basket_indexes is not None
+                and record.basket_index not in basket_indexes
+            )
+
+        # Other filters hide only tasks
+        if record.kind != ITEM_KINDS.TASK:
+            return False
+
+        is_dc = record.task_type == "data_collection"
+        if option == TREE_FILTER_OPTIONS.STAR:
+            return not record.starred
+        elif option == TREE_FILTER_OPTIONS.EXECUTED:
+            return is_dc and not record.executed
+        elif option == TREE_FILTER_OPTIONS.NOT_EXECUTED:
+            return is_dc and record.executed
+        elif option == TREE_FILTER_OPTIONS.OSC:
+            return not is_dc or record.helical
+        elif option == TREE_FILTER_OPTIONS.HELICAL:
+            return not is_dc or not record.helical
+        elif option in TASK_TYPE_FILTERS:
+            return record.task_type != TASK_TYPE_FILTERS[option]
+        return False
+
+
+class PathTemplateIndex(object):
+    """
+    Index of path templates used to detect data path collisions.
+    Path templates are grouped by (normalised directory, prefix). Two
+    entries of a group collide if their run numbers are equal, or one of
+    them is -1 (run not assigned yet, matches any run), and their image
+    ranges overlap, as in PathTemplate.__eq__.
+    Update and remove return only the items whose collision state changed,
+    so the cost of an edit depends on the size of its group and not on
+    the length of the queue.
+    """
+
+    def __init__(self):
+        # key: id(item)
+        # value: (group_key, run_number, first_image, last_image, item,
+        #         path_template)
+        self._entries = {}
+        self._groups = {}
+        self._conflicts = set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def path_key(path_template):
+        """
+        Returns (group key, run number, first image, last image) of path
+        template
+        """
+        first_image = path_template.start_num
+        last_image = first_image + max(path_template.num_files, 1) - 1
+        group_key = (
+            os.path.normpath(path_template.directory),
+            path_template.get_prefix(),
+        )
+        return group_key, path_template.run_number, first_image, last_image
+
+    @staticmethod
+    def collide(path_key, other_path_key):
+        """True if the runs of two path keys of a group match and overlap"""
+        run_number, first_image, last_image = path_key[1:4]
+        other_run_number, other_first, other_last = other_path_key[1:4]
+        return (
+            (run_number == other_run_number or -1 in (run_number, other_run_number))
+            and first_image <= other_last
+            and other_first <= last_image
+        )
+
+    def update(self, item, path_template):
+        """
+        Adds, updates or (if path_template is None) removes item.
+        Returns a list of items with changed collision state.
+        """
+        key = id(item)
+        affected = self._discard(key)
+        if path_template is not None:
+            path_key = self.path_key(path_template)
+            self._entries[key] = path_key + (item, path_template)
+            group = self._groups.setdefault(path_key[0], set())
+            group.add(key)
+            affected.update(group)
+        return self._refresh(affected)
+
+    def remove(self, item):
+        """
+        Removes item and all its children.
+        Returns a list of remaining items with changed collision state.
+        """
+        affected = set()
+        stack = [item]
+        while stack:
+            current = stack.pop()
+            affected.update(self._discard(id(current)))
+            for index in range(current.childCount()):
+                stack.append(current.child(index))
+        return self._refresh(affected)
+
+    def clear(self):
+        self._entries.clear()
+        self._groups.clear()
+        self._conflicts.clear()
+
+    def has_conflict(self, item):
+        return id(item) in self._conflicts
+
+    def check(self, path_template):
+        """
+        Returns True if path_template collides with an indexed path
+        template (other than path_template itself). Keys of the candidates
+        are derived again, as path templates may have changed in place
+        """
+        path_key = self.path_key(path_template)
+        for key in self._groups.get(path_key[0], ()):
+            entry = self._entries[key]
+            if entry[5] is path_template:
+                continue
+            other_path_key = self.path_key(entry[5])
+            if other_path_key[0] == path_key[0] and self.collide(
+                path_key, other_path_key
+            ):
+                return True
+        return False
+
+    def refresh(self):
+        """
+        Indexes again path templates changed in place since they were
+        indexed (e.g. run number increased). Only keys are derived, groups
+        are compared for the changed entries only.
+        Returns a list of items with changed collision state.
+        """
+        stale = [
+            entry[4:]
+            for entry in self._entries.values()
+            if self.path_key(entry[5]) != entry[:4]
+        ]
+        changed_items = []
+        for item, path_template in stale:
+            changed_items.extend(self.update(item, path_template))
+            # collision state of the updated item is reset by update
+            changed_items.append(item)
+        return list(OrderedDict((id(item), item) for item in changed_items).values())
+
+    def get_conflicting_items(self):
+        return [self._entries[key][4] for key in self._conflicts]
+
+    def _discard(self, key):
+        """Removes entry and returns keys of its former group"""
+        self._conflicts.discard(key)
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return set()
+        group = self._groups.get(entry[0])
+        group.discard(key)
+        if not group:
+            del self._groups[entry[0]]
+        return set(group)
+
+    def _refresh(self, keys):
+        changed_items = []
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            item = entry[4]
+            conflict = False
+            for other_key in self._groups[entry[0]]:
+                if other_key != key and self.collide(entry, self._entries[other_key]):
+                    conflict = True
+                    break
+            if conflict != (key in self._conflicts):
+                if conflict:
+                    self._conflicts.add(key)
+                else:
+                    self._conflicts.discard(key)
+                changed_items.append(item)
+        return changed_items
@@ -18,6 +18,7 @@
 #  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
 
 from gui.utils import QtImport
+from gui.utils.image_pipeline import ImageTransform, get_image_pipeline
 from gui.utils.widget_utils import DataModelInputBinder
 from gui.widgets.reference_image_widget import ReferenceImageWidget
 from gui.widgets.char_type_widget import CharTypeWidget
@@ -428,6 +429,9 @@ class CharParametersWidget(QtImport.QWidget):
         self.rad_dmg_widget.setEnabled(state)
         self.vertical_dimension_widget.setEnabled(state)
 
+    def set_position_image(self, image):
+        self.position_widget.svideo.setPixmap(QtImport.QPixmap.fromImage(image))
+
     def populate_parameter_widget(self, tree_view_item):
         """
         Descript. :
@@ -456,14 +460,13 @@ class CharParametersWidget(QtImport.QWidget):
             image = self._data_collection.acquisitions[
                 0
             ].acquisition_parameters.centred_position.snapshot_image
-            ration = image.height() / float(image.width())
-            image = image.scaled(
-                400,
-                400 * ration,
-                QtImport.Qt.KeepAspectRatio,
-                QtImport.Qt.SmoothTransformation,
+            get_image_pipeline().process(
+                self.position_widget,
+                image,
+                ImageTransform(width=400),
+                self.set_position_image,
+                cache=True,
             )
-            self.position_widget.svideo.setPixmap(QtImport.QPixmap(image))
 
         self.toggle_permitted_range(self._char_params.use_permitted_rotation)
         self.enable_opt_parameters_widget(self._char_params.determine_rad_params)
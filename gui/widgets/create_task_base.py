@@ -211,10 +211,11 @@ class CreateTaskBase(QtImport.QWidget):
     def path_template_changed(self):
         self._data_path_widget.update_file_name()
         if self._tree_brick is not None:
-            self._tree_brick.dc_tree_widget.check_for_path_collisions()
-            path_conflict = HWR.beamline.queue_model.check_for_path_collisions(
-                self._path_template
+            dc_tree_widget = self._tree_brick.dc_tree_widget
+            dc_tree_widget.check_for_path_collisions(
+                dc_tree_widget.get_selected_items()
             )
+            path_conflict = dc_tree_widget.has_path_collision(self._path_template)
             self._data_path_widget.indicate_path_conflict(path_conflict)
             self._tree_brick.data_path_changed(path_conflict)
             self.pathTempleConflictSignal.emit(path_conflict)
@@ -604,9 +605,14 @@ class CreateTaskBase(QtImport.QWidget):
     def approve_creation(self):
         result = True
 
-        path_conflict = HWR.beamline.queue_model.check_for_path_collisions(
-            self._path_template
-        )
+        if self._tree_brick is not None:
+            path_conflict = self._tree_brick.dc_tree_widget.has_path_collision(
+                self._path_template
+            )
+        else:
+            path_conflict = HWR.beamline.queue_model.check_for_path_collisions(
+                self._path_template
+            )
 
         if path_conflict:
             logging.getLogger("GUI").error(
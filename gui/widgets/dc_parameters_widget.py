@@ -101,9 +101,7 @@ class DCParametersWidget(QtImport.QWidget):
 
         # TODO  get tree view in another way
         dc_tree_widget = self._tree_view_item.listView().parent().parent()
-        dc_tree_widget.check_for_path_collisions()
-        path_template = self._data_collection.acquisitions[0].path_template
-        HWR.beamline.queue_model.check_for_path_collisions(path_template)
+        dc_tree_widget.check_for_path_collisions([self._tree_view_item])
 
     def mad_energy_selected(self, name, energy, state):
         path_template = self._data_collection.acquisitions[0].path_template
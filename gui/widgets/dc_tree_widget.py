@@ -29,9 +29,21 @@ import gevent
 import jsonpickle
 import webbrowser
 from datetime import datetime
-from collections import namedtuple
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
 
 from gui.utils import Colors, Icons, queue_item, QtImport
+from gui.utils.sample_reconciliation import (
+    group_samples_by_basket,
+    index_lims_samples,
+)
+from gui.utils.tree_index import (
+    ModelItemIndex,
+    PathTemplateIndex,
+    TreeFilterIndex,
+    TREE_FILTER_OPTIONS,
+    ITEM_KINDS,
+)
 from gui.widgets.confirm_dialog import ConfirmDialog
 from gui.widgets.plate_navigator_widget import PlateNavigatorWidget
 
@@ -78,6 +90,15 @@ class DataCollectTree(QtImport.QWidget):
         self.user_stopped = False
         self.last_added_item = None
         self.item_copy = None
+        self.model_item_index = ModelItemIndex()
+        self.filter_index = TreeFilterIndex()
+        self.path_index = PathTemplateIndex()
+        self.mounted_sample_item = None
+        self.bulk_update_level = 0
+        self.bulk_task_added = False
+        self.bulk_path_items = OrderedDict()
+        self.filter_option = TREE_FILTER_OPTIONS.NONE
+        self.filter_text = ""
 
         self.selection_changed_cb = None
         self.collect_stop_cb = None
@@ -347,9 +368,10 @@ class DataCollectTree(QtImport.QWidget):
         # elf.show_details([self.item_history_list[row]])
         pass
 
-    def item_click(self):
+    def item_click(self, item=None, column=None):
         """Single item click verifies if there is a path conflict"""
-        self.check_for_path_collisions()
+        if item is not None:
+            self.check_for_path_collisions([item])
         # self.sample_tree_widget_selection()
         self.toggle_collect_button_enabled()
 
@@ -378,6 +400,8 @@ class DataCollectTree(QtImport.QWidget):
         items = self.get_selected_items()
         for item in items:
             item.update_display_name()
+            self.update_filter_record(item)
+            self.update_path_template(item)
 
     def context_collect_item(self):
         """Calls collect_items method"""
@@ -432,6 +456,7 @@ class DataCollectTree(QtImport.QWidget):
             items[0].setFlags(QtImport.Qt.ItemIsSelectable |
                               QtImport.Qt.ItemIsEnabled)
             items[0].get_model().set_name(items[0].text(0))
+            self.update_filter_record(items[0])
 
     def add_star_treewidget_item(self):
         """Add star to the item for further filter"""
@@ -440,6 +465,7 @@ class DataCollectTree(QtImport.QWidget):
             item.set_star(True)
             if item.has_star():
                 item.setIcon(0, self.star_icon)
+            self.update_filter_record(item)
 
     def remove_star_treewidget_item(self):
         """Removes star"""
@@ -451,6 +477,7 @@ class DataCollectTree(QtImport.QWidget):
                     item.set_mounted_style(True)
                 else:
                     item.setIcon(0, QtImport.QIcon())
+            self.update_filter_record(item)
 
     def scroll_to_item(self, item=None):
         if not item:
@@ -621,19 +648,65 @@ class DataCollectTree(QtImport.QWidget):
             self.enable_collect_condition and not self.collecting)
 
     def get_item_by_model(self, parent_node):
-        """Returns tree item by its model
+        """Returns tree item by its model. Every item is created in
+           add_to_view and registered in the model index, so a model
+           without an item (model root) is placed at the top level.
         """
-        it = QtImport.QTreeWidgetItemIterator(self.sample_tree_widget)
-        item = it.value()
-
-        while item:
-            if item.get_model() is parent_node:
-                return item
-
-            it += 1
-            item = it.value()
+        return self.model_item_index.get(parent_node, self.sample_tree_widget)
+
+    def clear_sample_tree(self):
+        """Removes all items from the sample tree and the model index"""
+        self.model_item_index.clear()
+        self.filter_index.clear()
+        self.path_index.clear()
+        self.bulk_path_items.clear()
+        self.mounted_sample_item = None
+        self.sample_tree_widget.clear()
 
-        return self.sample_tree_widget
+    def take_item(self, item):
+        """Removes item (and its children) from the tree and the index"""
+        self.model_item_index.remove(item)
+        self.filter_index.remove(item)
+        if self.mounted_sample_item is item:
+            self.mounted_sample_item = None
+        self.path_conflicts_changed(self.path_index.remove(item))
+        parent = item.parent()
+        if parent:
+            parent.takeChild(parent.indexOfChild(item))
+        else:
+            self.sample_tree_widget.takeTopLevelItem(
+                self.sample_tree_widget.indexOfTopLevelItem(item))
+
+    @contextmanager
+    def bulk_update(self):
+        """Context used when many items are added at once (sample changer,
+           plate or LIMS population). Tree repaint and signals are disabled
+           and per item column resize, collect button update, sample pin
+           icons, path conflict icons, active filter and queue auto save
+           are done once when the outermost context exits.
+        """
+        self.bulk_update_level += 1
+        if self.bulk_update_level == 1:
+            self.bulk_task_added = False
+            self.sample_tree_widget.setUpdatesEnabled(False)
+            self.sample_tree_widget.blockSignals(True)
+        try:
+            yield
+        finally:
+            self.bulk_update_level -= 1
+            if self.bulk_update_level == 0:
+                self.sample_tree_widget.blockSignals(False)
+                self.sample_tree_widget.setUpdatesEnabled(True)
+                self.sample_tree_widget.resizeColumnToContents(0)
+                self.set_sample_pin_icon()
+                path_items = list(self.bulk_path_items.values())
+                self.bulk_path_items.clear()
+                self.update_path_conflict_icons(path_items)
+                if self.filter_option != TREE_FILTER_OPTIONS.NONE:
+                    self.filter_items(self.filter_option, self.filter_text)
+                self.toggle_collect_button_enabled()
+                if self.bulk_task_added and self.samples_initialized:
+                    self.tree_brick.auto_save_queue()
 
     def last_top_level_item(self):
         """Returns the last top level item"""
@@ -664,22 +737,104 @@ class DataCollectTree(QtImport.QWidget):
             view_item.setExpanded(True)
 
         HWR.beamline.queue_model.view_created(view_item, task)
-        # self.sample_tree_widget_selection()
-        self.toggle_collect_button_enabled()
-
+        self.model_item_index.add(task, view_item)
+        self.update_filter_record(view_item)
+        self.update_path_template(view_item)
         self.last_added_item = view_item
 
-        if isinstance(view_item, queue_item.TaskQueueItem) and \
-                self.samples_initialized:
-            self.tree_brick.auto_save_queue()
+        if self.bulk_update_level > 0:
+            # Done once at the end of bulk_update
+            if isinstance(view_item, queue_item.TaskQueueItem):
+                self.bulk_task_added = True
+        else:
+            # self.sample_tree_widget_selection()
+            self.toggle_collect_button_enabled()
+
+            if isinstance(view_item, queue_item.TaskQueueItem) and \
+                    self.samples_initialized:
+                self.tree_brick.auto_save_queue()
 
-        #for col in range(2):
-        self.sample_tree_widget.resizeColumnToContents(0)
+            #for col in range(2):
+            self.sample_tree_widget.resizeColumnToContents(0)
 
         if isinstance(task, queue_model_objects.DataCollection):
             view_item.init_tool_tip()
             view_item.init_processing_info()
 
+    def update_filter_record(self, item):
+        """Updates filter attributes of the item in the filter index"""
+        model = item.get_model()
+        if model is None:
+            return
+
+        if isinstance(item, queue_item.BasketQueueItem):
+            location = getattr(model, "location", None)
+            self.filter_index.update(
+                item,
+                ITEM_KINDS.BASKET,
+                basket_index=location[0] if location else None
+            )
+        elif isinstance(item, queue_item.SampleQueueItem):
+            protein_acronym = ""
+            if getattr(model, "crystals", None):
+                protein_acronym = model.crystals[0].protein_acronym
+            self.filter_index.update(
+                item,
+                ITEM_KINDS.SAMPLE,
+                sample_name=model.get_display_name(),
+                protein_acronym=protein_acronym
+            )
+        elif isinstance(item, queue_item.DataCollectionGroupQueueItem):
+            self.filter_index.update(item, ITEM_KINDS.GROUP)
+        elif isinstance(item, queue_item.DataCollectionQueueItem):
+            self.filter_index.update(
+                item,
+                ITEM_KINDS.TASK,
+                task_type="data_collection",
+                starred=item.has_star(),
+                executed=model.is_executed(),
+                helical=model.is_helical()
+            )
+        else:
+            if isinstance(item, queue_item.CharacterisationQueueItem):
+                task_type = "characterisation"
+            elif isinstance(item, queue_item.EnergyScanQueueItem):
+                task_type = "energy_scan"
+            elif isinstance(item, queue_item.XRFSpectrumQueueItem):
+                task_type = "xrf_spectrum"
+            else:
+                task_type = item.__class__.__name__
+            self.filter_index.update(
+                item,
+                ITEM_KINDS.TASK,
+                task_type=task_type,
+                starred=item.has_star()
+            )
+
+    def filter_items(self, filter_option, text=""):
+        """Hides tree items based on the filter option (TREE_FILTER_OPTIONS).
+           Filter is evaluated on the filter index and only items with
+           changed visibility are updated.
+        """
+        self.filter_option = filter_option
+        self.filter_text = text
+        hidden_keys = self.filter_index.evaluate(filter_option, text)
+        self.sample_tree_widget.setUpdatesEnabled(False)
+        try:
+            self.filter_index.apply(hidden_keys, self.set_item_hidden)
+        finally:
+            self.sample_tree_widget.setUpdatesEnabled(True)
+
+    def clear_filter(self):
+        """Shows all tree items"""
+        self.filter_option = TREE_FILTER_OPTIONS.NONE
+        self.filter_text = ""
+        self.filter_index.apply(set(), self.set_item_hidden)
+
+    def set_item_hidden(self, item, hidden):
+        """Children visibility is handled by the filter index"""
+        item.set_hidden(hidden, recursive=False)
+
     def get_selected_items(self):
         """Return a list with selected items"""
         items = self.sample_tree_widget.selectedItems()
@@ -742,16 +897,20 @@ class DataCollectTree(QtImport.QWidget):
         return False
 
     def get_mounted_sample_item(self):
-        """Returns mounted sample item"""
-        it = QtImport.QTreeWidgetItemIterator(self.sample_tree_widget)
-        item = it.value()
+        """Returns mounted sample item. Last found item is cached and
+           samples are looked up in the model index only if the mounted
+           sample has changed.
+        """
+        item = self.mounted_sample_item
+        if item is not None and item.mounted_style:
+            return item
 
-        while item:
+        self.mounted_sample_item = None
+        for item in self.model_item_index.items():
             if isinstance(item, queue_item.SampleQueueItem):
                 if item.mounted_style:
+                    self.mounted_sample_item = item
                     return item
-            it += 1
-            item = it.value()
 
     def get_checked_samples(self):
         res_list = []
@@ -766,13 +925,13 @@ class DataCollectTree(QtImport.QWidget):
         self.confirm_dialog.set_plate_mode(False)
         self.sample_mount_method = option
         if option == SC_FILTER_OPTIONS.SAMPLE_CHANGER:
-            self.sample_tree_widget.clear()
-            HWR.beamline.queue_model.select_model('ispyb')
-            self.set_sample_pin_icon()
+            with self.bulk_update():
+                self.clear_sample_tree()
+                HWR.beamline.queue_model.select_model('ispyb')
         elif option == SC_FILTER_OPTIONS.PLATE:
-            self.sample_tree_widget.clear()
-            HWR.beamline.queue_model.select_model('plate')
-            self.set_sample_pin_icon()
+            with self.bulk_update():
+                self.clear_sample_tree()
+                HWR.beamline.queue_model.select_model('plate')
         elif option == SC_FILTER_OPTIONS.MOUNTED_SAMPLE:
             loaded_sample_loc = None
 
@@ -804,11 +963,12 @@ class DataCollectTree(QtImport.QWidget):
                 item = it.value()
 
             self.hide_empty_baskets()
+            self.filter_index.invalidate_visibility()
 
         elif option == SC_FILTER_OPTIONS.FREE_PIN:
-            self.sample_tree_widget.clear()
-            HWR.beamline.queue_model.select_model('free-pin')
-            self.set_sample_pin_icon()
+            with self.bulk_update():
+                self.clear_sample_tree()
+                HWR.beamline.queue_model.select_model('free-pin')
         self.sample_tree_widget_selection()
 
     def set_centring_method(self, method_number):
@@ -1030,6 +1190,7 @@ class DataCollectTree(QtImport.QWidget):
                                    status,
                                    item_details,
                                    view_item)
+            self.update_filter_record(view_item)
 
     def add_history_entry(self, sample_name, date, time, entry_type,
                           status, entry_details, view_item=None):
@@ -1171,7 +1332,7 @@ class DataCollectTree(QtImport.QWidget):
                                                      item.get_model())
                     qe = item.get_queue_entry()
                     parent.get_queue_entry().dequeue(qe)
-                    parent.takeChild(parent.indexOfChild(item))
+                    self.take_item(item)
 
                     if not parent.child(0):
                         parent.setOn(False)
@@ -1184,7 +1345,6 @@ class DataCollectTree(QtImport.QWidget):
         if children:
             self.delete_click(selected_items=children)
 
-        self.check_for_path_collisions()
         self.set_first_element()
         self.toggle_collect_button_enabled()
         self.tree_brick.auto_save_queue()
@@ -1280,28 +1440,61 @@ class DataCollectTree(QtImport.QWidget):
     """
 
     def samples_from_lims(self, lims_sample_list):
-        """Sync samples with ispyb"""
-        barcode_samples = {}
-        location_samples = {}
-
+        """Sync samples with ispyb. Returns samples indexed by barcode
+           and by location
+        """
+        sample_list = []
         for lims_sample in lims_sample_list:
             sample = queue_model_objects.Sample()
             sample.init_from_lims_object(lims_sample)
+            sample_list.append(sample)
 
-            if sample.lims_code:
-                barcode_samples[sample.lims_code] = sample
+        return index_lims_samples(sample_list)
 
-            if sample.lims_location:
-                location_samples[sample.lims_location] = sample
+    def has_tasks(self):
+        """Returns True if a task was added to a sample of the tree"""
+        for item in self.model_item_index.items():
+            if isinstance(item, queue_item.TaskQueueItem):
+                return True
+        return False
 
-        return (barcode_samples, location_samples)
+    def update_samples_from_lims(self, lims_sample_list):
+        """Updates LIMS information of the samples in the tree in place.
+           Returns False if a sample is not in the tree or its barcode
+           or location changed, then the tree has to be repopulated.
+        """
+        sample_items = {}
+        for item in self.model_item_index.items():
+            if isinstance(item, queue_item.SampleQueueItem):
+                sample_items.setdefault(item.get_model().lims_id, []).append(item)
+
+        updates = []
+        for lims_sample in lims_sample_list:
+            sample = queue_model_objects.Sample()
+            sample.init_from_lims_object(lims_sample)
+            items = sample_items.get(sample.lims_id)
+            if not items:
+                return False
+            for item in items:
+                model = item.get_model()
+                if (model.lims_code != sample.lims_code
+                        or model.lims_location != sample.lims_location):
+                    return False
+                updates.append((item, lims_sample))
+
+        for item, lims_sample in updates:
+            item.get_model().init_from_lims_object(lims_sample)
+            item.update_display_name()
+            self.update_filter_record(item)
+        return True
 
     def enqueue_samples(self, sample_list):
         """Adds items to the queue"""
-        for sample in sample_list:
-            HWR.beamline.queue_model.add_child(HWR.beamline.queue_model.
-                                             get_model_root(), sample)
-            self.add_to_queue([sample], self.sample_tree_widget, False)
+        with self.bulk_update():
+            for sample in sample_list:
+                HWR.beamline.queue_model.add_child(HWR.beamline.queue_model.
+                                                 get_model_root(), sample)
+                self.add_to_queue([sample], self.sample_tree_widget, False)
 
     def populate_free_pin(self, sample=None):
         """Populates manualy mounted sample"""
@@ -1325,18 +1518,20 @@ class DataCollectTree(QtImport.QWidget):
 
         HWR.beamline.queue_manager.clear()
         HWR.beamline.queue_model.clear_model(mode_str)
-        self.sample_tree_widget.clear()
+        self.clear_sample_tree()
         HWR.beamline.queue_model.select_model(mode_str)
 
-        for basket_index, basket in enumerate(basket_list):
-            HWR.beamline.queue_model.add_child(HWR.beamline.queue_model.get_model_root(), basket)
-            basket.set_enabled(False)
-            for sample in sample_list:
-                if sample.location[0] == basket_index + 1:
+        basket_samples = group_samples_by_basket(sample_list)
+
+        # Sample pin icons are updated when bulk_update exits
+        with self.bulk_update():
+            for basket_index, basket in enumerate(basket_list):
+                HWR.beamline.queue_model.add_child(HWR.beamline.queue_model.get_model_root(), basket)
+                basket.set_enabled(False)
+                for sample in basket_samples.get(basket_index + 1, ()):
                     basket.add_sample(sample)
                     HWR.beamline.queue_model.add_child(basket, sample)
                     sample.set_enabled(False)
-        self.set_sample_pin_icon()
 
     def set_sample_pin_icon(self):
         """Updates sample icon"""
@@ -1347,6 +1542,7 @@ class DataCollectTree(QtImport.QWidget):
             if self.is_mounted_sample_item(item):
                 item.setSelected(True)
                 item.set_mounted_style(True)
+                self.mounted_sample_item = item
                 # self.sample_tree_widget.scrollTo(self.sample_tree_widget.\
                 #     indexFromItem(item))
             elif isinstance(item, queue_item.SampleQueueItem):
@@ -1359,6 +1555,7 @@ class DataCollectTree(QtImport.QWidget):
                     if not self.is_mounted_sample_item(item):
                         item.setIcon(0, self.ispyb_icon)
                     item.setText(0, item.get_model().get_display_name())
+                    self.update_filter_record(item)
             elif isinstance(item, queue_item.BasketQueueItem):
                 # pass
                 item.setText(0, item.get_model().get_display_name())
@@ -1391,33 +1588,62 @@ class DataCollectTree(QtImport.QWidget):
             it += 1
             item = it.value()
 
-    def check_for_path_collisions(self):
-        """Checks for path conflicts"""
-        conflict = False
-        it = QtImport.QTreeWidgetItemIterator(self.sample_tree_widget)
-        item = it.value()
+    def check_for_path_collisions(self, items=None):
+        """Checks for path conflicts. Path templates of the given items
+           are updated in the path index and only items with a changed
+           conflict state are redrawn. Without items the whole tree is
+           reindexed (used before the queue is executed). Path templates
+           changed in place are indexed again.
+           Returns True if a checked item has a path conflict.
+        """
+        if items is None:
+            items = self.model_item_index.items()
+        self.update_path_conflict_icons(self.path_index.refresh())
+        for item in items:
+            self.update_path_template(item)
 
-        while item:
+        for item in self.path_index.get_conflicting_items():
             if item.checkState(0) == QtImport.Qt.Checked:
-                pt = item.get_model().get_path_template()
+                return True
+        return False
 
-                if pt:
-                    path_conflict = HWR.beamline.queue_model.\
-                        check_for_path_collisions(pt)
+    def has_path_collision(self, path_template):
+        """Returns True if path_template collides with a task of the queue.
+           Uses the path index instead of scanning the queue model.
+        """
+        self.update_path_conflict_icons(self.path_index.refresh())
+        return self.path_index.check(path_template)
 
-                    if path_conflict:
-                        conflict = True
-                        item.setIcon(0, self.caution_icon)
-                    else:
-                        if item.has_star():
-                            item.setIcon(0, self.star_icon)
-                        else:
-                            item.setIcon(0, QtImport.QIcon())
+    def update_path_template(self, item):
+        """Updates path template of the item in the path index"""
+        model = item.get_model()
+        if model is None:
+            return
 
-            it += 1
-            item = it.value()
+        path_template = model.get_path_template()
+        changed_items = self.path_index.update(item, path_template)
+        if path_template is not None:
+            changed_items.append(item)
+        self.path_conflicts_changed(changed_items)
+
+    def path_conflicts_changed(self, items):
+        """Redraws conflict icons of items, once at the end of bulk_update"""
+        if self.bulk_update_level > 0:
+            for item in items:
+                self.bulk_path_items[id(item)] = item
+        else:
+            self.update_path_conflict_icons(items)
 
-        return conflict
+    def update_path_conflict_icons(self, items):
+        """Marks checked items with a path conflict by caution icon"""
+        for item in items:
+            if item.checkState(0) == QtImport.Qt.Checked:
+                if self.path_index.has_conflict(item):
+                    item.setIcon(0, self.caution_icon)
+                elif item.has_star():
+                    item.setIcon(0, self.star_icon)
+                else:
+                    item.setIcon(0, QtImport.QIcon())
 
     def select_last_added_item(self):
         """Selects last added item"""
@@ -1610,7 +1836,7 @@ class DataCollectTree(QtImport.QWidget):
                                                             "Open file", os.environ["HOME"],
                                                             "Item file (*.dat)", "Choose queue file to open"))
         if len(filename) > 0:
-            self.sample_tree_widget.clear()
+            self.clear_sample_tree()
             loaded_model = HWR.beamline.queue_model.load_queue(filename,
                                                              HWR.beamline.sample_view.get_scene_snapshot())
             return loaded_model
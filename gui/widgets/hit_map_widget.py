@@ -18,9 +18,9 @@
 #  along with MXCuBE. If not, see <http://www.gnu.org/licenses/>.
 
 import numpy as np
-from copy import deepcopy
 
 from gui.utils import QtImport
+from gui.utils.score_threshold import ScoreThresholdFilter
 try:
    from widgets.pyqtgraph_widget import PlotWidget
 except:
@@ -33,6 +33,10 @@ __credits__ = ["MXCuBE collaboration"]
 __license__ = "LGPLv3+"
 
 
+# Delay (ms) after the last threshold slider move before the map is filtered
+FILTER_DELAY = 50
+
+
 class HitMapWidget(QtImport.QWidget):
 
     def __init__(self, parent=None, show_aligned_results=False):
@@ -58,6 +62,7 @@ class HitMapWidget(QtImport.QWidget):
         self.__selected_col = 0
         self.__selected_row = 0
         self.__score_key = None
+        self.__score_filter = ScoreThresholdFilter()
         self.__max_value = 0
         self.__filter_min_value = 0
         self.__best_pos_list = None
@@ -207,7 +212,11 @@ class HitMapWidget(QtImport.QWidget):
         self._threshold_slider.setRange(0, 100)
         self._threshold_slider.setTickInterval(5)
         self._threshold_slider.setFixedWidth(200)
-        self._threshold_slider.setTracking(False)
+        self._threshold_slider.setTracking(True)
+        self.__filter_timer = QtImport.QTimer(self)
+        self.__filter_timer.setSingleShot(True)
+        self.__filter_timer.setInterval(FILTER_DELAY)
+        self.__filter_timer.timeout.connect(self.apply_score_filter)
 
         #font = self._best_pos_table.font()
         #font.setPointSize(8)
@@ -316,7 +325,8 @@ class HitMapWidget(QtImport.QWidget):
             self._hit_map_plot.show_curve(self.__score_key)
             self.refresh()
         elif self.__associated_grid:
-            self._hit_map_plot.update_plot(self.__results_aligned[self.__score_key])
+            # threshold of the previous score does not apply to the new one
+            self.apply_score_filter(keep_levels=False)
             self.__associated_grid.set_score(self.__results_raw[self.__score_key])
 
         self._hit_map_plot.autoscale_axes()
@@ -352,16 +362,30 @@ class HitMapWidget(QtImport.QWidget):
             #    )
 
     def filter_min_slider_changed(self, value):
+        # slider moves are merged, map is filtered when the slider stops
+        self.__filter_timer.start()
+
+    def apply_score_filter(self, keep_levels=True):
+        """Plots the current score filtered by the threshold slider"""
         # self.__associated_grid.set_min_score(self._threshold_slider.value() / 100.0)
-        filter_min_value = self.__results_raw[self.__score_key].max() * value / 100.0
-        self.__results_aligned[self.__score_key] = deepcopy(
-            self.__results_raw[self.__score_key]
-        )
-        self.__results_aligned[self.__score_key][
-            self.__results_raw[self.__score_key] < filter_min_value
-        ] = 0
+        if self.__results_aligned is None or self.__associated_grid is None:
+            return
         self._hit_map_plot.update_plot(
-            self.__results_aligned[self.__score_key]
+            self.get_filtered_result(), keep_levels=keep_levels
+        )
+
+    def get_filtered_result(self):
+        """
+        Returns aligned results of the current score, with values lower than
+        slider percent of the maximum set to 0. Threshold is derived from
+        the current values, so it follows score type changes and new data.
+        Returned array is reused by the next call
+        """
+        result = self.__results_aligned[self.__score_key]
+        if self.__score_filter.values is not result:
+            self.__score_filter.set_values(result)
+        return self.__score_filter.set_relative_threshold(
+            self._threshold_slider.value()
         )
 
     def mouse_moved(self, pos_x, pos_y):
@@ -439,7 +463,9 @@ class HitMapWidget(QtImport.QWidget):
         if self.__plot_type == "1D":
             self._hit_map_plot.update_curves(self.__results_raw)
         elif self.__associated_grid:
-            self._hit_map_plot.update_plot(self.__results_aligned[self.__score_key])
+            # results are updated in place, threshold follows the maximum
+            self.__score_filter.update()
+            self.apply_score_filter(keep_levels=False)
         self._hit_map_plot.autoscale_axes()
 
     def clean_result(self):
@@ -451,7 +477,11 @@ class HitMapWidget(QtImport.QWidget):
         self.__associated_grid = None
         self.__associated_data_collection = None
         self._hit_map_plot.clear()
+        self.__filter_timer.stop()
+        self.__score_filter.clear()
+        self._threshold_slider.blockSignals(True)
         self._threshold_slider.setValue(0)
+        self._threshold_slider.blockSignals(False)
         self._summary_textbrowser.clear()
         self._best_pos_table.setRowCount(0)
         self._best_pos_table.setSortingEnabled(False)
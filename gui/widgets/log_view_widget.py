@@ -0,0 +1,255 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Model/view classes used by LogViewBrick"""
+
+from gui.utils import QtImport
+
+
+__credits__ = ["MXCuBE collaboration"]
+__license__ = "LGPLv3+"
+
+
+# Number of log lines kept if maxLogLines property is not positive
+DEFAULT_MAX_LOG_LINES = 100000
+
+LOG_COLUMNS = ("Level", "Date", "Time", "Message")
+
+
+class LogRecordBuffer(object):
+    """
+    Fixed size ring buffer of log lines. Line is a tuple
+    (level number, level name, date, time, message).
+    """
+
+    def __init__(self, capacity=DEFAULT_MAX_LOG_LINES):
+        self._capacity = capacity
+        self._lines = [None] * capacity
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        if index < 0 or index >= self._size:
+            raise IndexError("log line index out of range")
+        return self._lines[(self._start + index) % self._capacity]
+
+    def __iter__(self):
+        for index in range(self._size):
+            yield self._lines[(self._start + index) % self._capacity]
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def extend(self, lines):
+        """Appends lines, oldest lines are overwritten if buffer is full"""
+        for line in lines:
+            self._lines[(self._start + self._size) % self._capacity] = line
+            if self._size < self._capacity:
+                self._size += 1
+            else:
+                self._start = (self._start + 1) % self._capacity
+
+    def drop_oldest(self, count):
+        """Removes count oldest lines"""
+        count = min(count, self._size)
+        for index in range(count):
+            self._lines[(self._start + index) % self._capacity] = None
+        self._start = (self._start + count) % self._capacity
+        self._size -= count
+
+    def clear(self):
+        self._lines = [None] * self._capacity
+        self._start = 0
+        self._size = 0
+
+    def resize(self, capacity):
+        """Changes capacity, most recent lines are kept"""
+        lines = list(self)[-capacity:]
+        self._capacity = capacity
+        self.clear()
+        self.extend(lines)
+
+
+class LogTableModel(QtImport.QAbstractTableModel):
+    """
+    Table model of log records. Records are stored as plain tuples in a
+    ring buffer, so memory use is bounded by max_log_lines.
+    """
+
+    def __init__(self, parent=None, max_log_lines=None, highlight_color=None):
+        QtImport.QAbstractTableModel.__init__(self, parent)
+        self._lines = LogRecordBuffer(self._get_capacity(max_log_lines))
+        self.highlight_brush = None
+        if highlight_color is not None:
+            self.highlight_brush = QtImport.QBrush(highlight_color)
+
+    @staticmethod
+    def _get_capacity(max_log_lines):
+        if max_log_lines and max_log_lines > 0:
+            return max_log_lines
+        return DEFAULT_MAX_LOG_LINES
+
+    def rowCount(self, parent=QtImport.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._lines)
+
+    def columnCount(self, parent=QtImport.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(LOG_COLUMNS)
+
+    def data(self, index, role=QtImport.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == QtImport.Qt.DisplayRole:
+            return self._lines[index.row()][index.column() + 1]
+        # Every 10th line is highlighted
+        if role == QtImport.Qt.BackgroundRole:
+            if self.highlight_brush is not None and (index.row() + 1) % 10 == 0:
+                return self.highlight_brush
+        return None
+
+    def headerData(self, section, orientation, role=QtImport.Qt.DisplayRole):
+        if orientation == QtImport.Qt.Horizontal and role == QtImport.Qt.DisplayRole:
+            return LOG_COLUMNS[section]
+
+    def get_level(self, row):
+        return self._lines[row][0]
+
+    def get_line(self, row):
+        return self._lines[row][1:]
+
+    def append_records(self, records):
+        """
+        Appends a batch of log records. Lines above max_log_lines are
+        removed from the top, then the batch is inserted as one block.
+        """
+        lines = [
+            (
+                record.getLevel(),
+                record.getLevelName(),
+                record.getDate(),
+                record.getTime(),
+                record.getMessage().replace("\n", " ").strip(),
+            )
+            for record in records
+        ]
+        capacity = self._lines.capacity
+        lines = lines[-capacity:]
+        if not lines:
+            return
+
+        overflow = len(self._lines) + len(lines) - capacity
+        if overflow > 0:
+            self.beginRemoveRows(QtImport.QModelIndex(), 0, overflow - 1)
+            self._lines.drop_oldest(overflow)
+            self.endRemoveRows()
+
+        first_row = len(self._lines)
+        self.beginInsertRows(
+            QtImport.QModelIndex(), first_row, first_row + len(lines) - 1
+        )
+        self._lines.extend(lines)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._lines.clear()
+        self.endResetModel()
+
+    def set_max_log_lines(self, max_log_lines):
+        self.beginResetModel()
+        self._lines.resize(self._get_capacity(max_log_lines))
+        self.endResetModel()
+
+
+class LogTableView(QtImport.QTableView):
+    """
+    Displays the log lines of one tab. Every view has its own model, so
+    lines of a tab are not pushed out by records of other tabs.
+    """
+
+    def __init__(self, parent, tab_label, max_log_lines=None, highlight_color=None):
+        QtImport.QTableView.__init__(self, parent)
+
+        self.setSizePolicy(QtImport.QSizePolicy.Minimum, QtImport.QSizePolicy.Expanding)
+        self.tab_label = tab_label
+        self.unread_messages = 0
+
+        self.log_model = LogTableModel(self, max_log_lines, highlight_color)
+        self.setModel(self.log_model)
+
+        # Rows are not resized to contents, so appending lines does not
+        # trigger layout of the whole table
+        self.verticalHeader().hide()
+        self.verticalHeader().setDefaultSectionSize(
+            self.fontMetrics().height() + 4
+        )
+        self.horizontalHeader().setStretchLastSection(True)
+        self.setShowGrid(False)
+        self.setWordWrap(False)
+        self.setSelectionBehavior(QtImport.QAbstractItemView.SelectRows)
+
+        self.contextMenuEvent = self.show_context_menu
+        self.clipboard = QtImport.QApplication.clipboard()
+
+    def append_records(self, records):
+        self.log_model.append_records(records)
+
+    def set_max_log_lines(self, max_log_lines):
+        self.log_model.set_max_log_lines(max_log_lines)
+
+    def clear(self):
+        """Removes log lines displayed in this view"""
+        self.log_model.clear()
+
+    def show_context_menu(self, context_menu_event):
+        menu = QtImport.QMenu(self)
+        menu.addAction("Clear", self.clear)
+        menu.addAction("Copy", self.copy_log)
+        menu.addAction("Save log", self.save_log)
+        menu.popup(QtImport.QCursor.pos())
+
+    def get_log_text(self):
+        text_list = []
+        for row in range(self.log_model.rowCount()):
+            text_list.append(chr(9).join(self.log_model.get_line(row)) + chr(9))
+        return "".join(text + "\n" for text in text_list)
+
+    def copy_log(self):
+        self.clipboard.clear(mode=self.clipboard.Clipboard)
+        self.clipboard.setText(self.get_log_text(), mode=self.clipboard.Clipboard)
+
+    def save_log(self):
+        self.copy_log()
+        filename = QtImport.QFileDialog.getSaveFileName(
+            self, "Choose a filename to save under", "/tmp"
+        )
+        if isinstance(filename, tuple):
+            filename = filename[0]
+        filename = str(filename)
+        if len(filename) > 0:
+            log_file = open(filename, "w")
+            log_file.write(self.clipboard.text())
+            log_file.close()
@@ -21,8 +21,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.figure import Figure
+from matplotlib.patches import Polygon
 from mpl_toolkits.axes_grid1 import make_axes_locatable
-from gui.utils import QtImport
+from gui.utils import QtImport, redraw_scheduler
+from gui.utils.curve_buffer import CurveBuffer
+from gui.utils.decimation import DecimationPyramid
 
 if QtImport.qt_variant == "PyQt5":
     from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
@@ -34,6 +37,70 @@ __credits__ = ["MXCuBE collaboration"]
 __license__ = "LGPLv3+"
 
 
+# Capacity of the real time plot if max plot points are not defined
+DEFAULT_MAX_PLOT_POINTS = 1000
+
+
+class PlotRingBuffer(object):
+    """
+    Fixed capacity buffer of x, y plot points.
+    Each point is written twice (at index and index + capacity), so the
+    last points are always available as a contiguous view without copying.
+    """
+
+    def __init__(self, capacity):
+        self._capacity = max(1, int(capacity))
+        self._x_array = np.zeros(2 * self._capacity)
+        self._y_array = np.zeros(2 * self._capacity)
+        self._next_index = 0
+        self._size = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._size
+
+    def capacity(self):
+        return self._capacity
+
+    def count(self):
+        """Returns number of points appended since the last clear"""
+        return self._count
+
+    def append(self, y, x=None):
+        if x is None:
+            x = self._count
+        index = self._next_index
+        self._x_array[index] = self._x_array[index + self._capacity] = x
+        self._y_array[index] = self._y_array[index + self._capacity] = y
+        self._next_index = (index + 1) % self._capacity
+        self._size = min(self._size + 1, self._capacity)
+        self._count += 1
+
+    def get_data(self):
+        """Returns views of x and y arrays ordered from the oldest point"""
+        start = (self._next_index - self._size) % self._capacity
+        return (
+            self._x_array[start : start + self._size],
+            self._y_array[start : start + self._size],
+        )
+
+    def clear(self):
+        self._next_index = 0
+        self._size = 0
+        self._count = 0
+
+    def resize(self, capacity):
+        """Changes capacity and keeps the last points"""
+        x_array, y_array = self.get_data()
+        x_array = x_array[-capacity:].copy()
+        y_array = y_array[-capacity:].copy()
+        count = self._count
+        self.__init__(capacity)
+        for x, y in zip(x_array, y_array):
+            self.append(y, x)
+        self._count = count
+
+
 class TwoAxisPlotWidget(QtImport.QWidget):
     def __init__(self, parent, realtime_plot=False):
 
@@ -120,6 +187,12 @@ class TwoAxisPlotWidget(QtImport.QWidget):
         if self._realtime_plot:
             self._two_axis_figure_canvas.append_new_point(y, x)
 
+    def add_streaming_curve(self, name, label=None, color=None):
+        self._two_axis_figure_canvas.add_streaming_curve(name, label, color)
+
+    def append_curve_point(self, name, x, y):
+        self._two_axis_figure_canvas.append_curve_point(name, x, y)
+
     def set_tight_layout(self):
         self._two_axis_figure_canvas.axes.xaxis.set_visible(False)
         # self._two_axis_figure_canvas.fig.tight_layout()
@@ -131,7 +204,9 @@ class TwoAxisPlotWidget(QtImport.QWidget):
         pass
 
     def newcurve(self, label, x_array, y_array):
-        self._two_axis_figure_canvas.plot_curve(y_array, x_array, label=label)
+        self._two_axis_figure_canvas.plot_curve(
+            label, np.asarray(y_array), np.asarray(x_array), label=label
+        )
 
     def setx1axislimits(self, x_min, x_max):
         self._two_axis_figure_canvas.axes.set_xlim((x_min, x_max))
@@ -148,8 +223,7 @@ class TwoAxisPlotWidget(QtImport.QWidget):
     def replot(self):
         self._two_axis_figure_canvas.axes.relim()
         self._two_axis_figure_canvas.axes.autoscale_view()
-        self._two_axis_figure_canvas.fig.canvas.draw()
-        self._two_axis_figure_canvas.fig.canvas.flush_events()
+        self._two_axis_figure_canvas.schedule_redraw()
 
     def setdata(self, x, y):
         self.newcurve("XRF spectrum", x, y)
@@ -178,35 +252,74 @@ class MplCanvas(FigureCanvas):
         FigureCanvas.updateGeometry(self)
 
         self.single_curve = None
+        self.single_curve_fill = None
         self.real_time = None
-        self._axis_x_array = np.empty(0)
-        self._axis_y_array = np.empty(0)
-        self._axis_x_limits = [None, None]
-        self._axis_y_limits = [None, None]
+        self._implicit_x_axis = True
+        self._plot_buffer = PlotRingBuffer(DEFAULT_MAX_PLOT_POINTS)
+        self._blit_background = None
+        self._full_redraw_needed = True
 
         self._curves_dict = {}
+        self._curve_buffers = {}
+        self._streaming_x_limits = None
+        self._streaming_y_limits = None
+        # full data and decimation pyramids of curves set by update_curves
+        self._curve_data = {}
+        self._curve_pyramids = {}
         self.setMaximumSize(2000, 2000)
 
+        self.mpl_connect("draw_event", self.on_draw)
+        self.mpl_connect("resize_event", self.canvas_resized)
+        self.connect_axes_callbacks()
+
     def refresh(self):
         self.axes.relim()
         self.axes.autoscale_view()
-        self.fig.canvas.draw()
-        self.fig.canvas.flush_events()
+        self.schedule_redraw()
+
+    def schedule_redraw(self):
+        """Whole canvas is redrawn by the redraw scheduler"""
+        self._full_redraw_needed = True
+        redraw_scheduler.request_redraw(self, self.redraw_canvas)
+
+    def redraw_canvas(self):
+        if self._curve_data:
+            self.update_decimated_curves()
+        if self.single_curve is None:
+            self._full_redraw_needed = False
+            self.draw()
+        else:
+            self.redraw_real_time_plot()
 
     def set_real_time(self, real_time):
         self.real_time = real_time
         # clear all axes after plot is called
         # self.axes.hold(not real_time)
         self.axes.clear()
+        self.connect_axes_callbacks()
 
     def set_max_plot_points(self, max_points):
         self.max_plot_points = max_points
+        self._plot_buffer.resize(max_points or DEFAULT_MAX_PLOT_POINTS)
+        self._full_redraw_needed = True
 
     def clear(self):
         self._curves_dict = {}
+        self._curve_buffers = {}
+        self._streaming_x_limits = None
+        self._streaming_y_limits = None
+        self._curve_data = {}
+        self._curve_pyramids = {}
         self.single_curve = None
+        self.single_curve_fill = None
+        self._plot_buffer.clear()
+        redraw_scheduler.cancel_redraw(self)
+        self._implicit_x_axis = True
+        self._blit_background = None
+        self._full_redraw_needed = True
         self.axes.cla()
         self.axes.grid(True)
+        self.connect_axes_callbacks()
 
     def hide_curves(self):
         for curve in self._curves_dict.values():
@@ -266,60 +379,210 @@ class MplCanvas(FigureCanvas):
 
         return line
 
+    def add_streaming_curve(self, name, label=None, color=None):
+        """
+        Adds empty curve. Points are added with append_curve_point
+        """
+        line, = self.axes.plot([], [], label=label, linewidth=2, color=color)
+        self._curves_dict[name] = line
+        self._curve_buffers[name] = CurveBuffer()
+        return line
+
+    def append_curve_point(self, name, x, y):
+        """
+        Appends point to the streaming curve (created if it does not
+        exist). Axes limits are changed only if the point is out of them
+        """
+        if name not in self._curve_buffers:
+            self.add_streaming_curve(name, label=name)
+        curve_buffer = self._curve_buffers[name]
+        curve_buffer.append(x, y)
+        self._curves_dict[name].set_data(*curve_buffer.get_data())
+
+        x_limits = self._expand_axis_limits(
+            self._streaming_x_limits, curve_buffer.x_limits, 0.1
+        )
+        if x_limits:
+            self._streaming_x_limits = x_limits
+            self.axes.set_xlim(x_limits)
+        y_limits = self._expand_axis_limits(
+            self._streaming_y_limits, curve_buffer.y_limits, 0.05
+        )
+        if y_limits:
+            self._streaming_y_limits = y_limits
+            self.axes.set_ylim(y_limits)
+        self.schedule_redraw()
+
+    def _expand_axis_limits(self, axis_limits, data_limits, margin):
+        """Returns limits containing data limits (with margin) or None"""
+        data_min, data_max = data_limits
+        span = (data_max - data_min) or 1
+        if axis_limits is None:
+            return (data_min - span * margin, data_max + span * margin)
+        if axis_limits[0] <= data_min and data_max <= axis_limits[1]:
+            return None
+        # Only the exceeded side is moved
+        axis_min, axis_max = axis_limits
+        if data_min < axis_min:
+            axis_min = data_min - span * margin
+        if data_max > axis_max:
+            axis_max = data_max + span * margin
+        return (axis_min, axis_max)
+
     def update_curves(self, data_dict):
-        for data_key in data_dict:
-            for curve_key in self._curves_dict.keys():
-                if data_key == curve_key:
-                    if data_dict[data_key].size > 200:
-                        num_points = data_dict[data_key].size / 200
-                        self._curves_dict[curve_key].set_ydata(
-                            data_dict[data_key][::num_points]
-                        )
-                        self._curves_dict[curve_key].set_xdata(
-                            data_dict["x_array"][::num_points]
-                        )
-                    else:
-                        self._curves_dict[curve_key].set_ydata(data_dict[data_key])
-                        self._curves_dict[curve_key].set_xdata(data_dict["x_array"])
-        self.fig.canvas.draw()
+        """
+        Sets data of curves (dict curve name: y array, optional x_array).
+        Curves are decimated by the redraw scheduler according to the
+        displayed x range, see update_decimated_curves
+        """
+        x_array = data_dict.get("x_array")
+        for curve_key in self._curves_dict:
+            if curve_key in data_dict:
+                self._curve_data[curve_key] = (data_dict[curve_key], x_array)
+                self._curve_pyramids.pop(curve_key, None)
+        self.schedule_redraw()
+
+    def update_decimated_curves(self):
+        """
+        Sets min/max decimated data of the visible x range to the curves.
+        Decimation pyramids are built after a data update
+        """
+        for name, (y_array, x_array) in self._curve_data.items():
+            if name not in self._curve_pyramids:
+                self._curve_pyramids[name] = DecimationPyramid(y_array, x_array)
+
+        x_min, x_max = self.axes.get_xlim()
+        # two points (min, max) per pixel
+        max_points = 2 * max(self.width(), 1)
+        for name, pyramid in self._curve_pyramids.items():
+            self._curves_dict[name].set_data(
+                *pyramid.get_data(x_min, x_max, max_points)
+            )
 
-    def append_new_point(self, y, x=None):
-        self._axis_y_array = np.append(self._axis_y_array, y)
-        if x:
-            self._axis_x_array = np.append(self._axis_x_array, x)
-        else:
-            self._axis_x_array = np.arange(len(self._axis_y_array))
+    def connect_axes_callbacks(self):
+        # Has to be called after axes.cla(), it resets the callbacks
+        self.axes.callbacks.connect("xlim_changed", self.x_limits_changed)
+
+    def x_limits_changed(self, axes):
+        if self._curve_data:
+            self.schedule_redraw()
+
+    def canvas_resized(self, event):
+        if self._curve_data:
+            self.schedule_redraw()
 
-        if self.max_plot_points:
-            if self._axis_y_array.size > self.max_plot_points:
-                self._axis_y_array = np.delete(self._axis_y_array, 0)
-                self._axis_x_array = np.delete(self._axis_x_array, 0)
+    def append_new_point(self, y, x=None):
+        """
+        Appends point to the real time plot. Plot is redrawn by the
+        redraw scheduler
+        """
+        if x is None:
+            if not self._implicit_x_axis:
+                x = self._plot_buffer.count()
+        elif self._implicit_x_axis:
+            self._implicit_x_axis = False
+            self._full_redraw_needed = True
+        self._plot_buffer.append(y, x)
 
         if self.single_curve is None:
             self.single_curve, = self.axes.plot(
-                self._axis_y_array, linewidth=2, marker="s"
+                [], [], linewidth=2, marker="s", animated=True
             )
-        else:
-            self.axes.fill(self._axis_y_array, "r", linewidth=2)
+            self.single_curve_fill = Polygon(
+                np.zeros((0, 2)), closed=True, facecolor="r", animated=True
+            )
+            self.axes.add_patch(self.single_curve_fill)
+            self.axes.grid(True)
+            self._full_redraw_needed = True
 
-        self._axis_y_limits[1] = (
-            self._axis_y_array.max() + self._axis_y_array.max() * 0.05
-        )
-        self.axes.set_ylim(self._axis_y_limits)
-        self.single_curve.set_xdata(self._axis_x_array)
-        self.single_curve.set_ydata(self._axis_y_array)
-        self.axes.relim()
-        self.axes.autoscale_view()
-        self.fig.canvas.draw()
-        self.fig.canvas.flush_events()
-        self.axes.grid(True)
+        redraw_scheduler.request_redraw(self, self.redraw_canvas)
 
-        # TODO move y lims as propery
-        self.axes.set_ylim(
-            (0, self._axis_y_array.max() + self._axis_y_array.max() * 0.05)
+    def redraw_real_time_plot(self):
+        """
+        Updates the curve and its filled area. Only the two artists are
+        blitted over the cached background, unless axes limits have to
+        change (or there is no background yet), then the whole figure
+        is redrawn.
+        """
+        if self.single_curve is None:
+            return
+
+        x_array, y_array = self._plot_buffer.get_data()
+        if self._implicit_x_axis:
+            x_array = np.arange(y_array.size)
+        self.single_curve.set_data(x_array, y_array)
+        self.single_curve_fill.set_xy(
+            np.column_stack(
+                (
+                    np.concatenate((x_array[:1], x_array, x_array[-1:])),
+                    np.concatenate(([0], y_array, [0])),
+                )
+            )
         )
-        # self.draw()
-        # self.set_title("Scan in progress. Please wait...")
+
+        if self._update_real_time_limits(x_array, y_array):
+            self._full_redraw_needed = True
+
+        if self._full_redraw_needed or self._blit_background is None:
+            self._full_redraw_needed = False
+            # on_draw stores the background and blits the animated artists
+            self.draw()
+        else:
+            self.restore_region(self._blit_background)
+            self._draw_real_time_artists()
+            self.blit(self.axes.bbox)
+
+    def _update_real_time_limits(self, x_array, y_array):
+        """Returns True if the axes limits have been changed"""
+        changed = False
+
+        if self._implicit_x_axis:
+            x_limits = (0, max(self._plot_buffer.capacity() - 1, 1))
+        else:
+            x_min, x_max = x_array[0], x_array[-1]
+            cur_x_min, cur_x_max = self.axes.get_xlim()
+            if cur_x_min <= x_min and x_max <= cur_x_max:
+                x_limits = (cur_x_min, cur_x_max)
+            else:
+                # Leave some space for the following points
+                x_limits = (x_min, x_max + max((x_max - x_min) * 0.25, 1))
+        if tuple(self.axes.get_xlim()) != tuple(x_limits):
+            self.axes.set_xlim(x_limits)
+            changed = True
+
+        y_min = min(0, y_array.min() * 1.05)
+        y_max = y_array.max() * 1.05
+        if y_max <= y_min:
+            y_max = y_min + 1
+        cur_y_min, cur_y_max = self.axes.get_ylim()
+        # Limits are changed if the points do not fit in or if they use
+        # less than a half of the axis
+        if (
+            y_min < cur_y_min
+            or y_max > cur_y_max
+            or (y_max - y_min) < (cur_y_max - cur_y_min) / 2
+        ):
+            self.axes.set_ylim((y_min, y_max))
+            changed = True
+
+        return changed
+
+    def _draw_real_time_artists(self):
+        self.axes.draw_artist(self.single_curve_fill)
+        self.axes.draw_artist(self.single_curve)
+
+    def on_draw(self, event):
+        """Stores background without real time artists after a full draw"""
+        if self.single_curve is None:
+            self._blit_background = None
+            return
+        self._blit_background = self.copy_from_bbox(self.axes.bbox)
+        self._draw_real_time_artists()
+
+    def showEvent(self, event):
+        FigureCanvas.showEvent(self, event)
+        # Canvas could have been resized while hidden
+        self._full_redraw_needed = True
 
     def set_axes_labels(self, x_label, y_label):
         self.axes.set_xlabel(x_label)
@@ -329,7 +592,7 @@ class MplCanvas(FigureCanvas):
     def set_title(self, title):
         self.axes.set_title(title, fontsize=14)
         self.axes.grid(True)
-        self.draw()
+        self.schedule_redraw()
 
     def get_mouse_coord(self):
         return self.mouse_position
@@ -504,8 +767,7 @@ class PlotWidget(QtImport.QWidget):
                         [self.selection_xrange[0], 0],
                     ]
                 )
-                self.mpl_canvas.fig.canvas.draw()
-                self.mpl_canvas.fig.canvas.flush_events()
+                self.mpl_canvas.schedule_redraw()
 
     def plot_result(self, result, aspect=None):
         if not aspect:
@@ -523,12 +785,19 @@ class PlotWidget(QtImport.QWidget):
             self.im.set_data(result)
 
         self.im.autoscale()
-        self.mpl_canvas.fig.canvas.draw()
-        self.mpl_canvas.fig.canvas.flush_events()
+        self.mpl_canvas.schedule_redraw()
 
         if result.max() > 0 and self.colorbar is None:
             self.add_colorbar()
 
+    def update_plot(self, result, aspect=None, keep_levels=False):
+        """Updates displayed image, keep_levels keeps the color scale"""
+        if self.im is None or not keep_levels:
+            self.plot_result(result, aspect)
+        else:
+            self.im.set_data(result)
+            self.mpl_canvas.schedule_redraw()
+
     def get_current_coord(self):
         return self.mpl_canvas.get_mouse_coord()
 
@@ -540,13 +809,11 @@ class PlotWidget(QtImport.QWidget):
 
     def set_ytick_labels(self, labels):
         self.mpl_canvas.axes.set_yticklabels(labels)
-        self.mpl_canvas.fig.canvas.draw()
-        self.mpl_canvas.fig.canvas.flush_events()
+        self.mpl_canvas.schedule_redraw()
 
     def set_yticks(self, ticks):
         self.mpl_canvas.axes.set_yticks(ticks)
-        self.mpl_canvas.fig.canvas.draw()
-        self.mpl_canvas.fig.canvas.flush_events()
+        self.mpl_canvas.schedule_redraw()
 
     def add_colorbar(self):
         if self.colorbar:
@@ -605,6 +872,12 @@ class PlotWidget(QtImport.QWidget):
     def update_curves(self, data):
         self.mpl_canvas.update_curves(data)
 
+    def add_streaming_curve(self, name, label=None, color=None):
+        self.mpl_canvas.add_streaming_curve(name, label, color)
+
+    def append_curve_point(self, name, x, y):
+        self.mpl_canvas.append_curve_point(name, x, y)
+
     def enable_selection_range(self):
         (x_start, x_end) = self.mpl_canvas.axes.get_xlim()
         offset = abs((x_end - x_start) / 10.0)
@@ -25,7 +25,8 @@ try:
 except BaseException:
    from gui.widgets.matplot_widget import TwoAxisPlotWidget as Plot
 
-from gui.utils import Colors, QtImport
+from gui.utils import Colors, QtImport, redraw_scheduler
+from gui.utils.curve_buffer import CurveBuffer
 
 
 __credits__ = ["MXCuBE collaboration"]
@@ -38,8 +39,7 @@ class PymcaPlotWidget(QtImport.QWidget):
 
         QtImport.QWidget.__init__(self, parent)
 
-        self.axis_x_array = []
-        self.axis_y_array = []
+        self.curve_buffer = CurveBuffer()
 
         self.realtime_plot = realtime_plot
 
@@ -68,6 +68,8 @@ class PymcaPlotWidget(QtImport.QWidget):
         Colors.set_widget_color(self, Colors.WHITE)
 
     def clear(self):
+        redraw_scheduler.cancel_redraw(self)
+        self.curve_buffer.clear()
         self.pymca_graph.clearcurves()
         self.pymca_graph.setTitle("")
         self.info_label.setText("")
@@ -84,8 +86,8 @@ class PymcaPlotWidget(QtImport.QWidget):
         self.pymca_graph.setx1axislimits(min(x_data), max(x_data))
 
     def start_new_scan(self, scan_info):
-        self.axis_x_array = []
-        self.axis_y_array = []
+        redraw_scheduler.cancel_redraw(self)
+        self.curve_buffer.clear()
         self.pymca_graph.clearcurves()
         self.pymca_graph.xlabel(scan_info["xlabel"])
         self.ylabel = scan_info["ylabel"]
@@ -116,21 +118,28 @@ class PymcaPlotWidget(QtImport.QWidget):
         self.pymca_graph.setx1axislimits(min(chooch_graph_x), max(chooch_graph_x))
 
     def plot_finished(self):
-        if self.axis_x_array:
-            self.pymca_graph.setx1axislimits(
-                min(self.axis_x_array), max(self.axis_x_array)
-            )
+        if len(self.curve_buffer) and PYMCA_EXISTS:
+            redraw_scheduler.cancel_redraw(self)
+            self.update_scan_curve()
             self.pymca_graph.replot()
 
     def add_new_plot_value(self, x, y):
+        """
+        Appends point to the scan curve. Curve is passed to the graph
+        only when it is redrawn by the redraw scheduler
+        """
         if self.realtime_plot:
-            self.axis_x_array.append(x / 1000.0)
-            self.axis_y_array.append(y / 1000.0)
-            self.pymca_graph.newcurve("Energy", self.axis_x_array, self.axis_y_array)
-            self.pymca_graph.setx1axislimits(
-                min(self.axis_x_array), max(self.axis_x_array)
-            )
-            # self.pymca_graph.replot()
+            self.curve_buffer.append(x / 1000.0, y / 1000.0)
+            if PYMCA_EXISTS:
+                redraw_scheduler.request_redraw(self, self.update_scan_curve)
+            else:
+                # matplotlib widget has streaming curves
+                self.pymca_graph.append_curve_point("Energy", x / 1000.0, y / 1000.0)
+
+    def update_scan_curve(self):
+        x_array, y_array = self.curve_buffer.get_data()
+        self.pymca_graph.newcurve("Energy", x_array, y_array)
+        self.pymca_graph.setx1axislimits(*self.curve_buffer.x_limits)
 
     def handle_graph_signal(self, signal_info):
         if signal_info["event"] == "MouseAt":
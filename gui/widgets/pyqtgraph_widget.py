@@ -20,7 +20,9 @@
 import numpy as np
 import pyqtgraph as pg
 
-from gui.utils import QtImport
+from gui.utils import QtImport, redraw_scheduler
+from gui.utils.curve_buffer import CurveBuffer
+from gui.utils.decimation import DecimationPyramid
 
 __credits__ = ["MXCuBE collaboration"]
 __license__ = "LGPLv3+"
@@ -49,6 +51,12 @@ class PlotWidget(QtImport.QWidget):
 
         self.plot_widget.showGrid(x=True, y=True)
         self.curves_dict = {}
+        self.curve_buffers = {}
+        self._dirty_curves = set()
+        # full data and decimation pyramids of curves set by update_curves
+        self._curve_data = {}
+        self._curve_pyramids = {}
+        self._autoscale_pending = False
 
         self.vlayout = QtImport.QVBoxLayout(self)
         self.vlayout.addWidget(self.plot_widget)
@@ -66,6 +74,7 @@ class PlotWidget(QtImport.QWidget):
 
         self.plot_widget.scene().sigMouseMoved.connect(self.plot_widget_mouse_moved)
         self.image_view.scene.sigMouseMoved.connect(self.image_view_mouse_moved)
+        self.view_box.sigXRangeChanged.connect(self.x_range_changed)
         #self.setMouseMode(self.RectMode)
 
     def set_plot_type(self, plot_type):
@@ -78,24 +87,140 @@ class PlotWidget(QtImport.QWidget):
         self.curves_dict[key] = curve
 
     def update_curves(self, result):
+        """
+        Sets data of curves (dict curve name: y array, optional x_array).
+        Curves are decimated by the redraw scheduler according to the
+        displayed x range, see update_decimated_curves
+        """
+        x_array = result.get("x_array")
         for key in result.keys():
             if key in self.curves_dict:
-                self.curves_dict[key].setData(y=result[key]) #, x=result['x_array'])
+                self._curve_data[key] = (result[key], x_array)
+                self._curve_pyramids.pop(key, None)
+        redraw_scheduler.request_redraw(self, self.redraw_curves)
+
+    def update_decimated_curves(self, full_range=False):
+        """
+        Sets min/max decimated data of the visible x range (or of the
+        whole curve) to the curves
+        """
+        for key, (y_array, x_array) in self._curve_data.items():
+            if key not in self._curve_pyramids:
+                self._curve_pyramids[key] = DecimationPyramid(y_array, x_array)
+
+        x_min, x_max = (None, None) if full_range else self.view_box.viewRange()[0]
+        # two points (min, max) per pixel
+        max_points = 2 * max(self.plot_widget.width(), 1)
+        for key, pyramid in self._curve_pyramids.items():
+            x_array, y_array = pyramid.get_data(x_min, x_max, max_points)
+            self.curves_dict[key].setData(x=x_array, y=y_array)
+
+    def x_range_changed(self, view_box, x_range):
+        if self._curve_data:
+            redraw_scheduler.request_redraw(self, self.redraw_curves)
+
+    def add_streaming_curve(self, name, label=None, color=None):
+        """Adds empty curve. Points are added with append_curve_point"""
+        curve = self.plot_widget.plot(name=label, pen=color or "w")
+        self.curves_dict[name] = curve
+        self.curve_buffers[name] = CurveBuffer()
+        return curve
+
+    def append_curve_point(self, name, x, y):
+        """
+        Appends point to the streaming curve (created if it does not
+        exist). Curve items are updated by the redraw scheduler
+        """
+        if name not in self.curve_buffers:
+            self.add_streaming_curve(name, label=name)
+        self.curve_buffers[name].append(x, y)
+        self._dirty_curves.add(name)
+        redraw_scheduler.request_redraw(self, self.redraw_curves)
+
+    def redraw_curves(self):
+        """Called by the redraw scheduler"""
+        self.update_streaming_curves()
+        if self._autoscale_pending:
+            self._autoscale_pending = False
+            if self._curve_data:
+                # range of the whole curves, not only of the displayed part
+                self.update_decimated_curves(full_range=True)
+            self.view_box.autoRange()
+        elif self._curve_data:
+            self.update_decimated_curves()
+
+    def update_streaming_curves(self):
+        for name in self._dirty_curves:
+            x_array, y_array = self.curve_buffers[name].get_data()
+            self.curves_dict[name].setData(x=x_array, y=y_array)
+        self._dirty_curves.clear()
+
+    def start_new_scan(self, scan_info):
+        self.clear()
+        self.set_plot_type("1D")
+        self.plot_widget.setTitle(scan_info.get("title", ""))
+        self.plot_widget.setLabel("bottom", scan_info.get("xlabel", ""))
+        self.plot_widget.setLabel("left", scan_info.get("ylabel", ""))
+        self.add_streaming_curve("energy_scan", label="Energy")
+
+    def add_new_plot_value(self, x, y):
+        self.append_curve_point("energy_scan", x, y)
+
+    def plot_finished(self):
+        self.autoscale_axes()
+
+    def plot_energy_scan_results(
+        self,
+        pk,
+        fppPeak,
+        fpPeak,
+        ip,
+        fppInfl,
+        fpInfl,
+        rm,
+        chooch_graph_x,
+        chooch_graph_y1,
+        chooch_graph_y2,
+        title,
+    ):
+        self.clear()
+        self.set_plot_type("1D")
+        self.plot_widget.setTitle(title)
+        self.curves_dict["spline"] = self.plot_widget.plot(
+            x=chooch_graph_x, y=chooch_graph_y1, pen="b"
+        )
+        self.curves_dict["fp"] = self.plot_widget.plot(
+            x=chooch_graph_x, y=chooch_graph_y2, pen="r"
+        )
 
     def plot_result(self, result, aspect=None):
         self.image_view.setImage(result)
 
-    def update_plot(self, result, aspect=None):
-        self.image_view.setImage(result)
+    def update_plot(self, result, aspect=None, keep_levels=False):
+        """
+        Updates displayed image. With keep_levels the image item is
+        updated in place (no new levels, histogram and range)
+        """
+        if keep_levels and self.image_view.image is not None:
+            self.image_view.getImageItem().setImage(result, autoLevels=False)
+        else:
+            self.image_view.setImage(result)
 
     def autoscale_axes(self):
         #self.plot_widget.enableAutoRange(self.view_box.XYAxes, True)
-        self.view_box.autoRange()
+        self._autoscale_pending = True
+        redraw_scheduler.request_redraw(self, self.redraw_curves)
 
     def clear(self):
         self.plot_widget.clear()
         self.image_view.clear()
         self.curves_dict = {}
+        self.curve_buffers = {}
+        self._dirty_curves.clear()
+        self._curve_data = {}
+        self._curve_pyramids = {}
+        self._autoscale_pending = False
+        redraw_scheduler.cancel_redraw(self)
 
     def hide_all_curves(self):
         for key in self.curves_dict.keys():
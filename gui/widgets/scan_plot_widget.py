@@ -19,7 +19,8 @@
 
 from PyMca.QtBlissGraph import QtBlissGraph
 
-from gui.utils import QtImport
+from gui.utils import QtImport, redraw_scheduler
+from gui.utils.curve_buffer import CurveBuffer
 
 
 __credits__ = ["MXCuBE collaboration"]
@@ -35,8 +36,8 @@ class ScanPlotWidget(QtImport.QWidget):
         if name is not None:
             self.setObjectName(name)
 
-        self.xdata = []
         self.ylabel = ""
+        self.curve_buffers = []
 
         self.isRealTimePlot = None
         self.isConnected = None
@@ -63,26 +64,31 @@ class ScanPlotWidget(QtImport.QWidget):
         self.graph.clearcurves()
         self.isScanning = True
         self.lblTitle.setText("<nobr><b>%s</b></nobr>" % scanParameters["title"])
-        self.xdata = []
         self.graph.xlabel(scanParameters["xlabel"])
         self.ylabel = scanParameters["ylabel"]
         ylabels = self.ylabel.split()
-        self.ydatas = [[] for x in range(len(ylabels))]
-        for labels, ydata in zip(ylabels, self.ydatas):
-            self.graph.newcurve(labels, self.xdata, ydata)
+        self.curve_buffers = [CurveBuffer() for label in ylabels]
+        for label in ylabels:
+            self.graph.newcurve(label, [], [])
         self.graph.ylabel(self.ylabel)
         self.graph.setx1timescale(False)
         self.graph.replot()
         self.graph.setTitle("Energy scan started. Waiting values...")
 
     def add_new_plot_value(self, x, y):
-        self.xdata.append(x)
-        for label, ydata, yvalue in zip(
-            self.ylabel.split(), self.ydatas, str(y).split()
-        ):
-            ydata.append(float(yvalue))
-            self.graph.newcurve(label, self.xdata, ydata)
-            self.graph.setTitle("Energy scan in progress. Please wait...")
+        """
+        Appends point to the curves. Curves are passed to the graph
+        only when it is redrawn by the redraw scheduler
+        """
+        for curve_buffer, yvalue in zip(self.curve_buffers, str(y).split()):
+            curve_buffer.append(x, float(yvalue))
+        redraw_scheduler.request_redraw(self.graph, self.update_scan_curves)
+
+    def update_scan_curves(self):
+        for label, curve_buffer in zip(self.ylabel.split(), self.curve_buffers):
+            x_array, y_array = curve_buffer.get_data()
+            self.graph.newcurve(label, x_array, y_array)
+        self.graph.setTitle("Energy scan in progress. Please wait...")
         self.graph.replot()
 
     def handleBlissGraphSignal(self, signalDict):
@@ -105,6 +111,7 @@ class ScanPlotWidget(QtImport.QWidget):
         chooch_graph_y2,
         title,
     ):
+        redraw_scheduler.cancel_redraw(self.graph)
         self.graph.clearcurves()
         self.graph.setTitle(title)
         self.graph.newcurve("spline", chooch_graph_x, chooch_graph_y1)
@@ -113,6 +120,7 @@ class ScanPlotWidget(QtImport.QWidget):
         self.isScanning = False
 
     def plot_scan_curve(self, scan_data):
+        redraw_scheduler.cancel_redraw(self.graph)
         self.graph.clearcurves()
         self.graph.setTitle("Energy scan finished")
         self.lblTitle.setText("")
@@ -122,6 +130,8 @@ class ScanPlotWidget(QtImport.QWidget):
         self.graph.replot()
 
     def clear(self):
+        redraw_scheduler.cancel_redraw(self.graph)
+        self.curve_buffers = []
         self.graph.clearcurves()
         # self.graph.setTitle("")
         self.lblTitle.setText("")
@@ -19,6 +19,7 @@
 
 
 from gui.utils import QtImport
+from gui.utils.image_pipeline import ImageTransform, get_image_pipeline
 
 
 __credits__ = ["MXCuBE collaboration"]
@@ -56,14 +57,24 @@ class SnapshotWidget(QtImport.QWidget):
 
     def display_snapshot(self, image, width=None):
         if image is not None:
+            if isinstance(image, QtImport.QPixmap):
+                image = image.toImage()
             if width is not None:
-                ration = image.height() / float(image.width())
-                image = image.scaled(
-                    width, width * ration, QtImport.Qt.KeepAspectRatio, QtImport.Qt.SmoothTransformation
-                )
+                # scaled in a worker thread, scaled snapshots are cached
                 self.setFixedWidth(width)
+                get_image_pipeline().process(
+                    self,
+                    image,
+                    ImageTransform(width=width),
+                    self.set_snapshot_image,
+                    cache=True,
+                )
+            else:
+                get_image_pipeline().cancel(self)
+                self.set_snapshot_image(image)
 
-            self.snapshot_label.setPixmap(QtImport.QPixmap(image))
+    def set_snapshot_image(self, image):
+        self.snapshot_label.setPixmap(QtImport.QPixmap.fromImage(image))
 
     def display_animation(self, animation_filename):
         self.animation_gbox.setVisible(True)
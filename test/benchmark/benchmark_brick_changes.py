@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Compares the cost of mirroring changes of a synchronised line edit in a
+GUI of 5000 widgets:
+
+- scan: every keystroke scans QApplication.allWidgets() for the window
+  with a configuration and emits brickChangedSignal (previous
+  BaseWidget.update_widget)
+- queue: the window is referenced directly and the changes are coalesced
+  by BrickChangeQueue, a burst of keystrokes sends one message
+
+Usage: python test/benchmark/benchmark_brick_changes.py
+"""
+import os
+import sys
+import time
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from gui.utils import QtImport
+from gui.utils.brick_change_queue import BrickChangeQueue
+
+NUM_WIDGETS = 5000
+NUM_KEYSTROKES = 500
+WIDGETS_PER_BRICK = 25
+
+
+class Window(QtImport.QWidget):
+    brickChangedSignal = QtImport.pyqtSignal(str, str, str, tuple, bool)
+
+    def __init__(self):
+        QtImport.QWidget.__init__(self)
+        self.configuration = None
+
+
+def build_gui():
+    window = Window()
+    layout = QtImport.QVBoxLayout(window)
+    for brick_index in range(NUM_WIDGETS // WIDGETS_PER_BRICK):
+        brick = QtImport.QFrame(window)
+        layout.addWidget(brick)
+        for widget_index in range(WIDGETS_PER_BRICK - 1):
+            QtImport.QLabel("label %d" % widget_index, brick)
+    return window
+
+
+def scan_update_widget(*args):
+    for widget in QtImport.QApplication.allWidgets():
+        if hasattr(widget, "configuration"):
+            top_level_widget = widget
+            break
+    top_level_widget.brickChangedSignal.emit(*args)
+
+
+def type_text(update_widget):
+    text = ""
+    start = time.time()
+    for index in range(NUM_KEYSTROKES):
+        text += "x"
+        update_widget("brick", "ledit", "setText", (text,), True)
+    return time.time() - start
+
+
+if __name__ == "__main__":
+    app = QtImport.QApplication([])
+    window = build_gui()
+    messages = []
+    window.brickChangedSignal.connect(lambda *args: messages.append(args))
+    print(
+        "GUI of %d widgets, %d keystrokes"
+        % (len(QtImport.QApplication.allWidgets()), NUM_KEYSTROKES)
+    )
+
+    duration = type_text(scan_update_widget)
+    print(
+        "  scan  : %.3f ms per keystroke, %d messages"
+        % (duration * 1000 / NUM_KEYSTROKES, len(messages))
+    )
+
+    del messages[:]
+    queue = BrickChangeQueue(window.brickChangedSignal.emit)
+    duration = type_text(queue.add_change)
+    end = time.time() + 1
+    while queue.has_pending_changes() and time.time() < end:
+        app.processEvents()
+        time.sleep(0.001)
+    print(
+        "  queue : %.3f ms per keystroke, %d messages"
+        % (duration * 1000 / NUM_KEYSTROKES, len(messages))
+    )
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Compares the DataCollectTree build time when parent items are looked up
+by scanning the tree (QTreeWidgetItemIterator, as before the model index)
+and with the model index used by DataCollectTree.get_item_by_model.
+
+Tree holds the samples of a 30 puck Unipuck dewar (30 x 16 samples),
+each sample with one task group holding 4 energy scans. Items are added
+with DataCollectTree.add_to_view, hardware objects are replaced by
+stand-ins. Requires HardwareRepository.
+
+Usage: python test/benchmark/benchmark_dc_tree_index.py
+"""
+import os
+import sys
+import time
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from gui.utils import QtImport
+
+from HardwareRepository import HardwareRepository as HWR
+from HardwareRepository.HardwareObjects import queue_model_objects
+
+NUM_SAMPLES = 30 * 16
+NUM_TASKS = 5
+
+
+class Diffractometer(object):
+    def in_plate_mode(self):
+        return False
+
+
+class QueueModel(object):
+    def view_created(self, view_item, task):
+        view_item._data_model = task
+
+
+class Beamline(object):
+    def __init__(self):
+        self.diffractometer = Diffractometer()
+        self.queue_model = QueueModel()
+        self.sample_changer = None
+        self.plate_manipulator = None
+
+
+def scan_lookup(tree_widget, model):
+    it = QtImport.QTreeWidgetItemIterator(tree_widget)
+    item = it.value()
+    while item:
+        if item.get_model() is model:
+            return item
+        it += 1
+        item = it.value()
+    return tree_widget
+
+
+def build_models():
+    """Returns a list of (parent model, model) in the order of adding"""
+    models = []
+    for sample_index in range(NUM_SAMPLES):
+        sample = queue_model_objects.Sample()
+        models.append((None, sample))
+        group = queue_model_objects.TaskGroup()
+        models.append((sample, group))
+        for task_index in range(NUM_TASKS - 1):
+            models.append((group, queue_model_objects.EnergyScan()))
+    return models
+
+
+def build_tree(models, lookup):
+    from gui.widgets.dc_tree_widget import DataCollectTree
+
+    tree = DataCollectTree()
+    if lookup == "scan":
+        tree.get_item_by_model = lambda model: scan_lookup(
+            tree.sample_tree_widget, model
+        )
+    start = time.time()
+    with tree.bulk_update():
+        for parent, model in models:
+            tree.add_to_view(parent, model)
+    return time.time() - start
+
+
+if __name__ == "__main__":
+    app = QtImport.QApplication([])
+    HWR.beamline = Beamline()
+    models = build_models()
+    print(
+        "Tree with %d samples x %d tasks (%d items)"
+        % (NUM_SAMPLES, NUM_TASKS, len(models))
+    )
+    print("  scan lookup  : %.3f s" % build_tree(models, "scan"))
+    print("  index lookup : %.3f s" % build_tree(models, "index"))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Decimation of a 1D hit map of a serial collection: build time of the
+min/max pyramid, time of a view update (full range and zoomed) and
+number of visible hits compared to stride slicing.
+
+Usage: python test/benchmark/benchmark_decimation.py [number of images]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+
+from gui.utils.decimation import DecimationPyramid
+
+NUM_IMAGES = 1000000
+NUM_HITS = 500
+# plot width in pixels, two points per pixel
+PLOT_WIDTH = 800
+NUM_REPEATS = 20
+
+
+def best_time(function, *args, **kwargs):
+    times = []
+    for index in range(NUM_REPEATS):
+        start = time.time()
+        function(*args, **kwargs)
+        times.append(time.time() - start)
+    return min(times)
+
+
+def count_visible_hits(x_array, y_array, hit_map, hits, resolution):
+    visible = 0
+    for hit in hits:
+        near = np.abs(x_array - hit) <= resolution
+        if near.any() and y_array[near].max() >= hit_map[hit]:
+            visible += 1
+    return visible
+
+
+if __name__ == "__main__":
+    num_images = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_IMAGES
+    random_state = np.random.RandomState(0)
+    hit_map = random_state.poisson(2, num_images).astype(float)
+    hits = random_state.choice(num_images, NUM_HITS, replace=False)
+    hit_map[hits] = random_state.uniform(20, 200, NUM_HITS)
+    max_points = 2 * PLOT_WIDTH
+    resolution = 2 * num_images / PLOT_WIDTH
+
+    print("images                 %d (%d hits)" % (num_images, NUM_HITS))
+    print("pyramid build          %.1f ms" % (1000 * best_time(DecimationPyramid, hit_map)))
+    pyramid = DecimationPyramid(hit_map)
+    print(
+        "full view              %.3f ms"
+        % (1000 * best_time(pyramid.get_data, max_points=max_points))
+    )
+    print(
+        "zoomed view (10 %%)     %.3f ms"
+        % (1000 * best_time(pyramid.get_data, 0, num_images / 10, max_points))
+    )
+
+    x_array, y_array = pyramid.get_data(max_points=max_points)
+    print(
+        "visible hits (min/max) %d of %d, %d points"
+        % (
+            count_visible_hits(x_array, y_array, hit_map, hits, resolution),
+            NUM_HITS,
+            x_array.size,
+        )
+    )
+    stride = num_images // max_points
+    x_array = np.arange(0, num_images, stride)
+    y_array = hit_map[::stride]
+    print(
+        "visible hits (stride)  %d of %d, %d points"
+        % (
+            count_visible_hits(x_array, y_array, hit_map, hits, resolution),
+            NUM_HITS,
+            x_array.size,
+        )
+    )
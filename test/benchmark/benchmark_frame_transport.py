@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+"""
+Drives a graphics view with a synthetic camera (RGB numpy frames pushed
+from a thread) and compares the QPixmap path (a queued signal per frame,
+then copy to QImage, QPixmap and setPixmap in the GUI thread) with
+FrameTransport (zero copy QImage, only the latest frame kept).
+
+Reports painted frames, latency from frame acquisition to display and
+CPU use for 25/50/100 FPS and 1, 2 and 4 MP frames. With --guiLoad the
+GUI thread is kept busy (ms of work every 20 ms), as during a scan.
+
+Usage: python test/benchmark/benchmark_frame_transport.py
+           [--duration S] [--fps 25,50,100] [--sizes 1,2,4] [--guiLoad MS]
+"""
+import os
+import sys
+import time
+import threading
+from optparse import OptionParser
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+
+from gui.utils import QtImport
+from gui.utils.frame_transport import FrameTransport, FrameGraphicsItem
+
+DURATION = 2.0
+# megapixels: (width, height)
+FRAME_SIZES = {1: (1280, 800), 2: (1600, 1200), 4: (2048, 2048)}
+NUM_BUFFERS = 4
+GUI_LOAD = 10
+GUI_TIMER_INTERVAL = 20
+
+
+class SyntheticCamera(threading.Thread):
+    """Pushes frames from a ring of preallocated buffers at a fixed rate"""
+
+    def __init__(self, width, height, fps, duration, frame_callback):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        random_state = np.random.RandomState(0)
+        self.buffers = [
+            random_state.randint(0, 255, (height, width, 3)).astype(np.uint8)
+            for index in range(NUM_BUFFERS)
+        ]
+        self.interval = 1.0 / fps
+        self.duration = duration
+        self.frame_callback = frame_callback
+        self.num_frames = 0
+
+    def run(self):
+        start = time.time()
+        next_frame = start
+        while next_frame - start < self.duration:
+            self.frame_callback(
+                self.buffers[self.num_frames % NUM_BUFFERS], time.time()
+            )
+            self.num_frames += 1
+            next_frame += self.interval
+            time.sleep(max(0, next_frame - time.time()))
+
+
+class CountingPixmapItem(QtImport.QGraphicsPixmapItem):
+    def __init__(self):
+        QtImport.QGraphicsPixmapItem.__init__(self)
+        self.paint_count = 0
+
+    def paint(self, painter, option, widget):
+        self.paint_count += 1
+        QtImport.QGraphicsPixmapItem.paint(self, painter, option, widget)
+
+
+class CountingFrameItem(FrameGraphicsItem):
+    def __init__(self):
+        FrameGraphicsItem.__init__(self)
+        self.paint_count = 0
+
+    def paint(self, painter, option, widget):
+        self.paint_count += 1
+        FrameGraphicsItem.paint(self, painter, option, widget)
+
+
+class PixmapPath(QtImport.QObject):
+    """Previous frame path: every frame is converted to QPixmap"""
+
+    frameSignal = QtImport.pyqtSignal(object, float)
+
+    def __init__(self, scene):
+        QtImport.QObject.__init__(self)
+        self.item = CountingPixmapItem()
+        scene.addItem(self.item)
+        self.displayed = 0
+        self.latencies = []
+        self.frameSignal.connect(self.display_frame, QtImport.Qt.QueuedConnection)
+
+    def push_frame(self, frame, timestamp):
+        self.frameSignal.emit(frame, timestamp)
+
+    def display_frame(self, frame, timestamp):
+        image = QtImport.QImage(
+            frame.tobytes(),
+            frame.shape[1],
+            frame.shape[0],
+            frame.strides[0],
+            QtImport.QImage.Format_RGB888,
+        )
+        self.item.setPixmap(QtImport.QPixmap.fromImage(image))
+        self.displayed += 1
+        self.latencies.append(time.time() - timestamp)
+
+
+class TransportPath(object):
+    def __init__(self, scene):
+        self.item = CountingFrameItem()
+        scene.addItem(self.item)
+        self.transport = FrameTransport(name="benchmark")
+        self.transport.frameReceived.connect(self.item.set_frame)
+
+    def push_frame(self, frame, timestamp):
+        self.transport.push_frame(frame, timestamp)
+
+
+def run(view, path_class, width, height, fps, duration, gui_load):
+    scene = QtImport.QGraphicsScene()
+    view.setScene(scene)
+    path = path_class(scene)
+    camera = SyntheticCamera(width, height, fps, duration, path.push_frame)
+    event_loop = QtImport.QEventLoop()
+    stop_time = [None]
+
+    def gui_work():
+        busy_end = time.time() + gui_load / 1000.0
+        while time.time() < busy_end:
+            pass
+        # one more second for frames queued when the camera stopped
+        if not camera.is_alive():
+            if stop_time[0] is None:
+                stop_time[0] = time.time()
+            elif time.time() - stop_time[0] > 1.0:
+                event_loop.quit()
+
+    timer = QtImport.QTimer()
+    timer.timeout.connect(gui_work)
+    timer.start(GUI_TIMER_INTERVAL)
+
+    start_cpu = time.process_time()
+    camera.start()
+    event_loop.exec_()
+    timer.stop()
+    cpu_time = time.process_time() - start_cpu - duration * gui_load / GUI_TIMER_INTERVAL
+
+    if isinstance(path, TransportPath):
+        statistics = path.transport.get_statistics()
+        displayed = statistics["displayed"]
+        latency_mean = statistics["latency_mean"]
+        latency_max = statistics["latency_max"]
+    else:
+        displayed = path.displayed
+        latencies = path.latencies or [0]
+        latency_mean = sum(latencies) / len(latencies)
+        latency_max = max(latencies)
+    return (
+        camera.num_frames,
+        displayed,
+        path.item.paint_count,
+        latency_mean * 1000,
+        latency_max * 1000,
+        cpu_time / duration * 100,
+    )
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("", "--duration", type="float", dest="duration", default=DURATION)
+    parser.add_option("", "--fps", dest="fps", default="25,50,100")
+    parser.add_option("", "--sizes", dest="sizes", default="1,2,4")
+    parser.add_option("", "--guiLoad", type="float", dest="guiLoad", default=GUI_LOAD)
+    (opts, args) = parser.parse_args()
+
+    app = QtImport.QApplication([])
+    view = QtImport.QGraphicsView()
+    view.resize(800, 600)
+    view.show()
+
+    print(
+        "%-10s %4s %4s %7s %9s %8s %13s %13s %6s"
+        % ("path", "MP", "fps", "frames", "displayed", "painted",
+           "latency [ms]", "max lat [ms]", "cpu %")
+    )
+    print("(gui load %.0f ms every %d ms)" % (opts.guiLoad, GUI_TIMER_INTERVAL))
+    for size in map(int, opts.sizes.split(",")):
+        width, height = FRAME_SIZES[size]
+        for fps in map(float, opts.fps.split(",")):
+            for name, path_class in (("pixmap", PixmapPath), ("transport", TransportPath)):
+                result = run(
+                    view, path_class, width, height, fps, opts.duration, opts.guiLoad
+                )
+                print(
+                    "%-10s %4d %4d %7d %9d %8d %13.1f %13.1f %6.0f"
+                    % ((name, size, fps) + result)
+                )
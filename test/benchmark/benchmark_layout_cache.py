@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Compares cold parsing of GUI layouts (parse + property resolution +
+brick module search) with loading of the compiled layout cache.
+
+Usage: python test/benchmark/benchmark_layout_cache.py [GUI files]
+       (default: configuration/soleil_px2/*.yml)
+"""
+import os
+import sys
+import glob
+import time
+import shutil
+import tempfile
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+
+from gui.utils import layout_cache
+
+NUM_REPEATS = 5
+
+
+def best_time(function, *args):
+    times = []
+    for index in range(NUM_REPEATS):
+        start = time.time()
+        function(*args)
+        times.append(time.time() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    filenames = sys.argv[1:] or sorted(
+        glob.glob(os.path.join(MXCUBE_ROOT, "configuration/soleil_px2/*.yml"))
+    )
+    cache_dir = tempfile.mkdtemp()
+    total_parse_time = 0
+    total_cached_time = 0
+
+    print("%-32s %10s %10s %8s" % ("layout", "parse [ms]", "cache [ms]", "speedup"))
+    try:
+        for filename in filenames:
+            try:
+                layout_cache.save_cached_layout(
+                    layout_cache.compile_layout(filename), filename, cache_dir
+                )
+            except BaseException as ex:
+                print("%-32s could not be parsed: %s"
+                      % (os.path.basename(filename), str(ex).splitlines()[0]))
+                continue
+            parse_time = best_time(layout_cache.compile_layout, filename)
+            cached_time = best_time(layout_cache.load_cached_layout, filename, cache_dir)
+            total_parse_time += parse_time
+            total_cached_time += cached_time
+            print(
+                "%-32s %10.2f %10.2f %7.1fx"
+                % (
+                    os.path.basename(filename),
+                    parse_time * 1000,
+                    cached_time * 1000,
+                    parse_time / cached_time,
+                )
+            )
+    finally:
+        shutil.rmtree(cache_dir)
+
+    if total_cached_time:
+        print(
+            "%-32s %10.2f %10.2f %7.1fx"
+            % (
+                "total",
+                total_parse_time * 1000,
+                total_cached_time * 1000,
+                total_parse_time / total_cached_time,
+            )
+        )
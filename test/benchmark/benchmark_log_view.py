@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Measures log throughput of the LogViewBrick model/view classes: records
+are appended in batches (as delivered by GUILogHandler) to three views
+(errors and warnings, information, debug), each with its own model and
+the default 100000 line limit.
+
+Usage: python test/benchmark/benchmark_log_view.py [number of records]
+"""
+import os
+import sys
+import time
+import logging
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from gui.utils import QtImport
+from gui.utils.GUILogHandler import LogRecord
+from gui.widgets.log_view_widget import LogTableView
+
+NUM_RECORDS = 200000
+BATCH_SIZE = 500
+LEVELS = (logging.DEBUG, logging.INFO, logging.INFO, logging.WARNING, logging.ERROR)
+
+
+def build_records(num_records):
+    records = []
+    for index in range(num_records):
+        level = LEVELS[index % len(LEVELS)]
+        records.append(
+            LogRecord(
+                logging.LogRecord(
+                    "HWR", level, __file__, 0, "Log message %d", (index,), None
+                )
+            )
+        )
+    return records
+
+
+if __name__ == "__main__":
+    num_records = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_RECORDS
+    app = QtImport.QApplication([])
+
+    views = {}
+    for levels in (
+        (logging.WARNING, logging.ERROR, logging.CRITICAL),
+        (logging.INFO,),
+        (logging.DEBUG,),
+    ):
+        view = LogTableView(None, "")
+        view.show()
+        for level in levels:
+            views[level] = view
+
+    records = build_records(num_records)
+    max_batch_time = 0
+    start = time.time()
+    for index in range(0, num_records, BATCH_SIZE):
+        batch_start = time.time()
+        view_records = {}
+        for record in records[index:index + BATCH_SIZE]:
+            view_records.setdefault(views[record.getLevel()], []).append(record)
+        for view, view_record_list in view_records.items():
+            view.append_records(view_record_list)
+            view.scrollToBottom()
+        app.processEvents()
+        max_batch_time = max(max_batch_time, time.time() - batch_start)
+    total_time = time.time() - start
+
+    print("%d records in batches of %d" % (num_records, BATCH_SIZE))
+    print(
+        "  lines kept     : %d"
+        % sum(view.log_model.rowCount() for view in set(views.values()))
+    )
+    print("  throughput     : %.0f lines/s" % (num_records / total_time))
+    print("  max batch time : %.1f ms" % (max_batch_time * 1000))
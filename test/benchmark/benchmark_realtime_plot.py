@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Feeds points to the real time TwoAxisPlotWidget (as used by the
+MachineInfoBrick history plots) and reports CPU use and memory growth.
+
+Points are fed at RATE Hz (one point per timer tick). With --speedup the
+feed rate is multiplied, which shortens the run, but also lowers the
+number of frames drawn per point.
+
+Usage: python test/benchmark/benchmark_realtime_plot.py
+           [--points N] [--rate HZ] [--speedup X] [--maxPlotPoints N]
+"""
+import os
+import sys
+import time
+import resource
+import tracemalloc
+from optparse import OptionParser
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+
+from gui.utils import QtImport, redraw_scheduler
+from gui.widgets.matplot_widget import TwoAxisPlotWidget
+
+NUM_POINTS = 100000
+RATE = 50
+SPEEDUP = 50
+MAX_PLOT_POINTS = 100
+
+
+def get_rss_kb():
+    with open("/proc/self/statm") as statm_file:
+        return int(statm_file.read().split()[1]) * resource.getpagesize() // 1024
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("", "--points", type="int", dest="points", default=NUM_POINTS)
+    parser.add_option("", "--rate", type="float", dest="rate", default=RATE)
+    parser.add_option("", "--speedup", type="float", dest="speedup", default=SPEEDUP)
+    parser.add_option(
+        "", "--maxPlotPoints", type="int", dest="maxPlotPoints", default=MAX_PLOT_POINTS
+    )
+    (opts, args) = parser.parse_args()
+
+    app = QtImport.QApplication([])
+    plot_widget = TwoAxisPlotWidget(None, realtime_plot=True)
+    plot_widget.set_tight_layout()
+    plot_widget.clear()
+    plot_widget.set_max_plot_point(opts.maxPlotPoints)
+    plot_widget.resize(400, 200)
+    plot_widget.show()
+    app.processEvents()
+
+    values = 200 + 5 * np.sin(np.arange(opts.points) / 500.0)
+    values += np.random.RandomState(0).normal(0, 0.5, opts.points)
+    interval = 1.0 / (opts.rate * opts.speedup)
+    checkpoints = {}
+    canvas = plot_widget._two_axis_figure_canvas
+    draw_count = [0]
+    canvas.mpl_connect("draw_event", lambda event: draw_count.__setitem__(0, draw_count[0] + 1))
+
+    tracemalloc.start()
+    start_rss = get_rss_kb()
+    start_wall = time.time()
+    start_cpu = time.process_time()
+    next_tick = start_wall
+    for index, value in enumerate(values):
+        plot_widget.add_new_plot_value(float(value))
+        next_tick += interval
+        while True:
+            app.processEvents()
+            remaining = next_tick - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 0.002))
+        if index + 1 in (opts.points // 10, opts.points):
+            checkpoints[index + 1] = (
+                tracemalloc.get_traced_memory()[0],
+                get_rss_kb(),
+            )
+    wall_time = time.time() - start_wall
+    cpu_time = time.process_time() - start_cpu
+    artists = len(canvas.axes.lines) + len(canvas.axes.patches)
+    tracemalloc.stop()
+
+    print("points                 %d (%.0f Hz x %.0f)" % (opts.points, opts.rate, opts.speedup))
+    print("wall time              %.1f s" % wall_time)
+    print("cpu time               %.1f s (%.1f %% of one core)" % (cpu_time, 100 * cpu_time / wall_time))
+    print("cpu per point          %.3f ms" % (1000 * cpu_time / opts.points))
+    print("full redraws           %d" % draw_count[0])
+    print("artists in axes        %d" % artists)
+    statistics = redraw_scheduler.get_statistics(canvas)
+    print(
+        "frames                 %d drawn, %d coalesced, %d dropped"
+        % (statistics["drawn"], statistics["coalesced"], statistics["dropped"])
+    )
+    first, last = sorted(checkpoints)
+    print(
+        "python heap growth     %.1f kB (between %d and %d points)"
+        % ((checkpoints[last][0] - checkpoints[first][0]) / 1024.0, first, last)
+    )
+    print(
+        "rss growth             %d kB (total %d kB since start)"
+        % (checkpoints[last][1] - checkpoints[first][1], checkpoints[last][1] - start_rss)
+    )
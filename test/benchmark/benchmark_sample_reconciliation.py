@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+Compares matching of the sample changer content with LIMS and grouping of
+the samples by basket (widget creation excluded): per sample lookups with
+logging and a basket x sample loop as done before, and the reconciliation
+engine (gui.utils.sample_reconciliation).
+
+Dewar of 29 pucks x 16 positions. Every 10th sample has no barcode in
+the sample changer, every 25th has a barcode at another LIMS location
+and every 7th is unknown to LIMS.
+
+Usage: python test/benchmark/benchmark_sample_reconciliation.py
+"""
+import os
+import sys
+import time
+import logging
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+
+from gui.utils.sample_reconciliation import (
+    group_samples_by_basket,
+    index_lims_samples,
+    reconcile_samples,
+)
+
+NUM_BASKETS = 29
+NUM_SAMPLES = 16
+NUM_REPEATS = 20
+
+
+class Sample(object):
+    def __init__(self, code, location, lims_code=None, lims_location=None):
+        self.code = code
+        self.location = location
+        self.lims_code = lims_code
+        self.lims_location = lims_location
+
+
+def build_samples():
+    sc_samples = []
+    lims_samples = []
+    for index in range(NUM_BASKETS * NUM_SAMPLES):
+        location = (index // NUM_SAMPLES + 1, index % NUM_SAMPLES + 1)
+        code = "BC%04d" % index
+        sc_samples.append(Sample("" if index % 10 == 0 else code, location))
+        if index % 7 == 0:
+            continue
+        if index % 25 == 0:
+            location = (location[0], location[1] % NUM_SAMPLES + 1)
+        lims_samples.append(Sample(code, location, code, location))
+    return sc_samples, lims_samples
+
+
+def old_reconcile(sc_samples, lims_samples, log):
+    barcode_samples = {}
+    location_samples = {}
+    for sample in lims_samples:
+        if sample.lims_code:
+            barcode_samples[sample.lims_code] = sample
+        if sample.lims_location:
+            location_samples[sample.lims_location] = sample
+
+    sample_list = []
+    for sc_sample in sc_samples:
+        lims_sample = barcode_samples.get(sc_sample.code)
+        if lims_sample:
+            if lims_sample.lims_location == sc_sample.location:
+                log.debug("Found sample in ISPyB for location %s" % str(sc_sample.location))
+                sample_list.append(lims_sample)
+            else:
+                log.warning(
+                    "The sample with the barcode (%s) exists in LIMS but the "
+                    "location does not match. Sample changer location: %s, "
+                    "LIMS location %s"
+                    % (sc_sample.code, sc_sample.location, lims_sample.lims_location)
+                )
+                sample_list.append(sc_sample)
+        else:
+            lims_sample = location_samples.get(sc_sample.location)
+            if lims_sample:
+                if lims_sample.lims_code:
+                    log.warning(
+                        "The sample has a barcode in LIMS, but the SC has no "
+                        "barcode information for this sample. For location: %s"
+                        % str(sc_sample.location)
+                    )
+                else:
+                    log.debug("Found sample in ISPyB for location %s" % str(sc_sample.location))
+                sample_list.append(lims_sample)
+            else:
+                sample_list.append(sc_sample)
+
+    baskets = []
+    for basket_index in range(NUM_BASKETS):
+        basket = []
+        for sample in sample_list:
+            if sample.location[0] == basket_index + 1:
+                basket.append(sample)
+        baskets.append(basket)
+    return baskets
+
+
+def new_reconcile(sc_samples, lims_samples, log):
+    barcode_samples, location_samples = index_lims_samples(lims_samples)
+    report = reconcile_samples(sc_samples, barcode_samples, location_samples)
+    report.log(log)
+    basket_samples = group_samples_by_basket(report.get_sample_list())
+    return [basket_samples.get(index + 1, []) for index in range(NUM_BASKETS)]
+
+
+def measure(function, sc_samples, lims_samples, log):
+    start = time.time()
+    for repeat in range(NUM_REPEATS):
+        baskets = function(sc_samples, lims_samples, log)
+    return (time.time() - start) / NUM_REPEATS, baskets
+
+
+if __name__ == "__main__":
+    handler = logging.StreamHandler(open(os.devnull, "w"))
+    log = logging.getLogger("benchmark_sample_reconciliation")
+    log.addHandler(handler)
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+
+    sc_samples, lims_samples = build_samples()
+    old_time, old_baskets = measure(old_reconcile, sc_samples, lims_samples, log)
+    new_time, new_baskets = measure(new_reconcile, sc_samples, lims_samples, log)
+    assert old_baskets == new_baskets
+
+    print(
+        "%d sample changer samples, %d LIMS samples (mean of %d runs)"
+        % (len(sc_samples), len(lims_samples), NUM_REPEATS)
+    )
+    print("  per sample lookups and logs : %.2f ms" % (old_time * 1000))
+    print("  reconciliation engine       : %.2f ms" % (new_time * 1000))
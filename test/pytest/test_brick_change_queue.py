@@ -0,0 +1,51 @@
+"""
+Tests of the coalescing of the mirrored brick changes
+"""
+import os
+import sys
+import time
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from gui.utils import QtImport
+from gui.utils.brick_change_queue import BrickChangeQueue
+
+APP = QtImport.QApplication.instance() or QtImport.QApplication([])
+
+
+def test_burst_sends_last_change():
+    sent = []
+    queue = BrickChangeQueue(lambda *args: sent.append(args), interval=20)
+
+    for text in ("a", "ab", "abc"):
+        queue.add_change("brick", "ledit", "setText", (text,), True)
+    queue.add_change("brick", "cbox", "setCurrentIndex", (2,), True)
+    queue.add_change("brick", "ledit", "setText", ("abcd",), True)
+    assert sent == []
+
+    end = time.time() + 1
+    while queue.has_pending_changes() and time.time() < end:
+        APP.processEvents()
+        time.sleep(0.005)
+
+    assert sent == [
+        ("brick", "cbox", "setCurrentIndex", (2,), True),
+        ("brick", "ledit", "setText", ("abcd",), True),
+    ]
+    assert queue.get_statistics() == {"received": 5, "sent": 2, "pending": 0}
+
+
+def test_flush_and_no_interval():
+    sent = []
+    queue = BrickChangeQueue(lambda *args: sent.append(args), interval=1000)
+    queue.add_change("brick", "ledit", "setText", ("a",), False)
+    queue.flush()
+    assert sent == [("brick", "ledit", "setText", ("a",), False)]
+
+    queue = BrickChangeQueue(lambda *args: sent.append(args), interval=0)
+    queue.add_change("brick", "spinbox", "setValue", (1,), True)
+    assert len(sent) == 2
@@ -0,0 +1,44 @@
+"""
+Tests of the growable CurveBuffer used by streaming plot curves
+"""
+import os
+import sys
+
+import numpy as np
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+
+from gui.utils.curve_buffer import CurveBuffer
+
+
+def test_append_and_extend():
+    curve_buffer = CurveBuffer(capacity=2)
+    for index in range(10):
+        curve_buffer.append(index, index * 2)
+    curve_buffer.extend(np.arange(10, 15), np.arange(10, 15) * 2)
+
+    x_array, y_array = curve_buffer.get_data()
+    assert len(curve_buffer) == 15
+    assert np.array_equal(x_array, np.arange(15))
+    assert np.array_equal(y_array, np.arange(15) * 2)
+    assert curve_buffer.x_limits == [0, 14]
+    assert curve_buffer.y_limits == [0, 28]
+
+
+def test_data_is_not_copied_until_capacity_is_reached():
+    curve_buffer = CurveBuffer(capacity=4)
+    curve_buffer.append(0, 0)
+    x_array, y_array = curve_buffer.get_data()
+    curve_buffer.append(1, 1)
+    assert np.shares_memory(x_array, curve_buffer.get_data()[0])
+
+
+def test_clear():
+    curve_buffer = CurveBuffer()
+    curve_buffer.append(1, 1)
+    curve_buffer.clear()
+    assert len(curve_buffer) == 0
+    assert curve_buffer.x_limits == [None, None]
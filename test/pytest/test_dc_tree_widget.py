@@ -0,0 +1,247 @@
+"""
+Tests of the queue tree (DataCollectTree) with a stand-in beamline
+"""
+import os
+import sys
+
+import pytest
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from gui.utils import QtImport
+
+APP = QtImport.QApplication.instance() or QtImport.QApplication([])
+
+NUM_SAMPLES = 3
+NUM_TASKS = 2
+
+
+class Diffractometer(object):
+    def in_plate_mode(self):
+        return False
+
+
+class QueueModel(object):
+    def view_created(self, view_item, task):
+        view_item._data_model = task
+
+
+class Beamline(object):
+    """Hardware objects used by the tree when items are added"""
+
+    def __init__(self):
+        self.diffractometer = Diffractometer()
+        self.queue_model = QueueModel()
+        self.sample_changer = None
+        self.plate_manipulator = None
+
+
+@pytest.fixture
+def tree(monkeypatch):
+    pytest.importorskip("HardwareRepository")
+    from HardwareRepository import HardwareRepository as HWR
+    from gui.widgets.dc_tree_widget import DataCollectTree
+
+    monkeypatch.setattr(HWR, "beamline", Beamline(), raising=False)
+    return DataCollectTree()
+
+
+def populate(tree):
+    """Adds samples, each with a task group of energy scans"""
+    from HardwareRepository.HardwareObjects import queue_model_objects
+
+    models = []
+    with tree.bulk_update():
+        for sample_index in range(NUM_SAMPLES):
+            sample = queue_model_objects.Sample()
+            tree.add_to_view(None, sample)
+            group = queue_model_objects.TaskGroup()
+            tree.add_to_view(sample, group)
+            tasks = [queue_model_objects.EnergyScan() for _ in range(NUM_TASKS)]
+            for task in tasks:
+                tree.add_to_view(group, task)
+            models.append((sample, group, tasks))
+    return models
+
+
+def iterate_items(tree_widget):
+    it = QtImport.QTreeWidgetItemIterator(tree_widget)
+    item = it.value()
+    while item:
+        yield item
+        it += 1
+        item = it.value()
+
+
+def assert_index_in_sync(tree):
+    """Index holds exactly the items of the tree widget"""
+    items = list(iterate_items(tree.sample_tree_widget))
+    assert len(tree.model_item_index) == len(items)
+    assert len(tree.filter_index) == len(items)
+    for item in items:
+        assert tree.get_item_by_model(item.get_model()) is item
+
+
+def test_added_items_are_indexed(tree):
+    models = populate(tree)
+
+    assert tree.sample_tree_widget.topLevelItemCount() == NUM_SAMPLES
+    for sample, group, tasks in models:
+        sample_item = tree.get_item_by_model(sample)
+        assert sample_item.get_model() is sample
+        group_item = tree.get_item_by_model(group)
+        assert group_item.parent() is sample_item
+        for task in tasks:
+            assert tree.get_item_by_model(task).parent() is group_item
+    assert len(tree.model_item_index) == NUM_SAMPLES * (NUM_TASKS + 2)
+    assert len(tree.path_index) == NUM_SAMPLES * NUM_TASKS
+    assert_index_in_sync(tree)
+    # model without an item (model root) is placed at the top level
+    assert tree.get_item_by_model(None) is tree.sample_tree_widget
+
+
+def test_taken_items_are_removed_from_index(tree):
+    from HardwareRepository.HardwareObjects import queue_model_objects
+
+    models = populate(tree)
+    sample, group, tasks = models[0]
+
+    tree.take_item(tree.get_item_by_model(tasks[0]))
+    assert tasks[0] not in tree.model_item_index
+    assert tree.get_item_by_model(group).childCount() == NUM_TASKS - 1
+    assert_index_in_sync(tree)
+
+    # taking a sample removes its whole subtree
+    tree.take_item(tree.get_item_by_model(sample))
+    for model in [sample, group] + tasks:
+        assert model not in tree.model_item_index
+    assert tree.sample_tree_widget.topLevelItemCount() == NUM_SAMPLES - 1
+    assert len(tree.path_index) == (NUM_SAMPLES - 1) * NUM_TASKS
+    assert_index_in_sync(tree)
+
+    # task added after the removal goes to the indexed group
+    other_sample, other_group, other_tasks = models[1]
+    task = queue_model_objects.EnergyScan()
+    tree.add_to_view(other_group, task)
+    assert tree.get_item_by_model(task).parent() is tree.get_item_by_model(
+        other_group
+    )
+    assert_index_in_sync(tree)
+
+
+def test_cleared_tree_is_repopulated(tree):
+    models = populate(tree)
+    tree.clear_sample_tree()
+
+    assert tree.sample_tree_widget.topLevelItemCount() == 0
+    assert len(tree.model_item_index) == 0
+    assert len(tree.filter_index) == 0
+    assert len(tree.path_index) == 0
+    for sample, group, tasks in models:
+        assert tree.get_item_by_model(group) is tree.sample_tree_widget
+
+    populate(tree)
+    assert tree.sample_tree_widget.topLevelItemCount() == NUM_SAMPLES
+    assert_index_in_sync(tree)
+
+
+def count_calls(tree, monkeypatch, method_names):
+    """Replaces tree methods by wrappers counting their calls"""
+    calls = dict((name, []) for name in method_names)
+
+    def wrap(name, method):
+        def wrapper(*args):
+            calls[name].append(args)
+            return method(*args)
+
+        return wrapper
+
+    for name in method_names:
+        monkeypatch.setattr(tree, name, wrap(name, getattr(tree, name)))
+    return calls
+
+
+EXIT_METHODS = (
+    "set_sample_pin_icon",
+    "update_path_conflict_icons",
+    "filter_items",
+    "toggle_collect_button_enabled",
+)
+
+
+def test_bulk_update_defers_work_to_exit(tree, monkeypatch):
+    from gui.utils.tree_index import TREE_FILTER_OPTIONS
+
+    tree.filter_items(TREE_FILTER_OPTIONS.STAR)
+    calls = count_calls(tree, monkeypatch, EXIT_METHODS)
+    tree_widget = tree.sample_tree_widget
+
+    with tree.bulk_update():
+        # populate enters a nested bulk_update
+        models = populate(tree)
+        assert not tree_widget.updatesEnabled()
+        assert tree_widget.signalsBlocked()
+        assert not any(calls.values())
+
+    assert tree.bulk_update_level == 0
+    assert tree_widget.updatesEnabled()
+    assert not tree_widget.signalsBlocked()
+    for name in EXIT_METHODS:
+        assert len(calls[name]) == 1, name
+    # path conflicts of all added tasks are checked at once
+    (path_items,) = calls["update_path_conflict_icons"][0]
+    assert len(path_items) == NUM_SAMPLES * NUM_TASKS
+    # active filter is applied to the added items: tasks without a star
+    # and their empty groups are hidden
+    assert calls["filter_items"][0] == (TREE_FILTER_OPTIONS.STAR, "")
+    sample, group, tasks = models[0]
+    assert not tree.get_item_by_model(sample).isHidden()
+    assert tree.get_item_by_model(group).isHidden()
+    assert tree.get_item_by_model(tasks[0]).isHidden()
+
+
+def test_bulk_update_restores_state_on_error(tree, monkeypatch):
+    calls = count_calls(tree, monkeypatch, EXIT_METHODS)
+    tree_widget = tree.sample_tree_widget
+
+    with pytest.raises(ValueError):
+        with tree.bulk_update():
+            with tree.bulk_update():
+                populate(tree)
+                raise ValueError("population failed")
+
+    assert tree.bulk_update_level == 0
+    assert tree_widget.updatesEnabled()
+    assert not tree_widget.signalsBlocked()
+    assert not tree.bulk_path_items
+    assert len(calls["set_sample_pin_icon"]) == 1
+    assert len(calls["toggle_collect_button_enabled"]) == 1
+    # no filter is active
+    assert not calls["filter_items"]
+
+
+def test_filter_items(tree):
+    from gui.utils.tree_index import TREE_FILTER_OPTIONS
+
+    populate(tree)
+    items = list(iterate_items(tree.sample_tree_widget))
+
+    tree.filter_items(TREE_FILTER_OPTIONS.ENERGY_SCAN)
+    assert not [item for item in items if item.isHidden()]
+    tree.filter_items(TREE_FILTER_OPTIONS.XRF_SPECTRUM)
+    # energy scans and their task groups are hidden, samples are kept
+    assert len([item for item in items if item.isHidden()]) == NUM_SAMPLES * (
+        NUM_TASKS + 1
+    )
+    tree.filter_items(TREE_FILTER_OPTIONS.SAMPLE_NAME, "no such sample")
+    assert [item for item in items if item.isHidden()] == [
+        tree.sample_tree_widget.topLevelItem(index) for index in range(NUM_SAMPLES)
+    ]
+
+    tree.clear_filter()
+    assert not [item for item in items if item.isHidden()]
+    assert tree.filter_option == TREE_FILTER_OPTIONS.NONE
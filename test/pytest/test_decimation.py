@@ -0,0 +1,73 @@
+"""
+Tests of the peak preserving min/max decimation of curves
+"""
+import os
+import sys
+
+import numpy as np
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+
+from gui.utils.decimation import DecimationPyramid, minmax_indices
+
+NUM_POINTS = 1000000
+NUM_HITS = 200
+
+
+def get_hit_map():
+    random_state = np.random.RandomState(0)
+    y_array = random_state.uniform(0, 1, NUM_POINTS)
+    hits = random_state.choice(NUM_POINTS, NUM_HITS, replace=False)
+    y_array[hits] = random_state.uniform(10, 100, NUM_HITS)
+    return y_array, hits
+
+
+def assert_hits_visible(x_array, y_array, hit_map, hits, resolution):
+    """Every hit has a displayed point at least as high within resolution"""
+    for hit in hits:
+        near = np.abs(x_array - hit) <= resolution
+        assert near.any() and y_array[near].max() >= hit_map[hit]
+
+
+def test_minmax_indices():
+    y_array = np.array([1, 5, 2, 0, 3, 3, 9])
+    min_indices, max_indices = minmax_indices(y_array, 3)
+    assert min_indices.tolist() == [0, 3, 6]
+    assert max_indices.tolist() == [1, 4, 6]
+
+
+def test_small_curve_is_not_decimated():
+    pyramid = DecimationPyramid(np.arange(100.0))
+    x_array, y_array = pyramid.get_data(max_points=1000)
+    assert np.array_equal(x_array, np.arange(100))
+
+
+def test_hits_are_kept_in_full_view():
+    hit_map, hits = get_hit_map()
+    pyramid = DecimationPyramid(hit_map)
+    max_points = 2000
+
+    x_array, y_array = pyramid.get_data(max_points=max_points)
+    assert len(x_array) <= max_points + 4
+    assert np.all(np.diff(x_array) > 0)
+    assert_hits_visible(
+        x_array, y_array, hit_map, hits, 2 * NUM_POINTS // max_points * 2
+    )
+
+    # stride slicing loses most of the hits
+    stride = NUM_POINTS // (max_points // 2)
+    assert (hit_map[::stride] > 1).sum() < NUM_HITS // 10
+
+
+def test_zoomed_view():
+    hit_map, hits = get_hit_map()
+    x_values = np.arange(NUM_POINTS) * 0.5
+    pyramid = DecimationPyramid(hit_map, x_values)
+
+    x_array, y_array = pyramid.get_data(10000, 60000, max_points=1000)
+    assert x_array[1] >= 10000 and x_array[-2] <= 60000
+    visible_hits = hits[(hits >= 20000) & (hits <= 120000)]
+    assert_hits_visible(x_array * 2, y_array, hit_map, visible_hits, 400)
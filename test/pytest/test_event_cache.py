@@ -0,0 +1,100 @@
+"""
+Tests of the bounded cache of events replayed when mirroring is allowed
+"""
+import os
+import sys
+import logging
+from contextlib import contextmanager
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+
+from gui.utils.event_cache import EventCache
+
+
+class Widget(object):
+    def __init__(self, calls):
+        self.calls = calls
+
+    def set_value(self, value):
+        self.calls.append((self, value))
+
+    def set_text(self, text):
+        if text is None:
+            raise ValueError("no text")
+        self.calls.append((self, text))
+
+
+def test_last_value_order_and_capacity():
+    calls = []
+    first, second = Widget(calls), Widget(calls)
+    cache = EventCache(capacity=3)
+    cache.add(first.set_value, (1,), "brick1")
+    cache.add(second.set_value, (2,), "brick2")
+    cache.add(first.set_value, (3,), "brick1")
+    assert len(cache) == 2
+
+    cache.add(first.set_text, ("a",), "brick1")
+    cache.add(second.set_text, ("b",), "brick2")
+    assert len(cache) == 3
+    assert cache.evicted == 1
+
+    groups = cache.get_groups()
+    assert list(groups.keys()) == ["brick1", "brick2"]
+    assert len(groups["brick1"]) == 2
+
+    report = cache.replay()
+    assert calls == [(first, 3), (first, "a"), (second, "b")]
+    assert report["events"] == 3
+    assert report["groups"] == 2
+    assert report["duration"] >= 0
+    assert len(cache) == 0
+
+
+def test_replay_context_and_errors(caplog):
+    calls = []
+    widget = Widget(calls)
+    deleted = Widget(calls)
+    cache = EventCache()
+    cache.add(widget.set_text, (None,), "brick")
+    cache.add(widget.set_value, (1,), "brick")
+    cache.add(deleted.set_value, (2,), "other")
+    del deleted
+
+    suspended = []
+
+    @contextmanager
+    def suspend(group):
+        suspended.append(group)
+        yield
+
+    with caplog.at_level(logging.ERROR):
+        report = cache.replay(suspend)
+
+    assert calls == [(widget, 1)]
+    assert report["events"] == 2
+    assert report["failed"] == 1
+    assert suspended == ["brick", "other"]
+    assert "set_text" in caplog.text
+
+
+def test_qt_widget_methods():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from gui.utils import QtImport
+
+    app = QtImport.QApplication.instance() or QtImport.QApplication([])
+    line_edit = QtImport.QLineEdit()
+    spin_box = QtImport.QSpinBox()
+    cache = EventCache()
+    cache.add(line_edit.setText, ("x",), "brick")
+    cache.add(spin_box.setValue, (5,), "brick")
+    cache.add(line_edit.setText, ("xy",), "brick")
+    assert len(cache) == 2
+
+    report = cache.replay()
+    assert report["events"] == 2
+    assert report["failed"] == 0
+    assert line_edit.text() == "xy"
+    assert spin_box.value() == 5
@@ -0,0 +1,93 @@
+"""
+Tests of the FrameConsumerRegistry (hidden views, frame rate limit)
+"""
+import os
+import sys
+import time
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from gui.utils import QtImport
+from gui.utils.frame_consumers import FrameConsumerRegistry
+
+APP = QtImport.QApplication.instance() or QtImport.QApplication([])
+
+
+class Camera(object):
+    """Emits imageReceived like the camera hardware objects"""
+
+    def __init__(self):
+        self.slots = []
+        self.live_calls = []
+
+    def connect(self, signal, slot):
+        self.slots.append(slot)
+
+    def disconnect(self, sender, signal, slot):
+        self.slots.remove(slot)
+
+    def set_video_live(self, state):
+        self.live_calls.append(state)
+
+    def emit_frame(self, frame):
+        for slot in self.slots:
+            slot(frame)
+
+
+def test_hidden_tab_suspends_video():
+    camera = Camera()
+    registry = FrameConsumerRegistry()
+    tab_widget = QtImport.QTabWidget()
+    view = QtImport.QWidget()
+    tab_widget.addTab(view, "camera")
+    tab_widget.addTab(QtImport.QWidget(), "other")
+    tab_widget.show()
+    APP.processEvents()
+
+    frames = []
+    registry.register_consumer(camera, view, frames.append)
+    registry.set_video_live(camera, True)
+    camera.emit_frame(1)
+    assert frames == [1]
+    assert camera.live_calls == [True]
+
+    tab_widget.setCurrentIndex(1)
+    APP.processEvents()
+    camera.emit_frame(2)
+    assert frames == [1]
+    assert camera.live_calls == [True, False]
+
+    tab_widget.setCurrentIndex(0)
+    APP.processEvents()
+    assert camera.live_calls == [True, False, True]
+
+    statistics = registry.get_statistics(camera)
+    assert statistics["received"] == 2
+    assert statistics["displayed"] == 1
+    assert statistics["hidden"] == 1
+
+    registry.unregister_consumer(camera, view)
+    assert camera.slots == []
+
+
+def test_max_fps():
+    camera = Camera()
+    registry = FrameConsumerRegistry()
+    view = QtImport.QWidget()
+    view.show()
+    frames = []
+    registry.register_consumer(camera, view, frames.append, max_fps=5)
+
+    end = time.time() + 0.5
+    while time.time() < end:
+        camera.emit_frame(0)
+        time.sleep(0.01)
+
+    assert 2 <= len(frames) <= 4
+    consumer_statistics = registry.get_statistics(camera)["consumers"][0]
+    assert consumer_statistics["displayed"] == len(frames)
+    assert consumer_statistics["skipped"] > 20
@@ -0,0 +1,71 @@
+"""
+Tests of the camera FrameTransport (zero copy frames, dropping of stale frames)
+"""
+import os
+import sys
+import threading
+
+import numpy as np
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from gui.utils import QtImport
+from gui.utils.frame_transport import (
+    FrameTransport,
+    FrameGraphicsItem,
+    numpy_to_qimage,
+)
+
+APP = QtImport.QApplication.instance() or QtImport.QApplication([])
+
+
+def test_numpy_frame_is_not_copied():
+    frame = np.zeros((4, 6, 3), dtype=np.uint8)
+    image = numpy_to_qimage(frame)
+    assert (image.width(), image.height()) == (6, 4)
+
+    frame[2, 5] = (10, 20, 30)
+    assert image.pixelColor(5, 2).getRgb() == (10, 20, 30, 255)
+
+    mono_image = numpy_to_qimage(np.arange(12, dtype=np.uint8).reshape(3, 4))
+    assert mono_image.format() == QtImport.QImage.Format_Grayscale8
+    assert mono_image.pixelColor(1, 2).red() == 9
+
+    # grayscale fallback of Qt without Format_Grayscale8
+    indexed_image = numpy_to_qimage(
+        np.arange(12, dtype=np.uint8).reshape(3, 4), QtImport.QImage.Format_Indexed8
+    )
+    assert indexed_image.pixelColor(1, 2).getRgb() == (9, 9, 9, 255)
+
+
+def test_stale_frames_are_dropped():
+    transport = FrameTransport(name="test")
+    frame_item = FrameGraphicsItem()
+    transport.frameReceived.connect(frame_item.set_frame)
+    received = []
+    transport.frameReceived.connect(received.append)
+
+    frames = [np.full((8, 10), index, dtype=np.uint8) for index in range(5)]
+    pusher = threading.Thread(
+        target=lambda: [transport.push_frame(frame) for frame in frames]
+    )
+    pusher.start()
+    pusher.join()
+    APP.processEvents()
+
+    statistics = transport.get_statistics()
+    assert len(received) == 1
+    assert received[0].ndarray is frames[-1]
+    assert statistics["received"] == 5
+    assert statistics["displayed"] == 1
+    assert statistics["dropped"] == 4
+    assert frame_item.boundingRect().width() == 10
+
+    transport.push_frame(frames[0])
+    APP.processEvents()
+    assert transport.get_statistics()["displayed"] == 2
+    assert transport.get_statistics()["latency_max"] >= 0
@@ -0,0 +1,168 @@
+"""
+Tests of the bounded and coalescing buffer of the GUI log handler
+"""
+import os
+import sys
+import logging
+import threading
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+
+from gui.utils import GUILogHandler
+
+# handler class is private, GUILogHandler() also starts the delivery loop
+LogHandler = getattr(GUILogHandler, "__GUILogHandler")
+
+
+def create_logger(handler, name):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+    return logger
+
+
+def test_similar_records_coalesced():
+    handler = LogHandler()
+    logger = create_logger(handler, "test_gui_log_handler.coalesce")
+    for index in range(10):
+        logger.info("motor moved")
+    logger.warning("motor moved")
+    logger.info("motor moved")
+
+    records = handler.take_records()
+    assert [record.getLevel() for record in records] == [
+        logging.INFO,
+        logging.WARNING,
+        logging.INFO,
+    ]
+    assert records[0].getMessage() == "motor moved (9 similar messages suppressed)"
+    assert records[2].getMessage() == "motor moved"
+    metrics = handler.get_metrics()
+    assert metrics["suppressed"] == 9
+    assert metrics["delivered"] == 3
+    assert metrics["backlog"] == 0
+
+    logger.removeHandler(handler)
+
+
+def test_buffer_bound():
+    handler = LogHandler()
+    logger = create_logger(handler, "test_gui_log_handler.bound")
+    num_records = GUILogHandler.MAX_BUFFER_SIZE + 100
+    for index in range(num_records):
+        logger.debug("message %d", index)
+    assert handler.get_metrics()["backlog"] == GUILogHandler.MAX_BUFFER_SIZE
+
+    records = handler.take_records()
+    assert len(records) == GUILogHandler.MAX_BUFFER_SIZE + 1
+    # oldest records are dropped and the drop is reported once
+    assert records[0].getMessage() == "message 100"
+    assert records[-2].getMessage() == "message %d" % (num_records - 1)
+    assert records[-1].getLevel() == logging.WARNING
+    assert records[-1].getMessage() == (
+        "100 log messages dropped (GUI log buffer full)"
+    )
+    assert handler.get_metrics()["dropped"] == 100
+    assert len(handler.take_records()) == 0
+
+    logger.removeHandler(handler)
+
+
+def test_take_records_while_logging():
+    handler = LogHandler(max_buffer_size=50)
+    logger = create_logger(handler, "test_gui_log_handler.threads")
+    num_records = 5000
+    errors = []
+    # logging reports errors of emit without raising them
+    handler.handleError = lambda record: errors.append(sys.exc_info()[1])
+
+    def log():
+        try:
+            for index in range(num_records):
+                # pairs of similar records exercise the coalescing
+                logger.info("message %d", index // 2)
+        except BaseException as ex:
+            errors.append(ex)
+
+    thread = threading.Thread(target=log)
+    thread.start()
+    taken = 0
+    while thread.is_alive():
+        taken += len(handler.take_records())
+    thread.join()
+    taken += len(handler.take_records())
+
+    assert not errors
+    metrics = handler.get_metrics()
+    assert metrics["backlog"] == 0
+    assert metrics["delivered"] == taken
+    suppressed = metrics["suppressed"]
+    assert suppressed <= num_records // 2
+    assert taken >= num_records - suppressed - metrics["dropped"]
+
+    logger.removeHandler(handler)
+
+
+class TakingMessage(object):
+    """Message taking the records while compared to the last record"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.taken = []
+
+    def __str__(self):
+        self.taken.extend(self.handler.take_records())
+        return "message"
+
+
+def test_records_taken_during_emit():
+    handler = LogHandler()
+    logger = create_logger(handler, "test_gui_log_handler.emit")
+    errors = []
+    handler.handleError = lambda record: errors.append(sys.exc_info()[1])
+    logger.info("message")
+    message = TakingMessage(handler)
+    logger.info(message)
+
+    assert not errors
+    (taken_record,) = message.taken
+    # delivered record is not changed by the similar record
+    assert taken_record.getMessage() == "message"
+    assert taken_record.suppressed == 0
+    (record,) = handler.take_records()
+    assert record.getMessage() == "message"
+    assert handler.get_metrics()["suppressed"] == 0
+
+    logger.removeHandler(handler)
+
+
+def test_taken_records_are_not_coalesced():
+    handler = LogHandler()
+    logger = create_logger(handler, "test_gui_log_handler.taken")
+    logger.info("motor moved")
+    logger.info("motor moved")
+    (taken_record,) = handler.take_records()
+    logger.info("motor moved")
+
+    assert taken_record.getMessage() == (
+        "motor moved (1 similar messages suppressed)"
+    )
+    (record,) = handler.take_records()
+    assert record is not taken_record
+    assert record.getMessage() == "motor moved"
+
+    logger.removeHandler(handler)
+
+
+def test_metrics_without_handler(monkeypatch):
+    monkeypatch.setattr(GUILogHandler, "_logHandler", None)
+    spawned = []
+    monkeypatch.setattr(GUILogHandler.gevent, "spawn", spawned.append)
+
+    assert GUILogHandler.get_metrics() == {}
+    assert GUILogHandler._logHandler is None
+    assert not spawned
@@ -0,0 +1,139 @@
+"""
+Tests of HardwareObjectPreloader with a stand-in hardware repository
+that takes LATENCY seconds to load each hardware object.
+"""
+import os
+import sys
+import time
+
+import gevent
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+
+from gui.utils.hwobj_preloader import HardwareObjectPreloader
+
+LATENCY = 0.05
+NUM_BRICKS = 20
+
+
+class DelayedHardwareRepository(object):
+    """Loads dummy hardware objects with artificial (cooperative) latency"""
+
+    def __init__(self, latency=LATENCY):
+        self.latency = latency
+        self.hardware_objects = {}
+        self.load_order = []
+
+    def getHardwareObject(self, name):
+        if name not in self.hardware_objects:
+            gevent.sleep(self.latency)
+            self.hardware_objects[name] = object()
+            self.load_order.append(name)
+        return self.hardware_objects[name]
+
+
+def get_brick_mnemonics():
+    brick_mnemonics = {}
+    for index in range(NUM_BRICKS):
+        # every brick uses a shared and an own hardware object
+        brick_mnemonics["brick%d" % index] = ["/shared", "/hwobj%d" % index]
+    return brick_mnemonics
+
+
+def load_bricks(width):
+    repository = DelayedHardwareRepository()
+    brick_mnemonics = get_brick_mnemonics()
+    if width is None:
+        start = time.time()
+        for mnemonics in brick_mnemonics.values():
+            for mnemonic in mnemonics:
+                repository.getHardwareObject(mnemonic)
+        return time.time() - start, repository
+
+    preloader = HardwareObjectPreloader(repository, width)
+    start = time.time()
+    preloader.start(brick_mnemonics)
+    for brick_name in brick_mnemonics:
+        preloader.wait_for_brick(brick_name)
+    return time.time() - start, repository
+
+
+def test_parallel_preload_is_faster():
+    serial_time, serial_repository = load_bricks(None)
+    parallel_time, parallel_repository = load_bricks(8)
+
+    assert len(parallel_repository.hardware_objects) == NUM_BRICKS + 1
+    assert set(parallel_repository.load_order) == set(serial_repository.load_order)
+    assert parallel_time * 4 < serial_time
+
+
+def test_brick_waits_only_for_own_hardware_objects():
+    repository = DelayedHardwareRepository()
+    brick_mnemonics = get_brick_mnemonics()
+    preloader = HardwareObjectPreloader(repository, 2)
+    preloader.start(brick_mnemonics)
+
+    preloader.wait_for_brick("brick0")
+    assert "/shared" in repository.hardware_objects
+    assert "/hwobj0" in repository.hardware_objects
+    assert len(repository.hardware_objects) < NUM_BRICKS + 1
+
+    preloader.wait_all()
+    assert len(repository.hardware_objects) == NUM_BRICKS + 1
+
+
+def test_progress():
+    progress = []
+    preloader = HardwareObjectPreloader(
+        DelayedHardwareRepository(0),
+        progress_callback=lambda done, total, msg: progress.append((done, total)),
+    )
+    brick_mnemonics = get_brick_mnemonics()
+    preloader.start(brick_mnemonics)
+    for brick_name in brick_mnemonics:
+        preloader.wait_for_brick(brick_name)
+
+    total = 2 * NUM_BRICKS + 1
+    assert progress[-1] == (total, total)
+    assert [done for done, total in progress] == list(range(1, total + 1))
+
+
+def iter_bricks(items_list):
+    for item in items_list:
+        if "brick" in item:
+            yield item["name"]
+        else:
+            for brick_name in iter_bricks(item["children"]):
+                yield brick_name
+
+
+def test_preload_example_layout(tmpdir):
+    """Hardware objects of a GUI file are loaded only by the preloader"""
+    from gui.utils import layout_cache
+
+    gui_file = os.path.join(MXCUBE_ROOT, "configuration", "example_mxcube_gui.yml")
+    compiled_layout = layout_cache.load_layout(gui_file, str(tmpdir))
+    mnemonics = set(compiled_layout.mnemonics)
+    assert mnemonics
+
+    serial_repository = DelayedHardwareRepository()
+    start = time.time()
+    for mnemonic in compiled_layout.mnemonics:
+        serial_repository.getHardwareObject(mnemonic)
+    serial_time = time.time() - start
+
+    # as GUISupervisor.load_gui and Configuration.load, no require()
+    repository = DelayedHardwareRepository()
+    preloader = HardwareObjectPreloader(repository, 8)
+    start = time.time()
+    preloader.start(compiled_layout.brick_mnemonics)
+    for brick_name in iter_bricks(compiled_layout.layout):
+        preloader.wait_for_brick(brick_name)
+    parallel_time = time.time() - start
+
+    assert set(repository.hardware_objects) == mnemonics
+    assert len(repository.load_order) == len(mnemonics)
+    assert parallel_time * 3 < serial_time
@@ -0,0 +1,94 @@
+"""
+Tests of the image transformations and the ImagePipeline worker pool
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from gui.utils import QtImport
+from gui.utils import image_pipeline
+from gui.utils.image_pipeline import ImagePipeline, ImageTransform, transform_array
+
+APP = QtImport.QApplication.instance() or QtImport.QApplication([])
+
+
+def test_geometry():
+    array = np.arange(6, dtype=np.uint8).reshape(2, 3)
+
+    rotated = transform_array(array, ImageTransform(rotation=90))
+    assert rotated.tolist() == [[3, 0], [4, 1], [5, 2]]
+    flipped = transform_array(array, ImageTransform(flip_horizontal=True))
+    assert flipped.tolist() == [[2, 1, 0], [5, 4, 3]]
+    assert not np.may_share_memory(transform_array(array, ImageTransform()), array)
+
+    scaled = transform_array(array, ImageTransform(scale=2, smooth=False))
+    assert scaled.shape == (4, 6)
+    assert scaled[::2, ::2].tolist() == array.tolist()
+
+
+def test_smooth_scaling_and_colors():
+    array = np.full((300, 400, 3), 100, dtype=np.uint8)
+    array[:, 200:] = 200
+
+    scaled = transform_array(array, ImageTransform(width=100))
+    assert scaled.shape == (75, 100, 3)
+    assert scaled[:, :45].tolist() == np.full((75, 45, 3), 100).tolist()
+    assert scaled[:, 55:].tolist() == np.full((75, 45, 3), 200).tolist()
+
+    contrast = transform_array(array, ImageTransform(contrast=2.0))
+    assert contrast[0, 0].tolist() == [72] * 3
+    assert contrast[0, -1].tolist() == [255] * 3
+
+    colored = transform_array(
+        np.array([[0, 255]], dtype=np.uint8), ImageTransform(color_map="hot")
+    )
+    assert colored.tolist() == [[[0, 0, 0, 255], [255, 255, 255, 255]]]
+
+
+def test_pipeline_supersedes_and_caches():
+    pipeline = ImagePipeline(num_workers=1)
+    image = QtImport.QImage(200, 100, QtImport.QImage.Format_RGB32)
+    image.fill(QtImport.QColor(10, 20, 30))
+    results = []
+
+    for width in (20, 40, 60):
+        pipeline.process("view", image, ImageTransform(width=width), results.append, cache=True)
+    pipeline.wait_done()
+    end = time.time() + 5
+    while pipeline.is_pending("view") and time.time() < end:
+        APP.processEvents()
+
+    assert [result.width() for result in results] == [60]
+    assert results[0].height() == 30
+    assert results[0].pixelColor(10, 10).getRgb() == (10, 20, 30, 255)
+
+    pipeline.process("view", image, ImageTransform(width=60), results.append, cache=True)
+    assert len(results) == 2
+    assert pipeline.statistics["cache_hits"] == 1
+
+
+def test_qimage_fallback_without_rgba_format(monkeypatch):
+    """Qt < 5.2: color mapped images are scaled by QImage in the caller"""
+    monkeypatch.setattr(image_pipeline, "COLOR_MAP_FORMAT", None)
+    pipeline = ImagePipeline()
+    results = []
+    frame = np.zeros((40, 60), dtype=np.uint8)
+    pipeline.process(
+        "view", frame, ImageTransform(width=30, color_map="hot"), results.append
+    )
+    assert len(results) == 1
+    assert (results[0].width(), results[0].height()) == (30, 20)
+    assert not pipeline.is_pending("view")
+
+    image = QtImport.QImage(60, 40, QtImport.QImage.Format_Grayscale8)
+    transform = ImageTransform(height=20, rotation=90, color_map="hot")
+    pipeline.process("view", image, transform, results.append)
+    assert (results[1].width(), results[1].height()) == (13, 20)
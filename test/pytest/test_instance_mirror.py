@@ -0,0 +1,238 @@
+"""
+Tests of the batched mirroring with two local instances over loopback
+"""
+import os
+import sys
+import time
+import pickle
+import socket
+import struct
+
+import pytest
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from gui.utils import QtImport
+from gui.utils.brick_change_queue import BrickChangeQueue
+from gui.utils.instance_mirror import MirrorBatcher, apply_message, get_update_method
+
+APP = QtImport.QApplication.instance() or QtImport.QApplication([])
+
+
+def receive_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        assert chunk
+        data += chunk
+    return data
+
+
+def create_bricks(parent):
+    """Bricks with the widgets mirrored by the tests, by brick name"""
+    dc_parameters_brick = QtImport.QFrame(parent)
+    dc_parameters_brick.setObjectName("DCParametersBrick")
+    dc_parameters_brick.prefix_ledit = QtImport.QLineEdit(dc_parameters_brick)
+
+    energy_brick = QtImport.QFrame(parent)
+    energy_brick.setObjectName("EnergyBrick")
+    energy_brick.energy_spinbox = QtImport.QSpinBox(energy_brick)
+    energy_brick.energy_spinbox.setMaximum(100)
+
+    return dict(
+        (brick.objectName(), brick) for brick in (dc_parameters_brick, energy_brick)
+    )
+
+
+class Instance(object):
+    """GUI of an instance, mirrored through sockets"""
+
+    def __init__(self):
+        self.window = QtImport.QWidget()
+        self.bricks = create_bricks(self.window)
+        self.tab_widget = QtImport.QTabWidget(self.window)
+        self.tab_widget.setObjectName("main_tab")
+        for index in range(3):
+            self.tab_widget.addTab(QtImport.QWidget(), "tab %d" % index)
+        self.peers = []
+        self.applied = 0
+        self.batcher = MirrorBatcher(self.send)
+        # coalescing of BaseWidget, in front of the batcher
+        self.change_queue = BrickChangeQueue(self.batcher.add_update, interval=20)
+
+    def change(self, brick_name, widget_name, method_name, *args):
+        method = get_update_method(self.bricks, brick_name, widget_name, method_name)
+        method(*args)
+        self.change_queue.add_change(brick_name, widget_name, method_name, args, True)
+
+    def change_tab(self, tab_index):
+        self.tab_widget.setCurrentIndex(tab_index)
+        self.change_queue.flush()
+        self.batcher.add_tab(self.tab_widget.objectName(), tab_index)
+
+    def send(self, message):
+        data = pickle.dumps(message, 2)
+        for peer in self.peers:
+            peer.sendall(struct.pack("!I", len(data)) + data)
+
+    def receive(self, sock):
+        (size,) = struct.unpack("!I", receive_exactly(sock, 4))
+        message = pickle.loads(receive_exactly(sock, size))
+        apply_message(
+            self.batcher.record_message(message), self.apply_update, self.apply_tab
+        )
+        return message
+
+    def apply_update(
+        self, brick_name, widget_name, method_name, method_args, master_sync
+    ):
+        method = get_update_method(self.bricks, brick_name, widget_name, method_name)
+        method.__self__.blockSignals(True)
+        method(*method_args)
+        method.__self__.blockSignals(False)
+        self.applied += 1
+
+    def apply_tab(self, tab_name, tab_index):
+        assert tab_name == self.tab_widget.objectName()
+        self.tab_widget.setCurrentIndex(tab_index)
+        self.applied += 1
+
+    def get_values(self):
+        return (
+            self.bricks["DCParametersBrick"].prefix_ledit.text(),
+            self.bricks["EnergyBrick"].energy_spinbox.value(),
+            self.tab_widget.currentIndex(),
+        )
+
+
+def connect(server, listener):
+    client_socket = socket.create_connection(listener.getsockname())
+    client_socket.settimeout(5)
+    server_socket, address = listener.accept()
+    server.peers.append(server_socket)
+    return client_socket
+
+
+def wait_flushed(instance):
+    end = time.time() + 2
+    while (
+        instance.change_queue.has_pending_changes()
+        or instance.batcher.has_pending_updates()
+    ) and time.time() < end:
+        APP.processEvents()
+        time.sleep(0.005)
+
+
+def test_two_instances_over_loopback():
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(2)
+
+    master = Instance()
+    client = Instance()
+    client_socket = connect(master, listener)
+
+    text = ""
+    for index in range(200):
+        text += "x"
+        master.change("DCParametersBrick", "prefix_ledit", "setText", text)
+    for index in range(50):
+        master.change("EnergyBrick", "energy_spinbox", "setValue", index)
+    wait_flushed(master)
+    master.change_tab(2)
+    wait_flushed(master)
+
+    message = client.receive(client_socket)
+    assert len(message["updates"]) == 2
+    message = client.receive(client_socket)
+    assert message["tabs"] == [("main_tab", 2)]
+    assert client.get_values() == (text, 49, 2)
+    assert client.applied == 3
+
+    # unchanged values are not sent again
+    master.change("EnergyBrick", "energy_spinbox", "setValue", 49)
+    master.change_queue.flush()
+    assert not master.batcher.has_pending_updates()
+
+    # snapshot is broadcast, the client up to date applies none of it
+    new_client = Instance()
+    new_client_socket = connect(master, listener)
+    master.batcher.send_snapshot()
+    assert client.receive(client_socket)["snapshot"]
+    assert client.applied == 3
+    snapshot = new_client.receive(new_client_socket)
+    assert snapshot["snapshot"]
+    assert new_client.get_values() == master.get_values()
+    assert new_client.applied == 3
+
+    assert master.change_queue.get_statistics()["received"] == 251
+    statistics = master.batcher.get_statistics()
+    assert statistics["received"] == 4
+    assert statistics["coalesced"] == 1
+    assert statistics["sent"] == 3
+    assert statistics["messages"] == 3
+    assert statistics["snapshots"] == 1
+    assert statistics["bytes"] > 0
+    assert statistics["messages_per_second"] > 0
+    assert statistics["bytes_per_second"] > 0
+
+    for sock in [client_socket, new_client_socket, listener] + master.peers:
+        sock.close()
+
+
+class InstanceServer(object):
+    """Stand-in of the instance server of a client"""
+
+    def __init__(self):
+        self.messages = []
+
+    def isServer(self):
+        return False
+
+    def sendBrickUpdateMessage(self, *args):
+        self.messages.append(args)
+
+
+def test_instance_list_brick():
+    pytest.importorskip("HardwareRepository")
+    from gui.BaseComponents import BaseWidget
+    from gui.bricks.InstanceListBrick import InstanceListBrick
+
+    class LineEditBrick(BaseWidget):
+        def __init__(self, *args):
+            BaseWidget.__init__(self, *args)
+            self.prefix_ledit = QtImport.QLineEdit(self)
+
+    sender = InstanceListBrick(None, "instance_list")
+    sender.instance_server_hwobj = InstanceServer()
+    receiver = InstanceListBrick(None, "instance_list")
+    receiver.instance_server_hwobj = InstanceServer()
+    brick = LineEditBrick(None, "DCParametersBrick")
+
+    text_changes = []
+    brick.prefix_ledit.textChanged.connect(text_changes.append)
+    sender.mirror_batcher.add_update(
+        "DCParametersBrick", "prefix_ledit", "setText", ("x",), True
+    )
+    sender.mirror_batcher.add_update(
+        "DCParametersBrick", "prefix_ledit", "setText", ("xy",), True
+    )
+    sender.mirror_batcher.add_update("MissingBrick", "", "setText", ("z",), True)
+    sender.mirror_batcher.flush()
+    (message,) = sender.instance_server_hwobj.messages
+    assert message[2] == "apply_mirror_message"
+
+    receiver.apply_mirror_message(*message[3])
+    assert brick.prefix_ledit.text() == "xy"
+    # mirrored changes are not signalled again
+    assert text_changes == []
+
+    # snapshot broadcast to a client up to date does not set the text again
+    brick.prefix_ledit.setText("local")
+    sender.mirror_batcher.send_snapshot()
+    receiver.apply_mirror_message(*sender.instance_server_hwobj.messages[-1][3])
+    assert brick.prefix_ledit.text() == "local"
@@ -0,0 +1,56 @@
+"""
+Tests of the compiled GUI layout cache
+"""
+import os
+import sys
+import pickle
+import shutil
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+
+from gui.utils import layout_cache
+
+GUI_FILE = os.path.join(MXCUBE_ROOT, "configuration", "example_mxcube_gui.yml")
+
+
+def test_cache_depends_on_bricks_search_path(tmpdir):
+    gui_file = str(tmpdir.join("gui.yml"))
+    shutil.copy(GUI_FILE, gui_file)
+    cache_dir = str(tmpdir.join("cache"))
+    bricks_path = ["/site/bricks", layout_cache.get_bricks_search_path()[-1]]
+
+    compiled_layout = layout_cache.compile_layout(gui_file)
+    layout_cache.save_cached_layout(
+        compiled_layout, gui_file, cache_dir, bricks_path=bricks_path
+    )
+    cached_layout = layout_cache.load_cached_layout(gui_file, cache_dir, bricks_path)
+    assert cached_layout is not None
+    assert cached_layout.brick_modules == compiled_layout.brick_modules
+
+    # compiled with other bricks directories (e.g. bin/compile_layout.py)
+    assert layout_cache.load_cached_layout(gui_file, cache_dir) is None
+    assert layout_cache.load_cached_layout(gui_file, cache_dir, bricks_path[1:]) is None
+
+
+def test_touched_file_refreshes_cache(tmpdir):
+    gui_file = str(tmpdir.join("gui.yml"))
+    shutil.copy(GUI_FILE, gui_file)
+    cache_dir = str(tmpdir.join("cache"))
+    layout_cache.load_layout(gui_file, cache_dir)
+
+    stat = os.stat(gui_file)
+    os.utime(gui_file, (stat.st_atime, stat.st_mtime + 10))
+    assert layout_cache.load_cached_layout(gui_file, cache_dir) is not None
+
+    # mtime was stored after the sha1 match: file is not hashed again
+    cache_filename = layout_cache.get_cache_filename(gui_file, cache_dir)
+    with open(cache_filename, "rb") as cache_file:
+        cached = pickle.load(cache_file)
+    assert cached["source"]["mtime"] == os.stat(gui_file).st_mtime
+
+    with open(gui_file, "a") as gui_file_object:
+        gui_file_object.write("\n# changed\n")
+    assert layout_cache.load_cached_layout(gui_file, cache_dir) is None
@@ -0,0 +1,105 @@
+"""
+Tests of the asynchronous LIMS sample sync with a local stand-in LIMS
+"""
+import os
+import sys
+import time
+
+import gevent
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+
+from gui.utils.lims_sample_sync import LimsSampleSync, LimsSample, diff_samples
+
+
+class LocalLims(object):
+    """Returns the samples of a session after latency seconds"""
+
+    def __init__(self, samples, latency=0.2, blocking=False):
+        self.samples = samples
+        self.latency = latency
+        self.blocking = blocking
+        self.calls = 0
+
+    def get_samples(self, proposal_id, session_id):
+        self.calls += 1
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            gevent.sleep(self.latency)
+        return list(self.samples)
+
+
+def make_samples(num_samples):
+    return [
+        LimsSample(
+            sampleId=index,
+            sampleName="sample%d" % index,
+            proteinAcronym="prot",
+            containerSampleChangerLocation=str(index // 16 + 1),
+            sampleLocation=str(index % 16 + 1),
+            diffractionPlan=LimsSample(experimentKind="Default"),
+        )
+        for index in range(num_samples)
+    ]
+
+
+def test_fetch_does_not_block_and_caches(tmpdir):
+    samples = make_samples(32)
+    for blocking in (False, True):
+        lims = LocalLims(samples, latency=0.3, blocking=blocking)
+        sync = LimsSampleSync(lims, str(tmpdir), in_thread=blocking)
+        received = []
+
+        start_time = time.time()
+        sync.fetch_samples(1, 2, received.append)
+        assert time.time() - start_time < 0.05
+        # the GUI loop keeps running while LIMS answers
+        ticks = 0
+        while sync.is_fetching():
+            gevent.sleep(0.01)
+            ticks += 1
+        assert ticks > 10
+        assert len(received) == 1 and len(received[0]) == 32
+
+    cached_samples = LimsSampleSync(None, str(tmpdir)).load_cached_samples(1, 2)
+    assert len(cached_samples) == 32
+    assert cached_samples[3].sampleName == "sample3"
+    assert cached_samples[3].diffractionPlan.experimentKind == "Default"
+    assert LimsSampleSync(None, str(tmpdir)).load_cached_samples(1, 3) is None
+    assert diff_samples(cached_samples, samples).is_empty()
+
+
+def test_diff_and_superseded_fetch(tmpdir):
+    old_samples = make_samples(4)
+    new_samples = make_samples(5)[1:]
+    new_samples[0].sampleName = "renamed"
+
+    diff = diff_samples(old_samples, new_samples)
+    assert [sample.sampleId for sample in diff.added] == [4]
+    assert [sample.sampleId for sample in diff.removed] == [0]
+    assert [sample.sampleId for sample in diff.changed] == [1]
+
+    lims = LocalLims(new_samples, latency=0.1)
+    sync = LimsSampleSync(lims, str(tmpdir))
+    received = []
+    sync.fetch_samples(1, 2, lambda samples: received.append("first"))
+    sync.fetch_samples(1, 2, lambda samples: received.append("second"))
+    sync.wait(5)
+    assert received == ["second"]
+
+
+def test_cancelled_fetch_is_not_applied(tmpdir):
+    lims = LocalLims(make_samples(4), latency=0.1)
+    sync = LimsSampleSync(lims, str(tmpdir))
+    received = []
+    sync.fetch_samples(1, 2, received.append)
+    gevent.sleep(0.01)
+    sync.cancel()
+    assert not sync.is_fetching()
+    gevent.sleep(0.2)
+    assert received == []
+    assert sync.load_cached_samples(1, 2) is None
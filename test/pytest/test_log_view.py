@@ -0,0 +1,69 @@
+"""
+Tests of the log views of LogViewBrick: every tab keeps its own bounded
+buffer of log lines
+"""
+import os
+import sys
+import logging
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from gui.utils import QtImport
+from gui.utils.GUILogHandler import LogRecord
+from gui.widgets.log_view_widget import LogRecordBuffer, LogTableView
+
+APP = QtImport.QApplication.instance() or QtImport.QApplication([])
+
+
+def make_records(level, num_records, message="message %d"):
+    return [
+        LogRecord(
+            logging.LogRecord("HWR", level, __file__, 0, message, (index,), None)
+        )
+        for index in range(num_records)
+    ]
+
+
+def test_errors_not_evicted_by_debug_flood():
+    errors_view = LogTableView(None, "Errors and warnings", max_log_lines=10)
+    debug_view = LogTableView(None, "Debug", max_log_lines=10)
+
+    errors_view.append_records(make_records(logging.ERROR, 3, "error %d"))
+    for batch in range(100):
+        debug_view.append_records(make_records(logging.DEBUG, 50))
+
+    assert errors_view.log_model.rowCount() == 3
+    assert errors_view.log_model.get_line(0)[-1] == "error 0"
+    assert debug_view.log_model.rowCount() == 10
+
+
+def test_bounded_memory():
+    view = LogTableView(None, "Information", max_log_lines=100)
+    for batch in range(50):
+        view.append_records(make_records(logging.INFO, 30))
+    assert view.log_model.rowCount() == 100
+    assert len(view.log_model._lines._lines) == 100
+    assert view.log_model.get_line(99)[-1] == "message 29"
+
+    view.set_max_log_lines(20)
+    assert view.log_model.rowCount() == 20
+    assert view.log_model.get_line(19)[-1] == "message 29"
+
+    view.append_records(make_records(logging.INFO, 25))
+    assert view.log_model.rowCount() == 20
+    assert view.log_model.get_line(0)[-1] == "message 5"
+
+    view.clear()
+    assert view.log_model.rowCount() == 0
+
+
+def test_ring_buffer():
+    lines = LogRecordBuffer(3)
+    lines.extend(range(5))
+    assert list(lines) == [2, 3, 4]
+    lines.drop_oldest(2)
+    assert list(lines) == [4]
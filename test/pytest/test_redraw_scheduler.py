@@ -0,0 +1,108 @@
+"""
+Tests of the RedrawScheduler coalescing and frame rate limit
+"""
+import os
+import sys
+import time
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from gui.utils import QtImport
+from gui.utils.redraw_scheduler import RedrawScheduler
+
+APP = QtImport.QApplication.instance() or QtImport.QApplication([])
+
+
+class CountingWidget(QtImport.QWidget):
+    def __init__(self):
+        QtImport.QWidget.__init__(self)
+        self.draw_count = 0
+
+    def draw(self):
+        self.draw_count += 1
+
+
+def process_events(duration):
+    end = time.time() + duration
+    while time.time() < end:
+        APP.processEvents()
+        time.sleep(0.001)
+
+
+def test_requests_are_coalesced():
+    scheduler = RedrawScheduler(max_frame_rate=10)
+    widget = CountingWidget()
+    widget.show()
+
+    for index in range(100):
+        scheduler.request_redraw(widget)
+    process_events(0.05)
+
+    statistics = scheduler.get_statistics(widget)
+    assert widget.draw_count == 1
+    assert statistics["requested"] == 100
+    assert statistics["coalesced"] == 99
+    assert statistics["drawn"] == 1
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_frame_rate_is_limited():
+    clock = FakeClock()
+    scheduler = RedrawScheduler(max_frame_rate=10, clock=clock)
+    widget = CountingWidget()
+    widget.show()
+
+    # requests every 5 ms during 0.5 s, the timer fires when it is due
+    start = clock.now
+    due_time = None
+    frame_times = []
+    for step in range(101):
+        clock.now = start + step * 0.005
+        scheduler.request_redraw(widget)
+        if due_time is None:
+            due_time = clock.now + scheduler._timer.interval() / 1000.0
+        if clock.now >= due_time - 1e-9:
+            scheduler.flush()
+            frame_times.append(clock.now - start)
+            due_time = None
+
+    # first frame drawn immediately, then one frame every 0.1 s
+    assert widget.draw_count == 6
+    assert [round(frame_time, 3) for frame_time in frame_times] == [
+        0.0, 0.1, 0.2, 0.3, 0.4, 0.5
+    ]
+    assert scheduler.get_statistics(widget)["requested"] == 101
+
+
+def test_hidden_widget_is_redrawn_when_shown():
+    scheduler = RedrawScheduler()
+    widget = CountingWidget()
+
+    scheduler.request_redraw(widget)
+    scheduler.flush()
+    assert widget.draw_count == 0
+    assert scheduler.get_statistics(widget)["dropped"] == 1
+
+    widget.show()
+    scheduler.flush()
+    assert widget.draw_count == 1
+
+    # draw function of another object is called as well
+    other = CountingWidget()
+    widget.hide()
+    scheduler.request_redraw(widget, other.draw)
+    scheduler.flush()
+    widget.show()
+    scheduler.flush()
+    assert other.draw_count == 1
@@ -0,0 +1,73 @@
+"""
+Tests of the reconciliation of sample changer content with LIMS samples
+"""
+import os
+import sys
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+
+from gui.utils import sample_reconciliation
+
+
+class Sample(object):
+    def __init__(self, code, location, lims_code=None, lims_location=None):
+        self.code = code
+        self.location = location
+        self.lims_code = lims_code
+        self.lims_location = lims_location
+
+
+def lims_sample(code, location):
+    return Sample(code, location, code, location)
+
+
+def test_reconcile_samples():
+    sc_samples = [
+        Sample("A", (1, 1)),
+        Sample("B", (1, 2)),
+        Sample("", (1, 3)),
+        Sample("", (2, 1)),
+        Sample("E", (2, 2)),
+    ]
+    lims_samples = [
+        lims_sample("A", (1, 1)),
+        lims_sample("B", (3, 2)),
+        lims_sample("C", (1, 3)),
+        lims_sample(None, (2, 1)),
+    ]
+
+    report = sample_reconciliation.reconcile_samples(
+        sc_samples, *sample_reconciliation.index_lims_samples(lims_samples)
+    )
+
+    assert [entry.status for entry in report.entries] == [
+        sample_reconciliation.MATCHED,
+        sample_reconciliation.MISMATCHED_LOCATION,
+        sample_reconciliation.MISSING_BARCODE,
+        sample_reconciliation.MATCHED,
+        sample_reconciliation.UNKNOWN,
+    ]
+    assert report.get_sample_list() == [
+        lims_samples[0],
+        sc_samples[1],
+        lims_samples[2],
+        lims_samples[3],
+        sc_samples[4],
+    ]
+    assert report.get_counts() == {
+        "matched": 2,
+        "mismatched_location": 1,
+        "missing_barcode": 1,
+        "unknown": 1,
+    }
+    assert report.as_dict()["entries"][1]["lims_location"] == (3, 2)
+
+
+def test_group_samples_by_basket():
+    samples = [Sample("", (basket, 1)) for basket in (2, 1, 2, 3)]
+    baskets = sample_reconciliation.group_samples_by_basket(samples)
+    assert list(baskets.keys()) == [2, 1, 3]
+    assert baskets[2] == [samples[0], samples[2]]
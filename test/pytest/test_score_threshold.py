@@ -0,0 +1,91 @@
+"""
+Tests of the ScoreThresholdFilter used by the hit map threshold slider
+"""
+import os
+import sys
+
+import numpy as np
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+
+from gui.utils.score_threshold import ScoreThresholdFilter
+
+
+def masked(values, threshold):
+    result = values.copy()
+    result[values < threshold] = 0
+    return result
+
+
+def test_threshold_moves_reuse_buffer():
+    values = np.random.RandomState(0).random_sample((40, 30)) * 100
+    score_filter = ScoreThresholdFilter()
+    score_filter.set_values(values)
+    buffer = score_filter.get_data()
+    assert np.array_equal(buffer, values)
+
+    for threshold in (10, 55, 30, 99, 0, 42.5, None):
+        result = score_filter.set_threshold(threshold)
+        assert result is buffer
+        if threshold is None:
+            assert np.array_equal(result, values)
+        else:
+            assert np.array_equal(result, masked(values, threshold))
+    # values are not modified
+    assert values.max() > 99
+
+
+def test_update_in_place_keeps_threshold():
+    values = np.arange(20, dtype=float).reshape(4, 5)
+    score_filter = ScoreThresholdFilter()
+    score_filter.set_values(values)
+    score_filter.set_threshold(score_filter.get_max_value() * 0.5)
+    assert score_filter.get_num_below(9.5) == 10
+
+    values[0, 0] = 50
+    score_filter.update()
+    assert np.array_equal(score_filter.get_data(), masked(values, 9.5))
+    score_filter.set_threshold(19.5)
+    assert np.array_equal(score_filter.get_data(), masked(values, 19.5))
+    assert score_filter.get_max_value() == 50
+
+
+def test_percentile_and_nan():
+    values = np.array([3.0, np.nan, 1.0, 2.0, 4.0])
+    score_filter = ScoreThresholdFilter()
+    score_filter.set_values(values)
+    assert score_filter.get_percentile(0) == 1
+    assert score_filter.get_percentile(100) == 4
+    assert score_filter.get_max_value() == 4
+
+    result = score_filter.set_threshold(2.5)
+    assert np.array_equal(result[[0, 2, 3, 4]], [3, 0, 0, 4])
+    assert np.isnan(result[1])
+
+
+def test_relative_threshold_follows_values():
+    # slider at 50 %: spots_num cut-off must not be applied to score
+    spots_num = np.array([[0.0, 20.0], [60.0, 100.0]])
+    score = np.array([[0.1, 0.4], [0.6, 1.0]])
+    score_filter = ScoreThresholdFilter()
+    score_filter.set_values(spots_num)
+    result = score_filter.set_relative_threshold(50)
+    assert np.array_equal(result, masked(spots_num, 50))
+
+    score_filter.set_values(score)
+    result = score_filter.set_relative_threshold(50)
+    assert score_filter.threshold == 0.5
+    assert np.array_equal(result, masked(score, 0.5))
+
+    # new data during collection: threshold rescaled to the new maximum
+    score[0, 0] = 4.0
+    score_filter.update()
+    result = score_filter.set_relative_threshold(50)
+    assert score_filter.threshold == 2.0
+    assert np.array_equal(result, masked(score, 2.0))
+
+    assert np.array_equal(score_filter.set_relative_threshold(0), score)
+    assert score_filter.threshold is None
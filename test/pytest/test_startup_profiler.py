@@ -0,0 +1,47 @@
+"""
+Tests of the startup profiler with hardware objects loaded by greenlets
+"""
+import os
+import sys
+
+import gevent
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+
+from gui.utils.startup_profiler import StartupProfiler
+
+
+def test_concurrent_greenlets():
+    profiler = StartupProfiler()
+    profiler.enable()
+
+    def load(name):
+        with profiler.hardware_object(name):
+            gevent.sleep(0.001)
+
+    with profiler.measure("configuration_load"):
+        with profiler.brick_step("brickA", "properties"):
+            greenlets = [
+                gevent.spawn(load, name) for name in ("a1", "a2", "b1", "b2")
+            ]
+            gevent.joinall(greenlets)
+
+    paths = [line.rsplit(" ", 1)[0] for line in profiler.get_folded_stacks()]
+    assert "startup;configuration_load;brickA (properties)" in paths
+    for name in ("a1", "a2", "b1", "b2"):
+        assert "startup;hwobj %s" % name in paths
+    assert not [path for path in paths if path.count("hwobj") > 1]
+
+    report = profiler.get_report()
+    assert [phase["name"] for phase in report["phases"]] == [
+        "hwobj a1",
+        "hwobj a2",
+        "hwobj b1",
+        "hwobj b2",
+        "configuration_load",
+    ]
+    assert len(report["hardware_objects"]) == 4
+    assert report["bricks"][0]["name"] == "brickA"
@@ -0,0 +1,301 @@
+"""
+Tests of the queue tree indexes: path template index used to detect data
+path collisions and filter index used to hide tree items
+"""
+import os
+import sys
+
+import pytest
+
+MXCUBE_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../")
+)
+sys.path.insert(0, MXCUBE_ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from gui.utils import QtImport
+from gui.utils.tree_index import (
+    PathTemplateIndex,
+    TreeFilterIndex,
+    TREE_FILTER_OPTIONS,
+    ITEM_KINDS,
+)
+
+APP = QtImport.QApplication.instance() or QtImport.QApplication([])
+
+
+class PathTemplate(object):
+    def __init__(
+        self, run_number, start_num=1, num_files=100, directory="/data/visitor"
+    ):
+        self.directory = directory
+        self.base_prefix = "sample"
+        self.run_number = run_number
+        self.start_num = start_num
+        self.num_files = num_files
+
+    def get_prefix(self):
+        return self.base_prefix
+
+
+class Item(object):
+    def childCount(self):
+        return 0
+
+
+def test_collisions_are_updated_incrementally():
+    index = PathTemplateIndex()
+    first, second = Item(), Item()
+    assert index.update(first, PathTemplate(1)) == []
+    assert set(index.update(second, PathTemplate(1, 50))) == {first, second}
+    assert index.has_conflict(first) and index.has_conflict(second)
+
+    # the updated item itself is redrawn by the caller
+    assert index.update(second, PathTemplate(2)) == [first]
+    assert not index.get_conflicting_items()
+    assert index.remove(second) == []
+    assert len(index) == 1
+
+
+def test_path_templates_changed_in_place():
+    index = PathTemplateIndex()
+    first, second = Item(), Item()
+    first_template, second_template = PathTemplate(1), PathTemplate(2)
+    index.update(first, first_template)
+    index.update(second, second_template)
+
+    # run number increased without indexing the item again
+    first_template.run_number = 3
+    assert not index.check(PathTemplate(1))
+    second_template.run_number = 3
+    # candidates of a (directory, prefix) group are checked with new runs
+    assert index.check(first_template)
+
+    assert set(index.refresh()) == {first, second}
+    assert index.has_conflict(first) and index.has_conflict(second)
+    assert index.check(PathTemplate(3))
+    assert not index.check(PathTemplate(1))
+    assert index.refresh() == []
+
+
+def test_directories_are_normalised():
+    index = PathTemplateIndex()
+    first, second = Item(), Item()
+    index.update(first, PathTemplate(1, directory="/data/visitor/"))
+    assert set(index.update(second, PathTemplate(1))) == {first, second}
+    assert index.check(PathTemplate(1, 80, directory="/data//visitor/./"))
+    assert not index.check(PathTemplate(1, directory="/data/visitor/x"))
+
+
+def test_unassigned_run_collides_with_every_run():
+    index = PathTemplateIndex()
+    first, second, third = Item(), Item(), Item()
+    index.update(first, PathTemplate(1))
+    index.update(second, PathTemplate(2))
+    assert set(index.update(third, PathTemplate(-1, 90))) == {first, second, third}
+    assert index.check(PathTemplate(-1))
+    assert index.check(PathTemplate(2, 50))
+    assert index.check(PathTemplate(3))
+    assert not index.check(PathTemplate(3, 200))
+    assert not index.check(PathTemplate(-1, 190))
+
+    # run assigned in place
+    index.update(third, PathTemplate(3, 90))
+    assert not index.get_conflicting_items()
+
+
+def data_collection(name, **attributes):
+    attributes["task_type"] = "data_collection"
+    return (name, ITEM_KINDS.TASK, attributes, ())
+
+
+def task(name, task_type, **attributes):
+    attributes["task_type"] = task_type
+    return (name, ITEM_KINDS.TASK, attributes, ())
+
+
+def group(name, *children):
+    return (name, ITEM_KINDS.GROUP, {}, children)
+
+
+def sample(name, protein_acronym, *children):
+    attributes = dict(sample_name=name, protein_acronym=protein_acronym)
+    return (name, ITEM_KINDS.SAMPLE, attributes, children)
+
+
+def basket(name, basket_index, *children):
+    return (name, ITEM_KINDS.BASKET, dict(basket_index=basket_index), children)
+
+
+# (name, kind, filter attributes, children)
+TREE = (
+    basket(
+        "basket1",
+        1,
+        sample(
+            "s1-a",
+            "lyso",
+            group(
+                "g1a",
+                data_collection("dc-exec", executed=True, starred=True),
+                data_collection("dc-helical", helical=True),
+                task("char1", "characterisation"),
+            ),
+        ),
+        sample("s1-b", "thau", group("g1b", task("escan1", "energy_scan"))),
+    ),
+    basket(
+        "basket2",
+        2,
+        sample(
+            "s2-a",
+            "lyso",
+            group(
+                "g2a",
+                task("xrf1", "xrf_spectrum", starred=True),
+                data_collection("dc-osc"),
+            ),
+        ),
+    ),
+    basket("basket3", 3),
+    basket("basket4", 4, sample("s4-a", "insulin", group("g4a"))),
+)
+
+
+def subtree(name, nodes=TREE):
+    """Names of the node and all its descendants"""
+    for node_name, kind, attributes, children in nodes:
+        if node_name == name:
+            names = (name,)
+            for child in children:
+                names += subtree(child[0], children)
+            return names
+        names = subtree(name, children)
+        if names:
+            return names
+    return ()
+
+
+EMPTY = ("basket3", "g4a")
+TASKS = ("dc-exec", "dc-helical", "char1", "escan1", "xrf1", "dc-osc")
+
+# Items hidden, or under a hidden item, as with the former per option
+# rules of TreeBrick.filter_combo_changed and filter_text_changed:
+# - filters 1, 5-11 hide only tasks, 2-4 only samples or baskets
+# - hide_empty_baskets then hides baskets and task groups without visible
+#   children, except for the protein name filter (3)
+# Comma separated basket indexes are compared as integers (the former
+# code compared strings with ints and hid every basket).
+FILTER_CASES = (
+    (TREE_FILTER_OPTIONS.NONE, "", EMPTY),
+    (
+        TREE_FILTER_OPTIONS.STAR,
+        "",
+        EMPTY + ("dc-helical", "char1", "escan1", "dc-osc", "g1b"),
+    ),
+    (
+        TREE_FILTER_OPTIONS.SAMPLE_NAME,
+        "s1",
+        subtree("basket2") + subtree("basket3") + subtree("basket4"),
+    ),
+    (TREE_FILTER_OPTIONS.SAMPLE_NAME, "", EMPTY),
+    (TREE_FILTER_OPTIONS.PROTEIN_NAME, "lyso", subtree("s1-b") + subtree("s4-a")),
+    # empty baskets and groups are kept by the protein name filter
+    (TREE_FILTER_OPTIONS.PROTEIN_NAME, "", ()),
+    (
+        TREE_FILTER_OPTIONS.BASKET_INDEX,
+        "2",
+        subtree("basket1") + subtree("basket3") + subtree("basket4"),
+    ),
+    (TREE_FILTER_OPTIONS.BASKET_INDEX, "1, 4", subtree("basket2") + EMPTY),
+    (
+        TREE_FILTER_OPTIONS.BASKET_INDEX,
+        " 2,x,",
+        subtree("basket1") + subtree("basket3") + subtree("basket4"),
+    ),
+    # single non numeric value does not filter baskets
+    (TREE_FILTER_OPTIONS.BASKET_INDEX, "x", EMPTY),
+    (TREE_FILTER_OPTIONS.EXECUTED, "", EMPTY + ("dc-helical", "dc-osc")),
+    (TREE_FILTER_OPTIONS.NOT_EXECUTED, "", EMPTY + ("dc-exec",)),
+    (
+        TREE_FILTER_OPTIONS.OSC,
+        "",
+        EMPTY + ("dc-helical", "char1", "escan1", "xrf1", "g1b"),
+    ),
+    (
+        TREE_FILTER_OPTIONS.HELICAL,
+        "",
+        EMPTY + ("dc-exec", "char1", "escan1", "xrf1", "dc-osc", "g1b", "g2a"),
+    ),
+    (
+        TREE_FILTER_OPTIONS.CHARACTERISATION,
+        "",
+        EMPTY + tuple(set(TASKS) - {"char1"}) + ("g1b", "g2a"),
+    ),
+    (
+        TREE_FILTER_OPTIONS.ENERGY_SCAN,
+        "",
+        EMPTY + tuple(set(TASKS) - {"escan1"}) + ("g1a", "g2a"),
+    ),
+    (
+        TREE_FILTER_OPTIONS.XRF_SPECTRUM,
+        "",
+        EMPTY + tuple(set(TASKS) - {"xrf1"}) + ("g1a", "g1b"),
+    ),
+)
+
+
+def add_items(parent, nodes, index, items):
+    for name, kind, attributes, children in nodes:
+        item = QtImport.QTreeWidgetItem(parent)
+        item.setText(0, name)
+        items[name] = item
+        index.update(item, kind, **attributes)
+        add_items(item, children, index, items)
+
+
+def build_filter_index():
+    """Returns tree widget, its filter index and items by name"""
+    # items can be hidden only within a tree widget
+    tree_widget = QtImport.QTreeWidget()
+    index, items = TreeFilterIndex(), {}
+    add_items(tree_widget, TREE, index, items)
+    return tree_widget, index, items
+
+
+def set_hidden(item, hidden):
+    item.setHidden(hidden)
+
+
+def get_hidden_names(items):
+    """Names of items hidden or placed under a hidden item"""
+    hidden_names = set()
+    for name, item in items.items():
+        while item is not None:
+            if item.isHidden():
+                hidden_names.add(name)
+                break
+            item = item.parent()
+    return hidden_names
+
+
+@pytest.mark.parametrize("option, text, hidden_names", FILTER_CASES)
+def test_filter_option(option, text, hidden_names):
+    tree_widget, index, items = build_filter_index()
+    index.apply(index.evaluate(option, text), set_hidden)
+    assert get_hidden_names(items) == set(hidden_names)
+
+
+def test_filters_applied_in_sequence():
+    tree_widget, index, items = build_filter_index()
+    for option, text, hidden_names in FILTER_CASES + FILTER_CASES[::-1]:
+        index.apply(index.evaluate(option, text), set_hidden)
+        assert get_hidden_names(items) == set(hidden_names), (option, text)
+
+    # only items with changed visibility are updated
+    changed = []
+    index.apply(
+        index.evaluate(TREE_FILTER_OPTIONS.NOT_EXECUTED),
+        lambda item, hidden: changed.append((item.text(0), hidden)),
+    )
+    assert changed == [("dc-exec", True)]